@@ -23,7 +23,7 @@ class BookingAdmin(admin.ModelAdmin):
     due_amount.short_description = 'Due to OYO'
     
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        qs = super().get_queryset(request).select_related('hotel').with_due_to_oyo()
         if request.user.is_superuser:
             return qs
         try:
@@ -90,4 +90,15 @@ class MonthlyReportAdmin(admin.ModelAdmin):
         })
     )
 
+@admin.register(MonthlyReportRun)
+class MonthlyReportRunAdmin(admin.ModelAdmin):
+    list_display = ('month', 'started_at', 'completed_at', 'reports_generated')
+
+@admin.register(DailyHotelSummary)
+class DailyHotelSummaryAdmin(admin.ModelAdmin):
+    list_display = ('hotel', 'date', 'bookings_count', 'bookings_amount', 'extra_income', 'expenses')
+    list_filter = ('hotel',)
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
 admin.site.register(SimpleBooking)
\ No newline at end of file
@@ -0,0 +1,7 @@
+# context_processors.py
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """Timeout of the {% cache %} fragments, their keys include the hotel's data version"""
+    return {'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT}
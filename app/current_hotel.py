@@ -0,0 +1,112 @@
+# current_hotel.py
+"""
+The logged-in user's hotel, resolved once per request as ``request.hotel``.
+
+CurrentHotelMiddleware (app/middleware.py) keeps a copy of the hotel in the
+session and checks it against the hotel's ``updated_at`` from
+``hotel_state`` (app/stats_cache.py). That state also holds ``data_version``
+and ``data_updated_at``: those change on every booking, income and expense
+write, so they are never taken from the session, and pages read them
+before any of the data they version. The state is cached until one of those
+writes or a hotel save drops it, so most requests don't query the hotels
+table at all. The copy is reloaded when:
+- the hotel has been saved since, which changes ``updated_at``;
+- it is older than HOTEL_SESSION_TTL seconds, which bounds how stale it can
+  get after ``QuerySet.update()`` calls;
+- another user logs in with the session.
+
+With several worker processes the cache must be shared between them
+(COYOS_CACHE_DIR), or a worker sees another one's writes only once
+HOTEL_STATE_TIMEOUT has passed.
+"""
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.utils.dateparse import parse_datetime
+from .models import Hotel
+from .stats_cache import hotel_state
+
+HOTEL_SESSION_KEY = '_current_hotel'
+HOTEL_SESSION_TTL = 300
+
+# Written on every booking, extra income and expense, taken from hotel_state instead
+VOLATILE_FIELDS = ['data_version', 'data_updated_at']
+
+
+def _cached_fields():
+    return [field for field in Hotel._meta.concrete_fields if field.attname not in VOLATILE_FIELDS]
+
+
+def remember_hotel(session, user, hotel):
+    """Store the hotel (or None) as the current hotel of a session logged in as ``user``"""
+    entry = {'user_id': user.pk, 'cached_at': time.time(), 'hotel': None}
+    if hotel is not None:
+        values = {}
+        for field in _cached_fields():
+            value = field.value_from_object(hotel)
+            values[field.attname] = value.isoformat() if hasattr(value, 'isoformat') else value
+        entry['hotel'] = values
+    session[HOTEL_SESSION_KEY] = entry
+
+
+def _hotel_from_session(request):
+    """The hotel stored in the session, False when there is none or it is out of date"""
+    entry = request.session.get(HOTEL_SESSION_KEY)
+    if not entry or entry.get('user_id') != request.user.pk:
+        return False
+    if time.time() - entry.get('cached_at', 0) > HOTEL_SESSION_TTL:
+        return False
+    values = entry['hotel']
+    if values is None:
+        return None
+
+    current = hotel_state(values['id'])
+    stored_updated_at = values.get('updated_at')
+    if current is None or stored_updated_at is None or current['updated_at'] != parse_datetime(stored_updated_at):
+        return False
+
+    row = []
+    for field in Hotel._meta.concrete_fields:
+        if field.attname in VOLATILE_FIELDS:
+            value = current[field.attname]
+        else:
+            value = values[field.attname]
+            if field.get_internal_type() == 'DateTimeField' and value is not None:
+                value = parse_datetime(value)
+        row.append(value)
+    return Hotel.from_db(Hotel.objects.db, [field.attname for field in Hotel._meta.concrete_fields], row)
+
+
+def get_current_hotel(request):
+    """The hotel of the logged-in user, or None for anonymous users and users without one"""
+    if not request.user.is_authenticated:
+        return None
+    hotel = _hotel_from_session(request)
+    if hotel is False:
+        hotel = Hotel.objects.filter(user=request.user).first()
+        remember_hotel(request.session, request.user, hotel)
+    return hotel
+
+
+def _refuse(request):
+    # CurrentHotelMiddleware already loaded request.user, so this runs no query even in async views
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    raise PermissionDenied('No hotel associated with this account.')
+
+
+def hotel_required(view):
+    """Like login_required, and the user must also have a hotel"""
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            if request.hotel is None:
+                return _refuse(request)
+            return await view(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            if request.hotel is None:
+                return _refuse(request)
+            return view(request, *args, **kwargs)
+    return wraps(view)(wrapper)
@@ -0,0 +1,76 @@
+# exports.py
+import csv
+from django.http import StreamingHttpResponse
+
+# Rows fetched per database round trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+# Spreadsheets read text cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+BOOKING_EXPORT_COLUMNS = [
+    ('booking_id', 'Booking ID'),
+    ('guest_name', 'Guest Name'),
+    ('booking_date', 'Booking Date'),
+    ('booking_mode', 'Booking Mode'),
+    ('payment_mode', 'Payment Mode'),
+    ('number_of_rooms', 'Rooms'),
+    ('booking_amount', 'Booking Amount'),
+    ('due_amount', 'Due to OYO'),
+    ('return_qr', 'QR Return'),
+    ('not_in_qr', 'Not in QR'),
+    ('extra_income', 'Extra Income'),
+    ('created_at', 'Created At'),
+]
+
+INCOME_EXPORT_COLUMNS = [
+    ('date', 'Date'),
+    ('source', 'Source'),
+    ('booking__booking_id', 'Booking ID'),
+    ('amount', 'Amount'),
+    ('description', 'Description'),
+    ('created_at', 'Created At'),
+]
+
+EXPENSE_EXPORT_COLUMNS = [
+    ('date', 'Date'),
+    ('expense_type', 'Expense Type'),
+    ('amount', 'Amount'),
+    ('description', 'Description'),
+    ('created_at', 'Created At'),
+]
+
+
+class Echo:
+    """File-like object whose write() hands the line back instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    """A cell value, text that a spreadsheet would run as a formula is quoted with a leading '"""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(columns, queryset, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow([label for _field, label in columns])
+    # values_list + iterator() keeps a single chunk of rows in memory at a time
+    rows = queryset.values_list(*[field for field, _label in columns]).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+def stream_csv(filename, columns, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream a queryset as a CSV download, one row at a time"""
+    response = StreamingHttpResponse(
+        _csv_lines(columns, queryset, chunk_size),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
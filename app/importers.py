@@ -0,0 +1,166 @@
+# importers.py
+import csv
+from decimal import Decimal
+from django.db import transaction
+from .forms import BookingForm
+from .models import Booking
+from .rollups import refresh_daily_summary
+from .stats_cache import bump_stats_version
+
+# Rows validated and inserted per batch
+IMPORT_BATCH_SIZE = 500
+
+# CSV header (lower-cased, spaces and dashes as underscores) -> BookingForm field.
+# Covers our own CSV export and the usual OYO / OTA export column names.
+BOOKING_IMPORT_COLUMNS = {
+    'booking_id': 'booking_id',
+    'booking_reference': 'booking_id',
+    'reference': 'booking_id',
+    'guest_name': 'guest_name',
+    'guest': 'guest_name',
+    'name': 'guest_name',
+    'booking_date': 'booking_date',
+    'check_in': 'booking_date',
+    'checkin_date': 'booking_date',
+    'date': 'booking_date',
+    'booking_mode': 'booking_mode',
+    'source': 'booking_mode',
+    'payment_mode': 'payment_mode',
+    'payment': 'payment_mode',
+    'number_of_rooms': 'number_of_rooms',
+    'rooms': 'number_of_rooms',
+    'booking_amount': 'booking_amount',
+    'amount': 'booking_amount',
+    'return_qr': 'return_qr',
+    'qr_return': 'return_qr',
+    'not_in_qr': 'not_in_qr',
+}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+def _normalise_header(header):
+    return (header or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _choice_value(value, choices):
+    """Accept either the stored value or the label of a choice, in any case"""
+    cleaned = value.strip().lower()
+    for choice, label in choices:
+        if cleaned in (choice.lower(), label.lower()):
+            return choice
+    return value
+
+
+def read_booking_rows(lines):
+    """
+    Yield ``(line_number, form_data)`` for every row of a bookings CSV.
+
+    ``lines`` is any iterable of text lines (an open file, a decoded upload...).
+    """
+    reader = csv.DictReader(lines)
+    fields = {
+        header: BOOKING_IMPORT_COLUMNS[_normalise_header(header)]
+        for header in reader.fieldnames or []
+        if _normalise_header(header) in BOOKING_IMPORT_COLUMNS
+    }
+
+    for row in reader:
+        data = {}
+        for header, field in fields.items():
+            value = (row.get(header) or '').strip()
+            # The first matching column wins when an export has several aliases
+            if value and field not in data:
+                data[field] = value
+        if not data:
+            continue
+
+        data['booking_mode'] = _choice_value(data.get('booking_mode', ''), Booking.BOOKING_MODE_CHOICES)
+        data['payment_mode'] = _choice_value(data.get('payment_mode', ''), Booking.PAYMENT_MODE_CHOICES)
+        data.setdefault('number_of_rooms', '1')
+        # Recomputed from the hotel's QR amount unless the booking is not in QR
+        data.setdefault('return_qr', '0')
+        if data.get('not_in_qr', '').lower() in TRUE_VALUES:
+            data['not_in_qr'] = 'on'
+        else:
+            data.pop('not_in_qr', None)
+
+        yield reader.line_num, data
+
+
+def apply_return_qr(bookings, qr_amount):
+    """Same rule as the booking view: QR return is the amount above rooms * qr_amount"""
+    qr_amount = qr_amount or 0
+    for booking in bookings:
+        if not booking.not_in_qr:
+            actual_due = min(booking.number_of_rooms * qr_amount, booking.booking_amount)
+            booking.return_qr = max(Decimal('0.00'), booking.booking_amount - actual_due)
+
+
+def _validate_batch(hotel, batch, seen_ids):
+    """Validate a batch of rows, returns the bookings to insert and the row errors"""
+    existing = set(
+        Booking.objects.filter(
+            hotel=hotel, booking_id__in=[data.get('booking_id') for _line, data in batch]
+        ).values_list('booking_id', flat=True)
+    )
+
+    bookings, errors = [], []
+    for line, data in batch:
+        booking_id = data.get('booking_id', '')
+        form = BookingForm(data)
+        if not form.is_valid():
+            message = '; '.join(
+                f'{field}: {" ".join(field_errors)}' for field, field_errors in form.errors.items()
+            )
+            errors.append((line, booking_id, message))
+        elif booking_id in existing or booking_id in seen_ids:
+            errors.append((line, booking_id, 'Booking ID already exists'))
+        else:
+            seen_ids.add(booking_id)
+            booking = form.save(commit=False)
+            booking.hotel = hotel
+            bookings.append(booking)
+    return bookings, errors
+
+
+def import_bookings(hotel, rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Validate and bulk insert bookings for a hotel.
+
+    ``rows`` yields ``(line_number, form_data)`` as produced by
+    ``read_booking_rows``. Invalid rows and booking IDs the hotel already has
+    are skipped and reported as ``(line_number, booking_id, message)``.
+    Returns ``(created, errors)``.
+    """
+    created, errors = 0, []
+    seen_ids = set()
+    days = set()
+
+    def flush(batch):
+        nonlocal created
+        bookings, batch_errors = _validate_batch(hotel, batch, seen_ids)
+        errors.extend(batch_errors)
+        apply_return_qr(bookings, hotel.qr_amount)
+        if not dry_run:
+            Booking.objects.bulk_create(bookings, batch_size=batch_size)
+        days.update(booking.booking_date for booking in bookings)
+        created += len(bookings)
+
+    with transaction.atomic():
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        if created and not dry_run:
+            # bulk_create skips the model signals that maintain the rollup and stats cache
+            for day in days:
+                refresh_daily_summary(hotel.id, day)
+            bump_stats_version(hotel.id)
+
+    return created, errors
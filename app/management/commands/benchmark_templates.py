@@ -0,0 +1,110 @@
+# management/commands/benchmark_templates.py
+import json
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import Template
+from django.test import Client, override_settings
+from django.urls import reverse
+from ...models import Hotel
+from .load_test import percentile
+
+# Page template -> url name of the view rendering it
+PAGES = [
+    ('dashboard.html', 'dashboard'),
+    ('bookings.html', 'booking'),
+    ('expense.html', 'expenses'),
+    ('extra_income.html', 'extra_income'),
+    ('simplebook.html', 'blackroom'),
+]
+
+
+@contextmanager
+def timed_renders(timings):
+    """Record (template name, seconds) for every template rendered through the Django backend"""
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            timings.append((self.template.name, time.perf_counter() - start))
+
+    Template.render = render
+    try:
+        yield
+    finally:
+        Template.render = original
+
+
+def _ms(values, pct):
+    return round(percentile(values, pct) * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = 'Measure how long each main page template takes to render, with and without cached fragments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotel-id', type=int, help='Hotel whose pages are rendered (default: the first active one)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed renders per page and mode (default 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed renders per page and mode first (default 2)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        hotels = Hotel.objects.filter(is_active=True).order_by('id')
+        if options['hotel_id']:
+            hotels = hotels.filter(id=options['hotel_id'])
+        hotel = hotels.select_related('user').first()
+        if hotel is None:
+            raise CommandError('No active hotel to render pages for, run seed_data first')
+
+        loaders = settings.TEMPLATES[0]['OPTIONS'].get('loaders')
+        self.stdout.write(
+            f'Rendering pages of {hotel.hotel_code}, DEBUG={settings.DEBUG}, '
+            f'loaders={"cached (explicit)" if loaders else "Django default"}'
+        )
+
+        client = Client()
+        client.force_login(hotel.user)
+        results = {}
+        # A zero timeout makes every {% cache %} block a miss
+        for mode, timeout in (('uncached', 0), ('cached', settings.FRAGMENT_CACHE_TIMEOUT)):
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], FRAGMENT_CACHE_TIMEOUT=timeout):
+                for template_name, view in PAGES:
+                    renders = self._measure(client, reverse(view), template_name, options)
+                    results.setdefault(template_name, {})[mode] = {
+                        'p50_ms': _ms(renders, 50),
+                        'p95_ms': _ms(renders, 95),
+                    }
+
+        header = f'{"template":<20}{"uncached p50":>14}{"p95":>9}{"cached p50":>13}{"p95":>9}{"saved":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for template_name, modes in results.items():
+            uncached, cached = modes['uncached'], modes['cached']
+            saved = (1 - cached['p50_ms'] / uncached['p50_ms']) * 100 if uncached['p50_ms'] else 0
+            self.stdout.write(
+                f'{template_name:<20}{uncached["p50_ms"]:>14}{uncached["p95_ms"]:>9}'
+                f'{cached["p50_ms"]:>13}{cached["p95_ms"]:>9}{saved:>7.0f}%'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+        self.stdout.write(self.style.SUCCESS(f'✓ Rendered {len(PAGES)} templates'))
+
+    def _measure(self, client, url, template_name, options):
+        """Render times of the page's template in seconds, excluding the view's own work"""
+        renders = []
+        for iteration in range(options['warmup'] + options['iterations']):
+            timings = []
+            with timed_renders(timings):
+                response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} answered {response.status_code}')
+            if iteration >= options['warmup']:
+                renders.append(sum(seconds for name, seconds in timings if name == template_name))
+        return renders
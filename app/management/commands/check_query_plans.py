@@ -0,0 +1,103 @@
+# management/commands/check_query_plans.py
+import re
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from ...models import Hotel, Booking, ExtraIncome, DailyExpense, SimpleBooking, DailyHotelSummary
+from ...pagination import BOOKING_KEYSET, keyset_condition
+from ...utils import monthly_report_querysets, previous_month_start
+
+# Full table scans as reported by SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN)
+TABLE_SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)'),
+    re.compile(r'\bSeq Scan on (?P<table>\w+)'),
+]
+
+
+def hot_querysets(hotel_id):
+    """The per-hotel queries issued by the views, keyed by a readable name"""
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+    year_ago = today - timedelta(days=365)
+
+    return {
+        'dashboard: daily summaries': DailyHotelSummary.objects.filter(
+            hotel_id=hotel_id, date__gte=year_ago, date__lte=today
+        ),
+        'dashboard: recent bookings': Booking.objects.filter(
+            hotel_id=hotel_id
+        ).order_by('-created_at')[:10],
+        'booking: list': Booking.objects.filter(
+            hotel_id=hotel_id
+        ).order_by('-booking_date', '-created_at')[:20],
+        'booking: keyset page': Booking.objects.filter(
+            keyset_condition(BOOKING_KEYSET, (today, timezone.now(), 0), descending=True),
+            hotel_id=hotel_id, booking_date__isnull=False,
+        ).order_by('-booking_date', '-created_at', '-id')[:21],
+        'booking: date range': Booking.objects.filter(
+            hotel_id=hotel_id, booking_date__range=[month_start, today]
+        ).order_by('-booking_date', '-created_at')[:20],
+        'extra_income: list': ExtraIncome.objects.filter(
+            hotel_id=hotel_id
+        ).order_by('-date', '-created_at'),
+        'expenses: list': DailyExpense.objects.filter(
+            hotel_id=hotel_id
+        ).order_by('-date', '-created_at'),
+        'blackroom: date range': SimpleBooking.objects.filter(
+            hotel_id=hotel_id, booking_date__gte=month_start, booking_date__lte=today
+        ).order_by('-booking_date', '-created_at'),
+        # The exact queries generate_monthly_reports_bulk runs
+        **{
+            f'monthly report: {name}': queryset
+            for name, queryset in monthly_report_querysets(previous_month_start(), [hotel_id]).items()
+        },
+    }
+
+
+def find_table_scans(plan):
+    """Return the app tables a query plan reads with a full table scan"""
+    tables = []
+    for line in plan.splitlines():
+        for pattern in TABLE_SCAN_PATTERNS:
+            match = pattern.search(line)
+            if match and match.group('table').startswith('app_') and 'INDEX' not in line.upper():
+                tables.append(match.group('table'))
+    return tables
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot view queries and fail if any of them scans a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full query plan for every query',
+        )
+
+    def handle(self, *args, **options):
+        hotel = Hotel.objects.first()
+        # The plan does not depend on the value, so any id works on an empty database
+        hotel_id = hotel.id if hotel else 0
+
+        self.stdout.write(f'Checking query plans on {connection.vendor}...')
+
+        failures = []
+        for name, queryset in hot_querysets(hotel_id).items():
+            plan = queryset.explain()
+            scans = find_table_scans(plan)
+
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'✗ {name}: table scan on {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+
+            if options['verbose_plans'] or scans:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries use a full table scan')
+
+        self.stdout.write('All query plans use indexes.')
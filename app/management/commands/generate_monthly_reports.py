@@ -1,11 +1,36 @@
 # management/commands/generate_monthly_reports.py
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db.models import Sum
-from datetime import datetime, timedelta
-from decimal import Decimal
-from ...models import Hotel, Booking, ExtraIncome, DailyExpense, MonthlyReport
-from ...utils import generate_monthly_report
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from datetime import datetime, date
+from ...models import Hotel
+from ...utils import generate_monthly_reports_bulk, previous_month_start
+
+def _month_range(first, last):
+    """Every first-of-month date from ``first`` to ``last`` inclusive"""
+    months = []
+    current = first.replace(day=1)
+    while current <= last:
+        months.append(current)
+        if current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+    return months
+
+def _init_worker():
+    """Give each worker process a working Django setup and its own DB connection"""
+    import django
+    django.setup()
+    connections.close_all()
+
+def _generate_chunk(month_iso, hotel_ids, force):
+    """Worker entry point: generate one month's reports for a chunk of hotels"""
+    month = date.fromisoformat(month_iso)
+    try:
+        return generate_monthly_reports_bulk(month, hotel_ids=hotel_ids, force=force)
+    finally:
+        connections.close_all()
 
 class Command(BaseCommand):
     help = 'Generate monthly reports for all hotels'
@@ -26,133 +51,129 @@ class Command(BaseCommand):
             type=str,
             help='Generate report for specific month (YYYY-MM format)',
         )
+        parser.add_argument(
+            '--from',
+            dest='from_month',
+            type=str,
+            help='First month of a backfill range (YYYY-MM format)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='to_month',
+            type=str,
+            help='Last month of a backfill range (YYYY-MM format), defaults to last month',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes for backfills',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Hotels per unit of work handed to a worker',
+        )
+    
+    def parse_month(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f'Invalid month "{value}", use YYYY-MM format')
     
     def handle(self, *args, **options):
+        if options['month'] and options['from_month']:
+            raise CommandError('Use either --month or --from/--to, not both')
+        if options['to_month'] and not options['from_month']:
+            raise CommandError('--to needs --from')
+        
         self.stdout.write('Starting monthly report generation...')
         
         # Get all hotels or specific hotel
         if options['hotel_id']:
-            try:
-                hotels = [Hotel.objects.get(id=options['hotel_id'])]
-                self.stdout.write(f'Generating report for hotel ID: {options["hotel_id"]}')
-            except Hotel.DoesNotExist:
+            if not Hotel.objects.filter(id=options['hotel_id']).exists():
                 self.stdout.write(
                     self.style.ERROR(f'Hotel with ID {options["hotel_id"]} not found')
                 )
                 return
+            hotel_ids = [options['hotel_id']]
+            self.stdout.write(f'Generating report for hotel ID: {options["hotel_id"]}')
+        else:
+            hotel_ids = list(Hotel.objects.values_list('id', flat=True))
+            self.stdout.write(f'Generating reports for {len(hotel_ids)} hotels')
+        
+        if options['from_month']:
+            # Backfill a range of months
+            first_month = self.parse_month(options['from_month'])
+            last_month = self.parse_month(options['to_month']) if options['to_month'] else previous_month_start()
+            if first_month > last_month:
+                raise CommandError('--from must not be after --to')
+        elif options['month']:
+            # Generate for specific month
+            first_month = last_month = self.parse_month(options['month'])
         else:
-            hotels = Hotel.objects.all()
-            self.stdout.write(f'Generating reports for {hotels.count()} hotels')
+            # Generate for previous month
+            first_month = last_month = previous_month_start()
+        
+        chunk_size = max(options['chunk_size'], 1)
+        tasks = [
+            (month, hotel_ids[i:i + chunk_size])
+            for month in _month_range(first_month, last_month)
+            for i in range(0, len(hotel_ids), chunk_size)
+        ]
         
         generated_count = 0
         skipped_count = 0
+        failed = []
         
-        for hotel in hotels:
-            try:
-                if options['month']:
-                    # Generate for specific month
-                    month_date = datetime.strptime(options['month'], '%Y-%m').date()
-                    report = self.generate_specific_month_report(hotel, month_date, options['force'])
-                else:
-                    # Generate for previous month
-                    report = generate_monthly_report(hotel)
-                
-                if report:
-                    generated_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f'✓ Generated report for {hotel.hotel_name}')
-                    )
-                else:
-                    skipped_count += 1
-                    self.stdout.write(
-                        self.style.WARNING(f'- Skipped {hotel.hotel_name} (already exists)')
-                    )
-                    
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'✗ Error generating report for {hotel.hotel_name}: {str(e)}')
-                )
+        for done, (month, hotel_chunk, result) in enumerate(self.run_tasks(tasks, options), start=1):
+            label = f'[{done}/{len(tasks)}] {month.strftime("%B %Y")} ({len(hotel_chunk)} hotels)'
+            if isinstance(result, Exception):
+                failed.append((month, hotel_chunk, result))
+                self.stdout.write(self.style.ERROR(f'✗ {label}: {result}'))
+                continue
+            
+            generated, skipped = result
+            generated_count += generated
+            skipped_count += skipped
+            self.stdout.write(self.style.SUCCESS(f'✓ {label}: {generated} generated, {skipped} skipped'))
         
         self.stdout.write('\n' + '='*50)
+        self.stdout.write(f'Months: {first_month.strftime("%B %Y")} to {last_month.strftime("%B %Y")}')
         self.stdout.write(f'Generated: {generated_count} reports')
-        self.stdout.write(f'Skipped: {skipped_count} reports')
+        self.stdout.write(f'Skipped: {skipped_count} reports (already exist)')
+        self.stdout.write(f'Failed: {sum(len(chunk) for _month, chunk, _error in failed)} reports')
+        for month, hotel_chunk, error in failed:
+            self.stdout.write(self.style.ERROR(
+                f'  {month.strftime("%Y-%m")} hotels {hotel_chunk[0]}..{hotel_chunk[-1]}: {error}'
+            ))
         self.stdout.write('Monthly report generation completed!')
     
-    def generate_specific_month_report(self, hotel, month_date, force=False):
-        """Generate report for a specific month"""
-        first_day = month_date.replace(day=1)
-        next_month = first_day.replace(day=28) + timedelta(days=4)
-        last_day = next_month - timedelta(days=next_month.day)
-        
-        # Check if report already exists
-        if not force and MonthlyReport.objects.filter(hotel=hotel, month=first_day).exists():
-            return None  # Report already generated
+    def run_tasks(self, tasks, options):
+        """Yield (month, hotel_ids, result or exception) as each unit of work finishes"""
+        workers = max(options['workers'], 1)
         
-        # Delete existing report if force is True
-        if force:
-            MonthlyReport.objects.filter(hotel=hotel, month=first_day).delete()
-        
-        # Get all bookings from specified month
-        bookings = Booking.objects.filter(
-            hotel=hotel,
-            created_at__date__gte=first_day,
-            created_at__date__lte=last_day
-        )
-        
-        # Get extra income from specified month
-        extra_income = ExtraIncome.objects.filter(
-            hotel=hotel,
-            created_at__date__gte=first_day,
-            created_at__date__lte=last_day
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Get expenses from specified month
-        expenses = DailyExpense.objects.filter(
-            hotel=hotel,
-            created_at__date__gte=first_day,
-            created_at__date__lte=last_day
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Calculate QR amounts
-        qr_bookings = bookings.filter(booking_mode='OYO', not_in_qr=False)
-        total_qr_amount = qr_bookings.aggregate(total=Sum('return_qr'))['total'] or Decimal('0.00')
-        total_booking_amount = qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-        due_to_oyo = total_booking_amount - total_qr_amount
-        
-        # Booking mode breakdown
-        oyo_bookings = bookings.filter(booking_mode='OYO').count()
-        ota_bookings = bookings.filter(booking_mode='OTA').count()
-        walk_in_bookings = bookings.filter(booking_mode='WALK_IN').count()
-        
-        # Payment mode breakdown
-        cash_payments = bookings.filter(payment_mode='CASH').count()
-        upi_payments = bookings.filter(payment_mode='UPI').count()
-        prepaid_payments = bookings.filter(payment_mode='PREPAID').count()
-        
-        # Calculate totals
-        total_revenue = bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-        total_revenue += extra_income
-        net_profit = total_revenue - expenses
-        
-        # Create monthly report
-        report = MonthlyReport.objects.create(
-            hotel=hotel,
-            month=first_day,
-            total_bookings=bookings.count(),
-            total_revenue=total_revenue,
-            total_oyo_due=due_to_oyo,
-            total_cash_collected=bookings.filter(payment_mode='CASH').aggregate(
-                total=Sum('booking_amount'))['total'] or Decimal('0.00'),
-            total_qr_returned=total_qr_amount,
-            total_extra_income=extra_income,
-            total_expenses=expenses,
-            net_profit=net_profit,
-            oyo_bookings=oyo_bookings,
-            ota_bookings=ota_bookings,
-            walk_in_bookings=walk_in_bookings,
-            cash_payments=cash_payments,
-            upi_payments=upi_payments,
-            prepaid_payments=prepaid_payments
-        )
+        if workers == 1 or len(tasks) == 1:
+            for month, hotel_chunk in tasks:
+                try:
+                    result = generate_monthly_reports_bulk(month, hotel_ids=hotel_chunk, force=options['force'])
+                except Exception as e:
+                    result = e
+                yield month, hotel_chunk, result
+            return
         
-        return report
\ No newline at end of file
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {
+                executor.submit(_generate_chunk, month.isoformat(), hotel_chunk, options['force']): (month, hotel_chunk)
+                for month, hotel_chunk in tasks
+            }
+            for future in as_completed(futures):
+                month, hotel_chunk = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield month, hotel_chunk, result
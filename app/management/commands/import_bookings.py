@@ -0,0 +1,66 @@
+# management/commands/import_bookings.py
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from ...models import Hotel
+from ...importers import import_bookings, read_booking_rows, IMPORT_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Import bookings for a hotel from an OYO / OTA CSV export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file to import')
+        parser.add_argument(
+            '--hotel-id',
+            type=int,
+            required=True,
+            help='Hotel ID the bookings belong to',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Rows validated and inserted per batch (default {IMPORT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without saving anything',
+        )
+        parser.add_argument(
+            '--errors',
+            help='Write the rejected rows to this CSV file',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            hotel = Hotel.objects.get(id=options['hotel_id'])
+        except Hotel.DoesNotExist:
+            raise CommandError(f'Hotel with ID {options["hotel_id"]} not found')
+
+        self.stdout.write(f'Importing bookings for {hotel.hotel_name} from {options["csv_file"]}...')
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as csv_file:
+                created, errors = import_bookings(
+                    hotel,
+                    read_booking_rows(csv_file),
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(f'Could not read {options["csv_file"]}: {e}')
+
+        for line, booking_id, message in errors:
+            self.stdout.write(self.style.ERROR(f'✗ Line {line} ({booking_id or "no booking ID"}): {message}'))
+
+        if options['errors'] and errors:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as report:
+                writer = csv.writer(report)
+                writer.writerow(['Line', 'Booking ID', 'Error'])
+                writer.writerows(errors)
+            self.stdout.write(f'Error report written to {options["errors"]}')
+
+        action = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {action} {created} bookings, {len(errors)} rows rejected')
+        )
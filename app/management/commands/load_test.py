@@ -0,0 +1,205 @@
+# management/commands/load_test.py
+import http.cookiejar
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+# Url names replayed by default, the pages hotel staff keep open all day
+DEFAULT_VIEWS = ['dashboard', 'booking', 'blackroom', 'expenses', 'extra_income']
+PERCENTILES = [50, 95, 99]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarise(durations, errors, elapsed):
+    """Latency percentiles (ms) and throughput for every view and for all of them"""
+    report = {'elapsed_seconds': round(elapsed, 3), 'views': {}}
+    everything = []
+    for view, values in durations.items():
+        everything.extend(values)
+        report['views'][view] = _stats(values, errors.get(view, 0), elapsed)
+    report['total'] = _stats(everything, sum(errors.values()), elapsed)
+    return report
+
+
+def _stats(values, errors, elapsed):
+    stats = {'requests': len(values), 'errors': errors}
+    for pct in PERCENTILES:
+        stats[f'p{pct}_ms'] = round(percentile(values, pct) * 1000, 1)
+    stats['mean_ms'] = round(sum(values) / len(values) * 1000, 1) if values else 0.0
+    stats['requests_per_second'] = round(len(values) / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+class Session:
+    """A logged-in browser session against the running server"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def url(self, path):
+        return self.base_url + path
+
+    def login(self, username, password):
+        login_url = self.url(reverse('login'))
+        self.opener.open(login_url, timeout=self.timeout).read()
+        token = next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+        data = urllib.parse.urlencode({
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': token,
+        }).encode()
+        request = urllib.request.Request(login_url, data=data, headers={'Referer': login_url})
+        with self.opener.open(request, timeout=self.timeout) as response:
+            response.read()
+            # A successful login redirects to the dashboard
+            return response.geturl().rstrip('/').endswith(reverse('dashboard').rstrip('/'))
+
+    def get(self, path):
+        """GET a page, returns the status and whether the server redirected elsewhere"""
+        with self.opener.open(self.url(path), timeout=self.timeout) as response:
+            response.read()
+            return response.status, urllib.parse.urlsplit(response.geturl()).path != path
+
+
+class Command(BaseCommand):
+    help = 'Replay concurrent logged-in traffic against a running server and report latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load (default http://127.0.0.1:8000)')
+        parser.add_argument('--prefix', default='loadtest', help='Username prefix used by seed_data (default loadtest)')
+        parser.add_argument('--password', default='loadtest', help='Password of the seeded users')
+        parser.add_argument('--hotels', type=int, default=5, help='Seeded users to spread the sessions over (default 5)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Concurrent sessions (default 10)')
+        parser.add_argument('--requests', type=int, default=500, help='Total requests to send (default 500)')
+        parser.add_argument('--duration', type=float, help='Run for this many seconds instead of a request count')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per view and session first (default 1)')
+        parser.add_argument(
+            '--views',
+            default=','.join(DEFAULT_VIEWS),
+            help=f'Comma separated url names to replay (default {",".join(DEFAULT_VIEWS)})',
+        )
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request fails (default 30)')
+        parser.add_argument('--output', help='Write the report as JSON to this file')
+        parser.add_argument('--compare', help='JSON report of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        views = [view.strip() for view in options['views'].split(',') if view.strip()]
+        paths = {view: reverse(view) for view in views}
+        concurrency = options['concurrency']
+        if concurrency < 1 or options['hotels'] < 1:
+            raise CommandError('--concurrency and --hotels must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        self.stdout.write(f'Logging in {concurrency} sessions at {options["base_url"]}...')
+        sessions = []
+        for number in range(concurrency):
+            username = f'{options["prefix"]}{number % options["hotels"] + 1}'
+            session = Session(options['base_url'], options['timeout'])
+            try:
+                logged_in = session.login(username, options['password'])
+            except (urllib.error.URLError, OSError) as e:
+                raise CommandError(f'Cannot reach {options["base_url"]}: {e}')
+            if not logged_in:
+                raise CommandError(f'Login failed for {username}, run seed_data first')
+            for _ in range(options['warmup']):
+                for path in paths.values():
+                    session.get(path)
+            sessions.append(session)
+
+        durations = {view: [] for view in views}
+        errors = {view: 0 for view in views}
+        lock = threading.Lock()
+        counter = itertools.count()
+        deadline = None
+
+        def worker(session):
+            while True:
+                index = next(counter)
+                if deadline is not None:
+                    if time.monotonic() >= deadline:
+                        return
+                elif index >= options['requests']:
+                    return
+                view = views[index % len(views)]
+                started = time.perf_counter()
+                try:
+                    status, redirected = session.get(paths[view])
+                    failed = status != 200 or redirected
+                except (urllib.error.URLError, OSError):
+                    failed = True
+                elapsed = time.perf_counter() - started
+                with lock:
+                    durations[view].append(elapsed)
+                    if failed:
+                        errors[view] += 1
+
+        self.stdout.write(
+            f'Replaying {", ".join(views)} with {concurrency} sessions, '
+            + (f'{options["duration"]:g}s...' if options['duration'] else f'{options["requests"]} requests...')
+        )
+        started = time.monotonic()
+        if options['duration']:
+            deadline = started + options['duration']
+        threads = [threading.Thread(target=worker, args=(session,)) for session in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report = summarise(durations, errors, time.monotonic() - started)
+        report['concurrency'] = concurrency
+
+        self._print_report(report, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f'Report written to {options["output"]}')
+
+        if report['total']['errors']:
+            self.stdout.write(self.style.WARNING(f'⚠ {report["total"]["errors"]} requests failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {report["total"]["requests"]} requests, {report["total"]["requests_per_second"]} req/s'
+            ))
+
+    def _print_report(self, report, baseline):
+        header = f'{"view":<16}{"requests":>9}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>9}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = list(report['views'].items()) + [('total', report['total'])]
+        for view, stats in rows:
+            self.stdout.write(
+                f'{view:<16}{stats["requests"]:>9}{stats["errors"]:>8}{stats["p50_ms"]:>10}'
+                f'{stats["p95_ms"]:>10}{stats["p99_ms"]:>10}{stats["requests_per_second"]:>9}'
+            )
+            previous = (baseline or {}).get('views', {}).get(view) if view != 'total' else (baseline or {}).get('total')
+            if previous:
+                changes = []
+                for key in ('p50_ms', 'p95_ms', 'p99_ms', 'requests_per_second'):
+                    if previous.get(key):
+                        change = (stats[key] - previous[key]) / previous[key] * 100
+                        changes.append(f'{key} {change:+.0f}%')
+                self.stdout.write(f'{"":<16}vs baseline: {", ".join(changes)}')
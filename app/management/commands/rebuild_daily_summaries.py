@@ -0,0 +1,31 @@
+# management/commands/rebuild_daily_summaries.py
+from django.core.management.base import BaseCommand
+from ...models import Hotel
+from ...rollups import rebuild_daily_summaries
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily hotel summary rollup from bookings, extra income and expenses'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hotel-id',
+            type=int,
+            help='Rebuild summaries for specific hotel ID only',
+        )
+    
+    def handle(self, *args, **options):
+        hotel_ids = None
+        if options['hotel_id']:
+            if not Hotel.objects.filter(id=options['hotel_id']).exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Hotel with ID {options["hotel_id"]} not found')
+                )
+                return
+            hotel_ids = [options['hotel_id']]
+            self.stdout.write(f'Rebuilding daily summaries for hotel ID: {options["hotel_id"]}')
+        else:
+            self.stdout.write('Rebuilding daily summaries for all hotels...')
+        
+        rows = rebuild_daily_summaries(hotel_ids=hotel_ids)
+        
+        self.stdout.write(self.style.SUCCESS(f'✓ Wrote {rows} daily summary rows'))
@@ -0,0 +1,18 @@
+# management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import connection
+from ...search import install_search_index
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text search tables and triggers for bookings and reindex every row'
+    
+    def handle(self, *args, **options):
+        self.stdout.write(f'Rebuilding the booking search index on {connection.vendor}...')
+        
+        if not install_search_index(connection):
+            self.stdout.write(
+                self.style.WARNING('Full-text search is not available on this database, searches use icontains')
+            )
+            return
+        
+        self.stdout.write(self.style.SUCCESS('✓ Booking search index rebuilt'))
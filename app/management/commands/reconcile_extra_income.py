@@ -0,0 +1,49 @@
+# management/commands/reconcile_extra_income.py
+from django.core.management.base import BaseCommand
+from ...models import Hotel
+from ...rollups import booking_extra_income_drift, recompute_booking_extra_income
+
+class Command(BaseCommand):
+    help = 'Recompute Booking.extra_income from the extra incomes and report bookings that had drifted'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hotel-id',
+            type=int,
+            help='Reconcile bookings of specific hotel ID only',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the bookings that differ',
+        )
+    
+    def handle(self, *args, **options):
+        hotel_ids = None
+        if options['hotel_id']:
+            if not Hotel.objects.filter(id=options['hotel_id']).exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Hotel with ID {options["hotel_id"]} not found')
+                )
+                return
+            hotel_ids = [options['hotel_id']]
+        
+        drifted = booking_extra_income_drift(hotel_ids=hotel_ids).values_list(
+            'id', 'booking_id', 'stored_extra_income', 'expected_extra_income'
+        )
+        count = 0
+        for pk, booking_id, stored, expected in drifted.iterator():
+            count += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  Booking {booking_id} (#{pk}): {stored} -> {expected}')
+        
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✓ {count} bookings have drifted'))
+            return
+        
+        if count:
+            # One set-based UPDATE for every booking in scope, drifted or not
+            updated = recompute_booking_extra_income(hotel_ids=hotel_ids)
+            self.stdout.write(f'Recomputed extra income of {updated} bookings')
+        
+        self.stdout.write(self.style.SUCCESS(f'✓ Fixed {count} drifted bookings'))
@@ -0,0 +1,201 @@
+# management/commands/seed_data.py
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from ...importers import apply_return_qr
+from ...models import Hotel, Booking, ExtraIncome, DailyExpense, SimpleBooking
+from ...rollups import rebuild_daily_summaries, recompute_booking_extra_income
+from ...stats_cache import bump_stats_version
+
+SEED_BATCH_SIZE = 2000
+
+# Weights roughly matching production traffic
+BOOKING_MODES = [('OYO', 50), ('OTA', 20), ('TA', 10), ('WALK_IN', 20)]
+PAYMENT_MODES = [('CASH', 40), ('UPI', 35), ('PREPAID', 25)]
+ROOMS = [(1, 70), (2, 22), (3, 8)]
+INCOME_SOURCES = [('KITCHEN', 55), ('MINI_BAR', 15), ('PARKING', 20), ('OTHER', 10)]
+EXPENSE_TYPES = [
+    ('STAFF_SALARY', 10), ('KITCHEN_GROCERY', 40), ('ELECTRICITY_WATER', 10),
+    ('MAINTENANCE', 20), ('OTHER', 20),
+]
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Ishaan', 'Kavya', 'Meera',
+               'Rahul', 'Priya', 'Rohan', 'Sneha', 'Arjun', 'Pooja', 'Vikram', 'Neha']
+LAST_NAMES = ['Sharma', 'Verma', 'Gupta', 'Kumar', 'Singh', 'Patel', 'Reddy', 'Iyer',
+              'Nair', 'Das', 'Joshi', 'Mehta', 'Rao', 'Khan', 'Fernandes', 'Bose']
+
+
+def _pick(rng, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randrange(low * 100, high * 100, 50)) / 100
+
+
+@contextmanager
+def _explicit_created_at(*models):
+    """Let bulk_create keep the created_at we set instead of stamping now()"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Seed hotels with synthetic bookings, extra incomes, expenses and blackroom bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotels', type=int, default=5, help='Number of hotels to create (default 5)')
+        parser.add_argument('--days', type=int, default=365, help='Days of history per hotel (default 365)')
+        parser.add_argument(
+            '--bookings-per-day',
+            type=int,
+            default=15,
+            help='Average bookings per hotel and day (default 15)',
+        )
+        parser.add_argument('--prefix', default='loadtest', help='Username and hotel code prefix')
+        parser.add_argument('--password', default='loadtest', help='Password of the seeded users')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, the same seed gives the same data')
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete hotels seeded earlier with the same prefix first',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+
+        existing = User.objects.filter(username__startswith=prefix)
+        if existing.exists():
+            if not options['clear']:
+                raise CommandError(f'Users starting with "{prefix}" already exist, use --clear or another --prefix')
+            self.stdout.write(f'Deleting {existing.count()} seeded users and their hotels...')
+            existing.delete()
+
+        today = timezone.now().date()
+        first_day = today - timedelta(days=options['days'] - 1)
+        password = make_password(options['password'])
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'{prefix}{number}', password=password)
+                for number in range(1, options['hotels'] + 1)
+            ])
+            hotels = Hotel.objects.bulk_create([
+                Hotel(
+                    user=user,
+                    hotel_name=f'Seed Hotel {number}',
+                    hotel_code=f'{prefix.upper()}{number}',
+                    qr_amount=rng.choice([250, 300, 400, 500]),
+                    address=f'{number} Test Road',
+                    contact_number=f'90000{number:05d}',
+                )
+                for number, user in enumerate(users, start=1)
+            ])
+
+            # bulk_create may not return primary keys on every backend
+            hotels = list(Hotel.objects.filter(user__in=User.objects.filter(username__startswith=prefix)))
+            for hotel in hotels:
+                counts = self._seed_hotel(rng, hotel, first_day, today, options['bookings_per_day'])
+                self.stdout.write(
+                    f'  {hotel.hotel_code}: {counts[0]} bookings, {counts[1]} incomes, '
+                    f'{counts[2]} expenses, {counts[3]} blackroom bookings'
+                )
+
+            # bulk_create skips the signals maintaining these
+            hotel_ids = [hotel.id for hotel in hotels]
+            recompute_booking_extra_income(hotel_ids=hotel_ids)
+            rebuild_daily_summaries(hotel_ids=hotel_ids)
+            for hotel_id in hotel_ids:
+                bump_stats_version(hotel_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Seeded {len(hotels)} hotels, log in as {prefix}1..{prefix}{len(hotels)} '
+            f'with password "{options["password"]}"'
+        ))
+
+    def _seed_hotel(self, rng, hotel, first_day, today, bookings_per_day):
+        bookings, incomes, expenses, simple_bookings = [], [], [], []
+
+        day = first_day
+        while day <= today:
+            # Weekends are busier
+            busy = 1.4 if day.weekday() >= 5 else 1.0
+            for number in range(max(0, round(rng.gauss(bookings_per_day * busy, bookings_per_day / 4)))):
+                mode = _pick(rng, BOOKING_MODES)
+                rooms = _pick(rng, ROOMS)
+                bookings.append(Booking(
+                    hotel=hotel,
+                    booking_id=f'{mode.replace("_", "")}-{day:%y%m%d}-{number:03d}',
+                    guest_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    booking_mode=mode,
+                    payment_mode=_pick(rng, PAYMENT_MODES),
+                    number_of_rooms=rooms,
+                    booking_amount=_money(rng, 800, 4500) * rooms,
+                    booking_date=day,
+                    not_in_qr=rng.random() < 0.05,
+                    created_at=self._moment(rng, day),
+                ))
+
+            for _ in range(rng.randint(0, 3)):
+                incomes.append(ExtraIncome(
+                    hotel=hotel,
+                    source=_pick(rng, INCOME_SOURCES),
+                    date=day,
+                    amount=_money(rng, 50, 1500),
+                    created_at=self._moment(rng, day),
+                ))
+            for _ in range(rng.randint(1, 2)):
+                expenses.append(DailyExpense(
+                    hotel=hotel,
+                    expense_type=_pick(rng, EXPENSE_TYPES),
+                    date=day,
+                    amount=_money(rng, 100, 5000),
+                    created_at=self._moment(rng, day),
+                ))
+            for _ in range(rng.randint(0, 3)):
+                simple_bookings.append(SimpleBooking(
+                    hotel=hotel,
+                    guest_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    booking_amount=_money(rng, 500, 3000),
+                    booking_date=day,
+                    extra_income=_money(rng, 0, 500),
+                    created_at=self._moment(rng, day),
+                ))
+            day += timedelta(days=1)
+
+        apply_return_qr(bookings, hotel.qr_amount)
+        with _explicit_created_at(Booking, ExtraIncome, DailyExpense, SimpleBooking):
+            Booking.objects.bulk_create(bookings, batch_size=SEED_BATCH_SIZE)
+
+            # About a third of the extra income belongs to a booking of the same day
+            booking_ids = {}
+            for pk, booking_date in Booking.objects.filter(hotel=hotel).values_list('id', 'booking_date'):
+                booking_ids.setdefault(booking_date, []).append(pk)
+            for income in incomes:
+                if rng.random() < 0.35 and booking_ids.get(income.date):
+                    income.booking_id = rng.choice(booking_ids[income.date])
+
+            ExtraIncome.objects.bulk_create(incomes, batch_size=SEED_BATCH_SIZE)
+            DailyExpense.objects.bulk_create(expenses, batch_size=SEED_BATCH_SIZE)
+            SimpleBooking.objects.bulk_create(simple_bookings, batch_size=SEED_BATCH_SIZE)
+
+        return len(bookings), len(incomes), len(expenses), len(simple_bookings)
+
+    def _moment(self, rng, day):
+        """A timestamp during the given day"""
+        moment = datetime.combine(day, time(hour=rng.randint(6, 23), minute=rng.randint(0, 59), second=rng.randint(0, 59)))
+        return timezone.make_aware(moment)
@@ -0,0 +1,64 @@
+# management/commands/vendor_assets.py
+import urllib.error
+import urllib.request
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOTSTRAP_VERSION = '5.3.0'
+POPPER_VERSION = '2.11.8'
+FONT_AWESOME_VERSION = '6.4.0'
+
+BOOTSTRAP_URL = f'https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist'
+POPPER_URL = f'https://cdn.jsdelivr.net/npm/@popperjs/core@{POPPER_VERSION}/dist/umd'
+FONT_AWESOME_URL = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}'
+
+# Path under static/vendor -> source. The source maps and webfonts are referenced
+# from the stylesheets and scripts, so collectstatic needs them to hash those.
+ASSETS = {
+    'bootstrap/css/bootstrap.min.css': f'{BOOTSTRAP_URL}/css/bootstrap.min.css',
+    'bootstrap/css/bootstrap.min.css.map': f'{BOOTSTRAP_URL}/css/bootstrap.min.css.map',
+    'bootstrap/js/bootstrap.min.js': f'{BOOTSTRAP_URL}/js/bootstrap.min.js',
+    'bootstrap/js/bootstrap.min.js.map': f'{BOOTSTRAP_URL}/js/bootstrap.min.js.map',
+    # The Popper release bundled into bootstrap.bundle.min.js, loaded before bootstrap.min.js
+    'popper/popper.min.js': f'{POPPER_URL}/popper.min.js',
+    'popper/popper.min.js.map': f'{POPPER_URL}/popper.min.js.map',
+    'fontawesome/css/all.min.css': f'{FONT_AWESOME_URL}/css/all.min.css',
+    **{
+        f'fontawesome/webfonts/{font}.{extension}': f'{FONT_AWESOME_URL}/webfonts/{font}.{extension}'
+        for font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+        for extension in ('woff2', 'ttf')
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        f'Download Bootstrap {BOOTSTRAP_VERSION}, Popper {POPPER_VERSION} and '
+        f'Font Awesome {FONT_AWESOME_VERSION} into static/vendor'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download files that are already there again')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a download fails (default 30)')
+
+    def handle(self, *args, **options):
+        vendor_dir = Path(settings.STATICFILES_DIRS[0]) / 'vendor'
+        downloaded = 0
+        for name, url in ASSETS.items():
+            target = vendor_dir / name
+            if target.exists() and not options['force']:
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=options['timeout']) as response:
+                    content = response.read()
+            except (urllib.error.URLError, OSError) as e:
+                raise CommandError(f'Cannot download {url}: {e}')
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            self.stdout.write(f'  {name} ({len(content) // 1024} KB)')
+            downloaded += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {downloaded} files downloaded, {len(ASSETS) - downloaded} already in {vendor_dir}'
+        ))
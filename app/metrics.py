@@ -0,0 +1,167 @@
+# metrics.py
+"""
+Per-view request metrics rendered in the Prometheus text format.
+
+Metrics live in the memory of each worker process, so every process
+reports only the requests it served. Scrape each worker, or run a single
+one, when the numbers matter. RequestMetricsMiddleware (app/middleware.py)
+records into them, and ``metrics`` in app/views.py serves them.
+"""
+import logging
+import threading
+from django.conf import settings
+
+logger = logging.getLogger('app.metrics')
+
+# Budgets applied to every view. The METRICS_BUDGETS setting overrides them for
+# all views, METRICS_VIEW_BUDGETS per url name.
+# ``bytes`` is the body as sent, after compression, ``uncompressed_bytes`` as rendered.
+DEFAULT_BUDGETS = {
+    'queries': 20,
+    'db_seconds': 0.5,
+    'seconds': 1.0,
+    'bytes': 256 * 1024,
+    'uncompressed_bytes': 1024 * 1024,
+}
+
+
+class Histogram:
+    """Cumulative histogram with one series per view"""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        with self._lock:
+            series = self._series.setdefault(view, {'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for view, series in sorted(self._series.items()):
+                label = f'view="{_escape(view)}"'
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{label},le="{_number(bound)}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{label}}} {_number(series["sum"])}')
+                lines.append(f'{self.name}_count{{{label}}} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """Counter with one series per view and budget"""
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, view, budget):
+        with self._lock:
+            self._series[view, budget] = self._series.get((view, budget), 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for (view, budget), count in sorted(self._series.items()):
+                lines.append(f'{self.name}{{view="{_escape(view)}",budget="{_escape(budget)}"}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUEST_QUERIES = Histogram(
+    'coyos_request_queries', 'SQL queries issued per request.',
+    [1, 2, 5, 10, 20, 50, 100, 200, 500],
+)
+REQUEST_DB_SECONDS = Histogram(
+    'coyos_request_db_seconds', 'Time spent in SQL queries per request.',
+    [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5],
+)
+REQUEST_SECONDS = Histogram(
+    'coyos_request_seconds', 'Time spent in the view per request, including streaming the response.',
+    [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+)
+RESPONSE_BYTES = Histogram(
+    'coyos_response_bytes', 'Response body size in bytes as sent, after compression.',
+    [1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216],
+)
+RESPONSE_UNCOMPRESSED_BYTES = Histogram(
+    'coyos_response_uncompressed_bytes', 'Response body size in bytes before compression.',
+    [1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216],
+)
+REQUESTS_OVER_BUDGET = Counter(
+    'coyos_requests_over_budget_total', 'Requests over one of the budgets of their view.',
+)
+
+HISTOGRAMS = [REQUEST_QUERIES, REQUEST_DB_SECONDS, REQUEST_SECONDS, RESPONSE_BYTES, RESPONSE_UNCOMPRESSED_BYTES]
+COUNTERS = [REQUESTS_OVER_BUDGET]
+
+
+def view_budgets(view):
+    """Budgets for a url name, defaults overridden by settings"""
+    budgets = dict(DEFAULT_BUDGETS)
+    budgets.update(getattr(settings, 'METRICS_BUDGETS', {}))
+    budgets.update(getattr(settings, 'METRICS_VIEW_BUDGETS', {}).get(view, {}))
+    return budgets
+
+
+def record_request(view, path, queries, db_seconds, seconds, size, uncompressed_size=None):
+    """Record one request, and count and log it when it is over one of its budgets"""
+    if uncompressed_size is None:
+        uncompressed_size = size
+    REQUEST_QUERIES.observe(view, queries)
+    REQUEST_DB_SECONDS.observe(view, db_seconds)
+    REQUEST_SECONDS.observe(view, seconds)
+    RESPONSE_BYTES.observe(view, size)
+    RESPONSE_UNCOMPRESSED_BYTES.observe(view, uncompressed_size)
+
+    measured = {
+        'queries': queries,
+        'db_seconds': db_seconds,
+        'seconds': seconds,
+        'bytes': size,
+        'uncompressed_bytes': uncompressed_size,
+    }
+    budgets = view_budgets(view)
+    over = []
+    for name, value in measured.items():
+        budget = budgets.get(name)
+        if budget is not None and value > budget:
+            REQUESTS_OVER_BUDGET.inc(view, name)
+            over.append(f'{name}={value:g} (budget {budget:g})')
+    if over:
+        logger.warning('Request over budget: %s %s %s', view, path, ', '.join(over))
+    return over
+
+
+def render_metrics():
+    """All histograms and counters in the Prometheus text exposition format"""
+    lines = []
+    for metric in HISTOGRAMS + COUNTERS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,172 @@
+# middleware.py
+import contextvars
+import threading
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import logout
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.shortcuts import redirect
+from .current_hotel import get_current_hotel
+from .metrics import record_request
+from .static_files import hashed_names, static_file_response, static_root_path
+
+# Views whose requests are not recorded
+METRICS_EXCLUDED_VIEWS = {'metrics'}
+
+# QueryStats of the current request, for queries run in other threads (see app/query_groups.py)
+CURRENT_QUERY_STATS = contextvars.ContextVar('current_query_stats', default=None)
+
+
+class QueryStats:
+    """Counts the queries run through the database connections and their duration"""
+
+    def __init__(self):
+        self.queries = 0
+        # Summed over every connection, so concurrent queries can add up to more than the request took
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - start
+                self.queries += 1
+
+    def capture(self):
+        """Context manager recording the queries of every connection"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+class RequestMetricsMiddleware:
+    """Record SQL queries, DB time, view time and response size of every view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        token = CURRENT_QUERY_STATS.set(stats)
+        try:
+            with stats.capture():
+                response = self.get_response(request)
+        finally:
+            CURRENT_QUERY_STATS.reset(token)
+
+        match = request.resolver_match
+        if match is None or match.view_name in METRICS_EXCLUDED_VIEWS:
+            return response
+        view = match.view_name
+
+        if response.streaming:
+            # Streamed rows are read from the database while the body is sent
+            response.streaming_content = self._measure_stream(
+                response, response.streaming_content, stats, start, view, request.path
+            )
+        else:
+            record_request(
+                view, request.path, stats.queries, stats.seconds,
+                time.perf_counter() - start, len(response.content),
+                getattr(response, 'uncompressed_size', None),
+            )
+        return response
+
+    def _measure_stream(self, response, content, stats, start, view, path):
+        size = 0
+        iterator = iter(content)
+        try:
+            while True:
+                with stats.capture():
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        break
+                size += len(chunk)
+                yield chunk
+        finally:
+            record_request(
+                view, path, stats.queries, stats.seconds, time.perf_counter() - start, size,
+                getattr(response, 'uncompressed_size', None),
+            )
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware limited to text responses of at least COMPRESSION_MIN_BYTES.
+
+    Responses that are compressed already (a Content-Encoding, or a compressed
+    format such as images and fonts) are left alone, and so are responses
+    marked ``Cache-Control: no-transform``. Streaming responses are compressed
+    chunk by chunk, so they still stream. The size before compression is kept
+    in ``response.uncompressed_size`` for RequestMetricsMiddleware.
+    """
+
+    def process_response(self, request, response):
+        if not self._compressible(response):
+            return response
+        if not response.streaming:
+            response.uncompressed_size = len(response.content)
+        elif not response.is_async:
+            response.uncompressed_size = 0
+            response.streaming_content = self._count(response, response.streaming_content)
+        return super().process_response(request, response)
+
+    def _compressible(self, response):
+        if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not any(content_type.startswith(allowed) for allowed in settings.COMPRESSIBLE_CONTENT_TYPES):
+            return False
+        return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_BYTES
+
+    def _count(self, response, content):
+        for chunk in content:
+            response.uncompressed_size += len(chunk)
+            yield chunk
+
+
+class CurrentHotelMiddleware:
+    """Set request.hotel, and log out users whose hotel has been deactivated"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.hotel = get_current_hotel(request)
+        if request.hotel is not None and not request.hotel.is_active:
+            logout(request)
+            request.hotel = None
+            messages.error(request, 'Your hotel account is inactive. Please contact support.')
+            return redirect('login')
+        return self.get_response(request)
+
+
+class StaticFilesMiddleware:
+    """Serve STATIC_ROOT with far-future caching and precompressed copies (see app/static_files.py)"""
+
+    def __init__(self, get_response):
+        if not settings.SERVE_STATIC:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        # The manifest only changes with a deploy, which restarts the process
+        self.immutable = hashed_names()
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        name = request.path[len(self.prefix):]
+        path = static_root_path(name)
+        if path is None:
+            return self.get_response(request)
+        return static_file_response(request, name, path, name in self.immutable)
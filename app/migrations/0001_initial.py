@@ -0,0 +1,141 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:38
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.CharField(max_length=100)),
+                ('guest_name', models.CharField(max_length=200)),
+                ('booking_mode', models.CharField(choices=[('OYO', 'OYO'), ('TA', 'TA'), ('OTA', 'OTA'), ('WALK_IN', 'Walk-in')], max_length=10)),
+                ('payment_mode', models.CharField(choices=[('CASH', 'Cash'), ('UPI', 'UPI'), ('PREPAID', 'Prepaid')], max_length=10)),
+                ('number_of_rooms', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('booking_amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('return_qr', models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking_date', models.DateField(blank=True, null=True)),
+                ('extra_income', models.CharField(blank=True, max_length=10, null=True)),
+                ('not_in_qr', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Booking',
+                'verbose_name_plural': 'Bookings',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Hotel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hotel_name', models.CharField(max_length=200)),
+                ('hotel_code', models.CharField(max_length=50, unique=True)),
+                ('qr_amount', models.IntegerField(default=0, null=True)),
+                ('address', models.TextField()),
+                ('contact_number', models.CharField(max_length=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Hotel',
+                'verbose_name_plural': 'Hotels',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExtraIncome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('KITCHEN', 'Kitchen / Food'), ('MINI_BAR', 'Mini Bar'), ('PARKING', 'Parking'), ('OTHER', 'Other')], max_length=20)),
+                ('date', models.DateField(default=django.utils.timezone.now)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('description', models.CharField(blank=True, max_length=200, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.booking')),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.hotel')),
+            ],
+            options={
+                'verbose_name': 'Extra Income',
+                'verbose_name_plural': 'Extra Incomes',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyExpense',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expense_type', models.CharField(choices=[('STAFF_SALARY', 'Staff Salary / Wages'), ('KITCHEN_GROCERY', 'Kitchen / Grocery'), ('ELECTRICITY_WATER', 'Electricity / Water Bill'), ('MAINTENANCE', 'Maintenance'), ('OTHER', 'Other')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('date', models.DateField(default=django.utils.timezone.now)),
+                ('description', models.CharField(blank=True, max_length=200, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expenses', to='app.hotel')),
+            ],
+            options={
+                'verbose_name': 'Daily Expense',
+                'verbose_name_plural': 'Daily Expenses',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='hotel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.hotel'),
+        ),
+        migrations.CreateModel(
+            name='SimpleBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('guest_name', models.CharField(max_length=200)),
+                ('booking_amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('booking_date', models.DateField(default=django.utils.timezone.now)),
+                ('extra_income', models.CharField(blank=True, max_length=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.hotel')),
+                ('original_booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.booking')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MonthlyReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total_bookings', models.IntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_oyo_due', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_cash_collected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_qr_returned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_extra_income', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('oyo_bookings', models.IntegerField(default=0)),
+                ('ota_bookings', models.IntegerField(default=0)),
+                ('walk_in_bookings', models.IntegerField(default=0)),
+                ('cash_payments', models.IntegerField(default=0)),
+                ('upi_payments', models.IntegerField(default=0)),
+                ('prepaid_payments', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_reports', to='app.hotel')),
+            ],
+            options={
+                'verbose_name': 'Monthly Report',
+                'verbose_name_plural': 'Monthly Reports',
+                'ordering': ['-month'],
+                'unique_together': {('hotel', 'month')},
+            },
+        ),
+    ]
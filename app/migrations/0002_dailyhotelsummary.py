@@ -0,0 +1,168 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:40
+
+from decimal import Decimal
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+# Frozen copy of app.rollups as of this migration, so later changes to the
+# rollups cannot change what this backfill does
+BOOKING_MODES = ['OYO', 'TA', 'OTA', 'WALK_IN']
+PAYMENT_MODES = ['CASH', 'UPI', 'PREPAID']
+OYO_ECOSYSTEM_MODES = ['OYO', 'TA', 'OTA', 'WALK_IN']
+
+BULK_BATCH_SIZE = 500
+
+
+def booking_aggregates():
+    qr_q = Q(booking_mode__in=OYO_ECOSYSTEM_MODES, not_in_qr=False)
+    non_prepaid_q = qr_q & ~Q(payment_mode='PREPAID')
+    prepaid_q = qr_q & Q(payment_mode='PREPAID')
+    not_in_qr_q = Q(booking_mode__in=OYO_ECOSYSTEM_MODES, not_in_qr=True)
+
+    aggregates = {
+        'bookings_count': Count('id'),
+        'bookings_amount': Sum('booking_amount'),
+        'rooms_used': Sum('number_of_rooms'),
+
+        'qr_count': Count('id', filter=non_prepaid_q),
+        'qr_amount': Sum('booking_amount', filter=non_prepaid_q),
+        'qr_returned': Sum('return_qr', filter=non_prepaid_q),
+        'qr_due': Sum(F('booking_amount') - F('return_qr'), filter=non_prepaid_q),
+        'pending_qr_count': Count('id', filter=non_prepaid_q & Q(return_qr__lt=F('booking_amount'))),
+
+        'prepaid_qr_count': Count('id', filter=prepaid_q),
+        'prepaid_qr_amount': Sum('booking_amount', filter=prepaid_q),
+        'prepaid_qr_returned': Sum('return_qr', filter=prepaid_q),
+        'prepaid_qr_due': Sum(F('booking_amount') - F('return_qr'), filter=prepaid_q),
+
+        'not_in_qr_count': Count('id', filter=not_in_qr_q),
+        'not_in_qr_amount': Sum('booking_amount', filter=not_in_qr_q),
+    }
+
+    for mode in BOOKING_MODES:
+        prefix = mode.lower()
+        aggregates[f'{prefix}_count'] = Count('id', filter=Q(booking_mode=mode))
+        aggregates[f'{prefix}_amount'] = Sum('booking_amount', filter=Q(booking_mode=mode))
+
+    for mode in PAYMENT_MODES:
+        prefix = mode.lower()
+        aggregates[f'{prefix}_count'] = Count('id', filter=Q(payment_mode=mode))
+        aggregates[f'{prefix}_amount'] = Sum('booking_amount', filter=Q(payment_mode=mode))
+
+    for mode in OYO_ECOSYSTEM_MODES:
+        prefix = mode.lower()
+        aggregates[f'{prefix}_qr_count'] = Count('id', filter=non_prepaid_q & Q(booking_mode=mode))
+        aggregates[f'{prefix}_qr_amount'] = Sum('booking_amount', filter=non_prepaid_q & Q(booking_mode=mode))
+        aggregates[f'{prefix}_not_in_qr_count'] = Count('id', filter=not_in_qr_q & Q(booking_mode=mode))
+        aggregates[f'{prefix}_not_in_qr_amount'] = Sum('booking_amount', filter=not_in_qr_q & Q(booking_mode=mode))
+
+    return aggregates
+
+
+def build_summaries(apps, schema_editor):
+    Booking = apps.get_model('app', 'Booking')
+    ExtraIncome = apps.get_model('app', 'ExtraIncome')
+    DailyExpense = apps.get_model('app', 'DailyExpense')
+    DailyHotelSummary = apps.get_model('app', 'DailyHotelSummary')
+
+    rows = {}
+
+    def row(hotel_id, day):
+        key = (hotel_id, day)
+        if key not in rows:
+            rows[key] = DailyHotelSummary(hotel_id=hotel_id, date=day)
+        return rows[key]
+
+    booking_groups = (
+        Booking.objects.filter(hotel__isnull=False, booking_date__isnull=False)
+        .order_by()
+        .values('hotel_id', 'booking_date')
+        .annotate(**booking_aggregates())
+    )
+    for group in booking_groups.iterator():
+        summary = row(group.pop('hotel_id'), group.pop('booking_date'))
+        for field, value in group.items():
+            setattr(summary, field, value if value is not None else 0)
+
+    for field, queryset in (
+        ('extra_income', ExtraIncome.objects.filter(hotel__isnull=False)),
+        ('expenses', DailyExpense.objects.all()),
+    ):
+        groups = queryset.order_by().values('hotel_id', 'date').annotate(total=Sum('amount'))
+        for group in groups.iterator():
+            setattr(row(group['hotel_id'], group['date']), field, group['total'] or Decimal('0.00'))
+
+    DailyHotelSummary.objects.bulk_create(rows.values(), batch_size=BULK_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyHotelSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings_count', models.IntegerField(default=0)),
+                ('bookings_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('rooms_used', models.IntegerField(default=0)),
+                ('oyo_count', models.IntegerField(default=0)),
+                ('oyo_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('ta_count', models.IntegerField(default=0)),
+                ('ta_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('ota_count', models.IntegerField(default=0)),
+                ('ota_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('walk_in_count', models.IntegerField(default=0)),
+                ('walk_in_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('cash_count', models.IntegerField(default=0)),
+                ('cash_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('upi_count', models.IntegerField(default=0)),
+                ('upi_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('prepaid_count', models.IntegerField(default=0)),
+                ('prepaid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('qr_count', models.IntegerField(default=0)),
+                ('qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('qr_returned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('qr_due', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('pending_qr_count', models.IntegerField(default=0)),
+                ('prepaid_qr_count', models.IntegerField(default=0)),
+                ('prepaid_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('prepaid_qr_returned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('prepaid_qr_due', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('not_in_qr_count', models.IntegerField(default=0)),
+                ('not_in_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('oyo_qr_count', models.IntegerField(default=0)),
+                ('oyo_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('oyo_not_in_qr_count', models.IntegerField(default=0)),
+                ('oyo_not_in_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('ta_qr_count', models.IntegerField(default=0)),
+                ('ta_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('ta_not_in_qr_count', models.IntegerField(default=0)),
+                ('ta_not_in_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('ota_qr_count', models.IntegerField(default=0)),
+                ('ota_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('ota_not_in_qr_count', models.IntegerField(default=0)),
+                ('ota_not_in_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('walk_in_qr_count', models.IntegerField(default=0)),
+                ('walk_in_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('walk_in_not_in_qr_count', models.IntegerField(default=0)),
+                ('walk_in_not_in_qr_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('extra_income', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='app.hotel')),
+            ],
+            options={
+                'verbose_name': 'Daily Hotel Summary',
+                'verbose_name_plural': 'Daily Hotel Summaries',
+                'ordering': ['-date'],
+                'unique_together': {('hotel', 'date')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
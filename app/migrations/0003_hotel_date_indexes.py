@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_dailyhotelsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['hotel', '-booking_date', '-created_at'], name='booking_hotel_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['hotel', '-created_at'], name='booking_hotel_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyexpense',
+            index=models.Index(fields=['hotel', '-date', '-created_at'], name='expense_hotel_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='extraincome',
+            index=models.Index(fields=['hotel', '-date', '-created_at'], name='income_hotel_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simplebooking',
+            index=models.Index(fields=['hotel', '-booking_date', '-created_at'], name='simplebooking_hotel_date_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_hotel_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyReportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('reports_generated', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Monthly Report Run',
+                'verbose_name_plural': 'Monthly Report Runs',
+                'ordering': ['-month'],
+            },
+        ),
+    ]
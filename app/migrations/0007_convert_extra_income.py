@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+import logging
+from decimal import Decimal, InvalidOperation
+from django.db import migrations, transaction
+
+logger = logging.getLogger('app.migrations')
+
+# Rows converted per transaction, so large tables never hold one long lock
+CHUNK_SIZE = 2000
+
+# Largest value a DecimalField(max_digits=10, decimal_places=2) can hold
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+def parse_amount(value):
+    """Text extra income to Decimal, None for values that are not a valid amount"""
+    try:
+        amount = Decimal(value.strip().replace(',', '')).quantize(Decimal('0.01'))
+    except (InvalidOperation, AttributeError):
+        return None
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        return None
+    return amount
+
+
+def copy_in_chunks(model, source, target, convert):
+    """Copy ``source`` into ``target`` through ``convert``, one chunk per transaction.
+
+    Returns ``[(pk, value)]`` of the rows with a non-blank value that ``convert`` turned into None.
+    """
+    queryset = model.objects.exclude(**{f'{source}__isnull': True}).order_by('pk')
+    unconverted = []
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.filter(pk__gt=last_pk).only('pk', source)[:CHUNK_SIZE])
+            if not rows:
+                return unconverted
+            for row in rows:
+                value = getattr(row, source)
+                converted = convert(value)
+                if converted is None and str(value).strip():
+                    unconverted.append((row.pk, value))
+                setattr(row, target, converted)
+            model.objects.bulk_update(rows, [target])
+        last_pk = rows[-1].pk
+
+
+def log_unparseable(model_name, unparseable):
+    """Report the text amounts that were left empty, so they can be fixed by hand"""
+    if unparseable:
+        logger.warning(
+            '%s: %d extra income values are not amounts and were left empty: %s',
+            model_name, len(unparseable), ', '.join(f'id {pk} {value!r}' for pk, value in unparseable),
+        )
+
+
+def text_to_decimal(apps, schema_editor):
+    for model_name in ('Booking', 'SimpleBooking'):
+        model = apps.get_model('app', model_name)
+        unparseable = copy_in_chunks(model, 'extra_income', 'extra_income_amount', parse_amount)
+        log_unparseable(model_name, unparseable)
+
+
+def decimal_to_text(apps, schema_editor):
+    for model_name in ('Booking', 'SimpleBooking'):
+        model = apps.get_model('app', model_name)
+        copy_in_chunks(model, 'extra_income_amount', 'extra_income', str)
+
+
+class Migration(migrations.Migration):
+
+    # Every chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('app', '0006_extra_income_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(text_to_decimal, decimal_to_text),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_convert_extra_income'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='booking',
+            name='extra_income',
+        ),
+        migrations.RemoveField(
+            model_name='simplebooking',
+            name='extra_income',
+        ),
+        migrations.RenameField(
+            model_name='booking',
+            old_name='extra_income_amount',
+            new_name='extra_income',
+        ),
+        migrations.RenameField(
+            model_name='simplebooking',
+            old_name='extra_income_amount',
+            new_name='extra_income',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_extra_income_decimal'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_hotel_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['hotel', '-booking_date', '-created_at', '-id'], name='booking_hotel_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:50
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from app.search import install_search_index
+    # No-op on other backends, searches fall back to icontains there
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from app.search import uninstall_search_index
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_booking_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
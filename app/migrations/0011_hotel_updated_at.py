@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_booking_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Least
 from decimal import Decimal
 
 class Hotel(models.Model):
@@ -13,7 +14,12 @@ class Hotel(models.Model):
     address = models.TextField()
     contact_number = models.CharField(max_length=15)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Sessions reload their copy of the hotel when it changes (see app/current_hotel.py)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Bumped on every booking, extra income, expense and blackroom booking write (see app/signals.py)
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
+    data_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return f"{self.hotel_name} ({self.hotel_code})"
@@ -22,6 +28,44 @@ class Hotel(models.Model):
         verbose_name = "Hotel"
         verbose_name_plural = "Hotels"
 
+class BookingQuerySet(models.QuerySet):
+    """Query helpers for bookings"""
+    
+    @staticmethod
+    def due_to_oyo_expression():
+        """Database-side equivalent of ``Booking.due_to_oyo``"""
+        zero = models.Value(Decimal('0.00'))
+        calculated_due = models.ExpressionWrapper(
+            models.F('number_of_rooms') * models.F('hotel__qr_amount'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+        return models.Case(
+            models.When(not_in_qr=True, then=zero),
+            # Due can never exceed the booking amount
+            models.When(
+                models.Q(hotel__qr_amount__isnull=False) & ~models.Q(hotel__qr_amount=0),
+                then=Least(calculated_due, models.F('booking_amount')),
+            ),
+            default=zero,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+    
+    def with_due_to_oyo(self):
+        """Annotate each booking with ``due_to_oyo`` computed in the database"""
+        return self.annotate(due_to_oyo=self.due_to_oyo_expression())
+    
+    def totals(self):
+        """Count, booking amount, due to OYO and QR return of the queryset in one query"""
+        totals = self.order_by().aggregate(
+            total_bookings=models.Count('id'),
+            total_amount=models.Sum('booking_amount'),
+            total_due=models.Sum(self.due_to_oyo_expression()),
+            total_qr_return=models.Sum('return_qr'),
+        )
+        for key in ('total_amount', 'total_due', 'total_qr_return'):
+            totals[key] = totals[key] or Decimal('0.00')
+        return totals
+
 class Booking(models.Model):
     """Individual booking entries"""
     BOOKING_MODE_CHOICES = [
@@ -47,15 +91,21 @@ class Booking(models.Model):
     return_qr = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(Decimal('0.00'))])
     created_at = models.DateTimeField(auto_now_add=True)
     booking_date = models.DateField(null=True,blank=True) 
-    extra_income = models.CharField(max_length=10, null=True, blank=True)
+    extra_income = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     not_in_qr = models.BooleanField(default=False)
     
+    objects = BookingQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.booking_id} - {self.guest_name}"
     
     @property
     def due_to_oyo(self):
         """Calculate due amount for ALL booking types based on number of rooms"""
+        # Set by BookingQuerySet.with_due_to_oyo(), avoids loading the hotel
+        if hasattr(self, '_due_to_oyo'):
+            return self._due_to_oyo
+        
         if self.not_in_qr:
             return Decimal('0.00')
         
@@ -66,10 +116,20 @@ class Booking(models.Model):
             return min(due_amount, self.booking_amount)
         return Decimal('0.00')
     
+    @due_to_oyo.setter
+    def due_to_oyo(self, value):
+        self._due_to_oyo = value
+    
     class Meta:
         verbose_name = "Booking"
         verbose_name_plural = "Bookings"
         ordering = ['-created_at']
+        indexes = [
+            # Date range filters and the bookings list ordering, id breaks ties for keyset pages
+            models.Index(fields=['hotel', '-booking_date', '-created_at', '-id'], name='booking_hotel_date_id_idx'),
+            # Recent bookings and created_at based reports
+            models.Index(fields=['hotel', '-created_at'], name='booking_hotel_created_idx'),
+        ]
 class ExtraIncome(models.Model):
     """Extra income sources"""
     INCOME_SOURCE_CHOICES = [
@@ -92,6 +152,9 @@ class ExtraIncome(models.Model):
     class Meta:
         verbose_name = "Extra Income"
         verbose_name_plural = "Extra Incomes"
+        indexes = [
+            models.Index(fields=['hotel', '-date', '-created_at'], name='income_hotel_date_idx'),
+        ]
 
 class DailyExpense(models.Model):
     """Daily expenses"""
@@ -116,6 +179,9 @@ class DailyExpense(models.Model):
     class Meta:
         verbose_name = "Daily Expense"
         verbose_name_plural = "Daily Expenses"
+        indexes = [
+            models.Index(fields=['hotel', '-date', '-created_at'], name='expense_hotel_date_idx'),
+        ]
 class MonthlyReport(models.Model):
     """Monthly aggregated reports"""
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='monthly_reports')
@@ -152,17 +218,122 @@ class MonthlyReport(models.Model):
         ordering = ['-month']
 
 
+class MonthlyReportRun(models.Model):
+    """Lease marking that a month's reports have been claimed by one worker"""
+    month = models.DateField(unique=True)  # First day of the reported month
+    started_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    reports_generated = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"Reports for {self.month.strftime('%B %Y')}"
+    
+    class Meta:
+        verbose_name = "Monthly Report Run"
+        verbose_name_plural = "Monthly Report Runs"
+        ordering = ['-month']
+
+
+class DailyHotelSummary(models.Model):
+    """Per-day rollup of bookings, extra income and expenses for a hotel.
+
+    Kept in sync by the signal handlers in ``app/signals.py`` and rebuilt
+    from scratch with the ``rebuild_daily_summaries`` management command.
+    QR figures only count bookings from the OYO ecosystem modes.
+    """
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+
+    # Booking totals
+    bookings_count = models.IntegerField(default=0)
+    bookings_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    rooms_used = models.IntegerField(default=0)
+
+    # Booking mode breakdown
+    oyo_count = models.IntegerField(default=0)
+    oyo_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    ta_count = models.IntegerField(default=0)
+    ta_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    ota_count = models.IntegerField(default=0)
+    ota_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    walk_in_count = models.IntegerField(default=0)
+    walk_in_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Payment mode breakdown
+    cash_count = models.IntegerField(default=0)
+    cash_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    upi_count = models.IntegerField(default=0)
+    upi_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    prepaid_count = models.IntegerField(default=0)
+    prepaid_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # QR bookings (in QR, not prepaid)
+    qr_count = models.IntegerField(default=0)
+    qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    qr_returned = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    qr_due = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    pending_qr_count = models.IntegerField(default=0)
+
+    # Prepaid QR bookings (in QR, prepaid)
+    prepaid_qr_count = models.IntegerField(default=0)
+    prepaid_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    prepaid_qr_returned = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    prepaid_qr_due = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Bookings not in QR
+    not_in_qr_count = models.IntegerField(default=0)
+    not_in_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # QR breakdown by booking mode
+    oyo_qr_count = models.IntegerField(default=0)
+    oyo_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    oyo_not_in_qr_count = models.IntegerField(default=0)
+    oyo_not_in_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    ta_qr_count = models.IntegerField(default=0)
+    ta_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    ta_not_in_qr_count = models.IntegerField(default=0)
+    ta_not_in_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    ota_qr_count = models.IntegerField(default=0)
+    ota_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    ota_not_in_qr_count = models.IntegerField(default=0)
+    ota_not_in_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    walk_in_qr_count = models.IntegerField(default=0)
+    walk_in_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    walk_in_not_in_qr_count = models.IntegerField(default=0)
+    walk_in_not_in_qr_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Other income and outgoings
+    extra_income = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    expenses = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.hotel.hotel_name} - {self.date}"
+
+    class Meta:
+        unique_together = ['hotel', 'date']
+        verbose_name = "Daily Hotel Summary"
+        verbose_name_plural = "Daily Hotel Summaries"
+        ordering = ['-date']
+
+
 class SimpleBooking(models.Model):
     """Simplified booking model for display purposes"""
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, null=True, blank=True)
     guest_name = models.CharField(max_length=200)
     booking_amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     booking_date = models.DateField(default=timezone.now)  # NEW FIELD
-    extra_income = models.CharField(max_length=10, null=True, blank=True)
+    extra_income = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     # Optional: Add a reference to the original booking if needed
     original_booking = models.OneToOneField(Booking, on_delete=models.CASCADE, null=True, blank=True)
 
     def __str__(self):
-        return f"{self.guest_name} - {self.hotel.name if self.hotel else 'No Hotel'}"
\ No newline at end of file
+        return f"{self.guest_name} - {self.hotel.name if self.hotel else 'No Hotel'}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['hotel', '-booking_date', '-created_at'], name='simplebooking_hotel_date_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,140 @@
+# pagination.py
+import base64
+import json
+from datetime import date, datetime
+from django.db.models import Q
+
+# Keys of the bookings list ordering, all descending; only the first may be NULL
+BOOKING_KEYSET = ('booking_date', 'created_at', 'id')
+
+
+class KeysetPage:
+    """One page of a keyset (cursor) paginated queryset"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # Optional total, only when the caller already knows it
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(values, backwards=False):
+    """Opaque URL-safe cursor for the keyset values of a row"""
+    payload = [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+    raw = json.dumps({'k': payload, 'b': backwards}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(values, backwards)`` of a BOOKING_KEYSET cursor, None when it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        day, created_at, pk = data['k']
+        values = (
+            date.fromisoformat(day) if day is not None else None,
+            datetime.fromisoformat(created_at),
+            int(pk),
+        )
+        return values, bool(data['b'])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def keyset_condition(fields, values, descending):
+    """Rows strictly past ``values`` walking ``fields`` in one direction, all values non-NULL"""
+    lookup = 'lt' if descending else 'gt'
+
+    # (f1, f2, f3) past (v1, v2, v3): f1 beyond v1, or f1 equal and (f2, f3) past (v2, v3)
+    condition = Q(**{f'{fields[-1]}__{lookup}': values[-1]})
+    for field, value in reversed(list(zip(fields[:-1], values[:-1]))):
+        condition = Q(**{f'{field}__{lookup}': value}) | (Q(**{field: value}) & condition)
+
+    # The redundant bound on the leading key lets the database seek the index
+    return Q(**{f'{fields[0]}__{lookup}e': values[0]}) & condition
+
+
+def _take(querysets, limit):
+    """The first ``limit`` rows of several querysets read one after the other"""
+    rows = []
+    for queryset in querysets:
+        if len(rows) >= limit:
+            break
+        rows.extend(queryset[:limit - len(rows)])
+    return rows
+
+
+def keyset_paginate(queryset, cursor=None, per_page=20, fields=BOOKING_KEYSET, total=None):
+    """
+    Paginate a queryset by its keys instead of OFFSET.
+
+    Pages are ordered by ``fields`` descending, so the cost of a page does not
+    grow with how far back it is. Only the first field may be NULL; those rows
+    come after all others and are read as a separate index range.
+    """
+    first, rest = fields[0], fields[1:]
+    descending = ['-' + field for field in fields]
+    ascending = list(fields)
+
+    dated = queryset.filter(**{f'{first}__isnull': False})
+    undated = queryset.filter(**{f'{first}__isnull': True})
+
+    # One extra row tells whether there is another page in this direction
+    limit = per_page + 1
+    decoded = decode_cursor(cursor)
+    backwards = False
+    if decoded is None:
+        segments = [dated.order_by(*descending), undated.order_by(*descending)]
+    else:
+        values, backwards = decoded
+        if values[0] is None:
+            undated_past = undated.filter(keyset_condition(rest, values[1:], descending=not backwards))
+            if backwards:
+                segments = [undated_past.order_by(*ascending), dated.order_by(*ascending)]
+            else:
+                segments = [undated_past.order_by(*descending)]
+        else:
+            dated_past = dated.filter(keyset_condition(fields, values, descending=not backwards))
+            if backwards:
+                segments = [dated_past.order_by(*ascending)]
+            else:
+                segments = [dated_past.order_by(*descending), undated.order_by(*descending)]
+
+    rows = _take(segments, limit)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def key(row):
+        return [getattr(row, field) for field in fields]
+
+    next_cursor = previous_cursor = None
+    if rows:
+        # Walking back we came from an older page; walking forward from a newer one
+        if backwards or has_more:
+            next_cursor = encode_cursor(key(rows[-1]))
+        if has_more if backwards else decoded is not None:
+            previous_cursor = encode_cursor(key(rows[0]), backwards=True)
+
+    return KeysetPage(rows, next_cursor, previous_cursor, total)
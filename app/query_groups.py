@@ -0,0 +1,73 @@
+# query_groups.py
+"""
+Run independent groups of queries of one request concurrently.
+
+Django's async ORM runs every query in the same thread, one after another,
+so it doesn't speed up a single request. Instead each group runs in a thread
+of a bounded pool, with that thread's own database connection, and the
+request waits for the slowest group rather than the sum of all of them.
+QUERY_GROUP_WORKERS sizes the pool, and so the extra connections a process
+may open.
+
+Groups fall back to running one after another on the request's connection
+when the request is inside a transaction, because other connections cannot
+see its uncommitted writes.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from .middleware import CURRENT_QUERY_STATS
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'QUERY_GROUP_WORKERS', 4),
+            thread_name_prefix='query-group',
+        )
+    return _executor
+
+
+def _in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def _run_group(group):
+    """Run one group in a pool thread, the way Django treats a request's connections"""
+    close_old_connections()
+    stats = CURRENT_QUERY_STATS.get()
+    try:
+        if stats is None:
+            return group()
+        # Count the queries of this thread's connections in the request's metrics
+        with stats.capture():
+            return group()
+    finally:
+        close_old_connections()
+
+
+def run_query_groups_sync(groups):
+    """Run ``{name: callable}`` one after another, returns ``{name: result}``"""
+    return {name: group() for name, group in groups.items()}
+
+
+async def run_query_groups(groups):
+    """Run ``{name: callable}`` concurrently, returns ``{name: result}``"""
+    if len(groups) < 2 or await sync_to_async(_in_transaction)():
+        return await sync_to_async(run_query_groups_sync)(groups)
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    futures = [
+        # run_in_executor doesn't carry over context variables by itself
+        loop.run_in_executor(executor, contextvars.copy_context().run, _run_group, group)
+        for group in groups.values()
+    ]
+    results = await asyncio.gather(*futures)
+    return dict(zip(groups, results))
@@ -0,0 +1,202 @@
+# rollups.py
+from django.db import transaction
+from django.db.models import Sum, Count, Q, F, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+from .models import Booking, ExtraIncome, DailyExpense, DailyHotelSummary
+
+# All booking modes are part of the OYO ecosystem for QR calculations
+OYO_ECOSYSTEM_MODES = ['OYO', 'TA', 'OTA', 'WALK_IN']
+
+BULK_BATCH_SIZE = 500
+
+
+def _booking_aggregates():
+    """Aggregate expressions over Booking for every booking column of DailyHotelSummary"""
+    qr_q = Q(booking_mode__in=OYO_ECOSYSTEM_MODES, not_in_qr=False)
+    non_prepaid_q = qr_q & ~Q(payment_mode='PREPAID')
+    prepaid_q = qr_q & Q(payment_mode='PREPAID')
+    not_in_qr_q = Q(booking_mode__in=OYO_ECOSYSTEM_MODES, not_in_qr=True)
+
+    aggregates = {
+        'bookings_count': Count('id'),
+        'bookings_amount': Sum('booking_amount'),
+        'rooms_used': Sum('number_of_rooms'),
+
+        'qr_count': Count('id', filter=non_prepaid_q),
+        'qr_amount': Sum('booking_amount', filter=non_prepaid_q),
+        'qr_returned': Sum('return_qr', filter=non_prepaid_q),
+        'qr_due': Sum(F('booking_amount') - F('return_qr'), filter=non_prepaid_q),
+        'pending_qr_count': Count('id', filter=non_prepaid_q & Q(return_qr__lt=F('booking_amount'))),
+
+        'prepaid_qr_count': Count('id', filter=prepaid_q),
+        'prepaid_qr_amount': Sum('booking_amount', filter=prepaid_q),
+        'prepaid_qr_returned': Sum('return_qr', filter=prepaid_q),
+        'prepaid_qr_due': Sum(F('booking_amount') - F('return_qr'), filter=prepaid_q),
+
+        'not_in_qr_count': Count('id', filter=not_in_qr_q),
+        'not_in_qr_amount': Sum('booking_amount', filter=not_in_qr_q),
+    }
+
+    for mode, _label in Booking.BOOKING_MODE_CHOICES:
+        prefix = mode.lower()
+        aggregates[f'{prefix}_count'] = Count('id', filter=Q(booking_mode=mode))
+        aggregates[f'{prefix}_amount'] = Sum('booking_amount', filter=Q(booking_mode=mode))
+
+    for mode, _label in Booking.PAYMENT_MODE_CHOICES:
+        prefix = mode.lower()
+        aggregates[f'{prefix}_count'] = Count('id', filter=Q(payment_mode=mode))
+        aggregates[f'{prefix}_amount'] = Sum('booking_amount', filter=Q(payment_mode=mode))
+
+    for mode in OYO_ECOSYSTEM_MODES:
+        prefix = mode.lower()
+        aggregates[f'{prefix}_qr_count'] = Count('id', filter=non_prepaid_q & Q(booking_mode=mode))
+        aggregates[f'{prefix}_qr_amount'] = Sum('booking_amount', filter=non_prepaid_q & Q(booking_mode=mode))
+        aggregates[f'{prefix}_not_in_qr_count'] = Count('id', filter=not_in_qr_q & Q(booking_mode=mode))
+        aggregates[f'{prefix}_not_in_qr_amount'] = Sum('booking_amount', filter=not_in_qr_q & Q(booking_mode=mode))
+
+    return aggregates
+
+
+BOOKING_AGGREGATES = _booking_aggregates()
+
+
+def _clean(values):
+    """Replace NULL sums with zero so rows can be written as-is"""
+    return {key: value if value is not None else 0 for key, value in values.items()}
+
+
+def refresh_daily_summary(hotel_id, day):
+    """Recompute the summary row for one hotel and day from the raw tables.
+
+    The row is locked before the totals are read, so concurrent refreshes of
+    the same day run one after the other and the last one writes the newest
+    totals.
+    """
+    if hotel_id is None or day is None:
+        return None
+
+    with transaction.atomic():
+        # Create the row first, so there is one to lock even for a new day
+        DailyHotelSummary.objects.get_or_create(hotel_id=hotel_id, date=day)
+        summary = DailyHotelSummary.objects.select_for_update().get(hotel_id=hotel_id, date=day)
+
+        values = _clean(
+            Booking.objects.filter(hotel_id=hotel_id, booking_date=day)
+            .order_by()
+            .aggregate(**BOOKING_AGGREGATES)
+        )
+        values['extra_income'] = ExtraIncome.objects.filter(
+            hotel_id=hotel_id, date=day
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        values['expenses'] = DailyExpense.objects.filter(
+            hotel_id=hotel_id, date=day
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+        # Nothing left for this day - drop the row instead of keeping zeros
+        if not values['bookings_count'] and not values['extra_income'] and not values['expenses']:
+            summary.delete()
+            return None
+
+        for field, value in values.items():
+            setattr(summary, field, value)
+        summary.save()
+    return summary
+
+
+def rebuild_daily_summaries(hotel_ids=None):
+    """Rebuild DailyHotelSummary from scratch with grouped queries.
+
+    Returns the number of summary rows written.
+    """
+    bookings = Booking.objects.filter(hotel__isnull=False, booking_date__isnull=False)
+    incomes = ExtraIncome.objects.filter(hotel__isnull=False)
+    expenses = DailyExpense.objects.all()
+    existing = DailyHotelSummary.objects.all()
+    if hotel_ids is not None:
+        bookings = bookings.filter(hotel_id__in=hotel_ids)
+        incomes = incomes.filter(hotel_id__in=hotel_ids)
+        expenses = expenses.filter(hotel_id__in=hotel_ids)
+        existing = existing.filter(hotel_id__in=hotel_ids)
+
+    rows = {}
+
+    def row(hotel_id, day):
+        key = (hotel_id, day)
+        if key not in rows:
+            rows[key] = DailyHotelSummary(hotel_id=hotel_id, date=day)
+        return rows[key]
+
+    booking_groups = (
+        bookings.order_by()
+        .values('hotel_id', 'booking_date')
+        .annotate(**BOOKING_AGGREGATES)
+    )
+    for group in booking_groups.iterator():
+        summary = row(group.pop('hotel_id'), group.pop('booking_date'))
+        for field, value in _clean(group).items():
+            setattr(summary, field, value)
+
+    for field, queryset in (('extra_income', incomes), ('expenses', expenses)):
+        groups = queryset.order_by().values('hotel_id', 'date').annotate(total=Sum('amount'))
+        for group in groups.iterator():
+            setattr(row(group['hotel_id'], group['date']), field, group['total'] or Decimal('0.00'))
+
+    with transaction.atomic():
+        existing.delete()
+        DailyHotelSummary.objects.bulk_create(rows.values(), batch_size=BULK_BATCH_SIZE)
+
+    return len(rows)
+
+
+EXTRA_INCOME_DECIMAL = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _expected_extra_income():
+    """Sum of the extra incomes of the outer booking, zero when it has none"""
+    totals = (
+        ExtraIncome.objects.filter(booking=OuterRef('pk'), hotel_id=OuterRef('hotel_id'))
+        .order_by()
+        .values('booking')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return Coalesce(Subquery(totals), Value(Decimal('0.00')), output_field=EXTRA_INCOME_DECIMAL)
+
+
+def _stored_extra_income():
+    """Booking.extra_income, zero when it was never set"""
+    return Coalesce('extra_income', Value(Decimal('0.00')), output_field=EXTRA_INCOME_DECIMAL)
+
+
+def recompute_booking_extra_income(hotel_ids=None, booking_ids=None):
+    """Set Booking.extra_income to the sum of its extra incomes with a single UPDATE.
+
+    Returns the number of bookings updated.
+    """
+    bookings = Booking.objects.all()
+    if hotel_ids is not None:
+        bookings = bookings.filter(hotel_id__in=hotel_ids)
+    if booking_ids is not None:
+        bookings = bookings.filter(pk__in=booking_ids)
+    return bookings.update(extra_income=_expected_extra_income())
+
+
+def apply_booking_extra_income_delta(booking_id, delta):
+    """Add ``delta`` to a booking's extra_income in place, without re-aggregating"""
+    if booking_id is None or not delta:
+        return 0
+    return Booking.objects.filter(pk=booking_id).update(
+        extra_income=_stored_extra_income() + Value(delta, output_field=EXTRA_INCOME_DECIMAL)
+    )
+
+
+def booking_extra_income_drift(hotel_ids=None):
+    """Bookings whose stored extra_income differs from the sum of their extra incomes"""
+    bookings = Booking.objects.all()
+    if hotel_ids is not None:
+        bookings = bookings.filter(hotel_id__in=hotel_ids)
+    return bookings.annotate(
+        stored_extra_income=_stored_extra_income(),
+        expected_extra_income=_expected_extra_income(),
+    ).exclude(stored_extra_income=F('expected_extra_income'))
@@ -0,0 +1,133 @@
+# search.py
+"""
+Full-text search over booking IDs and guest names.
+
+On SQLite the searchable columns are mirrored into FTS5 shadow tables,
+created by migration 0010. Database triggers keep them in sync with every
+write, including ``bulk_create`` and ``QuerySet.update``, which skip model
+signals. A query is split into tokens, and every token must prefix-match a
+token of one of the columns. So "ravi kum" finds "Ravi Kumar" and "oyo-12"
+finds "OYO-12345".
+
+SQLite drops a table's triggers when a migration rebuilds that table. Run
+``manage.py rebuild_search_index`` after such a migration.
+
+The fallback is the plain ``icontains`` filter, which scans every row of the
+hotel. It is used on other backends, on SQLite builds without FTS5, and when
+the triggers are missing. On PostgreSQL a ``pg_trgm`` GIN index on the same
+columns is the equivalent.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Booking, SimpleBooking
+
+# Shadow table and indexed columns per model
+FTS_TABLES = {
+    Booking: ('app_booking_fts', ('booking_id', 'guest_name')),
+    SimpleBooking: ('app_simplebooking_fts', ('guest_name',)),
+}
+
+# Same split the unicode61 tokenizer applies to the indexed text
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+_fts_installed = {}
+
+
+def fts_available(using=connection):
+    """True when the database has the FTS5 shadow tables and the triggers feeding them"""
+    key = (using.alias, using.settings_dict['NAME'])
+    if key not in _fts_installed:
+        installed = False
+        if using.vendor == 'sqlite':
+            expected = set()
+            for table, _columns in FTS_TABLES.values():
+                expected.update({table, f'{table}_ai', f'{table}_ad', f'{table}_au'})
+            with using.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+                installed = expected <= {row[0] for row in cursor.fetchall()}
+        _fts_installed[key] = installed
+    return _fts_installed[key]
+
+
+def match_expression(query):
+    """FTS5 MATCH expression requiring a prefix match of every token, None when there are none"""
+    tokens = TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    # Quoted so FTS5 operators typed by users are taken literally
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def search_queryset(queryset, query):
+    """Filter a Booking or SimpleBooking queryset by a search query"""
+    table, columns = FTS_TABLES[queryset.model]
+    expression = match_expression(query)
+
+    if expression is None or not fts_available(connection):
+        condition = Q()
+        for column in columns:
+            condition |= Q(**{f'{column}__icontains': query})
+        return queryset.filter(condition)
+
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [expression])
+    )
+
+
+def _create_sql(model_table, table, columns):
+    # External content table: the text lives in the model table, FTS5 keeps only the index
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({column_list}, content='{model_table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {model_table} BEGIN "
+        f"INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {model_table} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {column_list} ON {model_table} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+    ]
+
+
+def _drop_sql(table):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_ai',
+        f'DROP TRIGGER IF EXISTS {table}_ad',
+        f'DROP TRIGGER IF EXISTS {table}_au',
+        f'DROP TABLE IF EXISTS {table}',
+    ]
+
+
+def install_search_index(using=connection):
+    """Create (or repair) the FTS5 tables and triggers and index every row.
+
+    Returns False when the database is not SQLite or was built without FTS5.
+    """
+    if using.vendor != 'sqlite':
+        return False
+    with using.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+            return False
+        for model, (table, columns) in FTS_TABLES.items():
+            for statement in _create_sql(model._meta.db_table, table, columns):
+                cursor.execute(statement)
+    _fts_installed.clear()
+    return True
+
+
+def uninstall_search_index(using=connection):
+    """Drop the FTS5 tables and triggers, searches fall back to icontains"""
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        for table, _columns in FTS_TABLES.values():
+            for statement in _drop_sql(table):
+                cursor.execute(statement)
+    _fts_installed.clear()
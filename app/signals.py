@@ -0,0 +1,114 @@
+# signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Hotel, Booking, ExtraIncome, DailyExpense, SimpleBooking
+from .rollups import refresh_daily_summary, apply_booking_extra_income_delta
+from .stats_cache import bump_stats_version, forget_hotel_state
+
+# Field holding the summary date for each model feeding DailyHotelSummary
+ROLLUP_DATE_FIELDS = {
+    Booking: 'booking_date',
+    ExtraIncome: 'date',
+    DailyExpense: 'date',
+}
+
+
+def _rollup_key(instance):
+    """(hotel_id, date) of the summary row an instance counts towards"""
+    field = instance._meta.get_field(ROLLUP_DATE_FIELDS[type(instance)])
+    # Views may assign raw strings and defaults may be datetimes
+    return instance.hotel_id, field.to_python(getattr(instance, field.attname))
+
+
+def _income_amount(instance):
+    """Amount of an extra income as a Decimal, views may assign raw strings"""
+    return instance._meta.get_field('amount').to_python(instance.amount)
+
+
+@receiver(pre_save, sender=Booking)
+@receiver(pre_save, sender=ExtraIncome)
+@receiver(pre_save, sender=DailyExpense)
+def remember_previous_rollup_key(sender, instance, **kwargs):
+    """Remember which day the row counted towards before this save"""
+    instance._previous_rollup_key = None
+    instance._previous_booking_income = None
+    if instance.pk:
+        # Extra incomes also remember the booking and amount they added to Booking.extra_income
+        extra_fields = ('booking_id', 'amount') if sender is ExtraIncome else ()
+        previous = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list('hotel_id', ROLLUP_DATE_FIELDS[sender], *extra_fields)
+            .first()
+        )
+        if previous:
+            instance._previous_rollup_key = previous[:2]
+            if extra_fields:
+                instance._previous_booking_income = previous[2:]
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=ExtraIncome)
+@receiver(post_save, sender=DailyExpense)
+def update_rollup_on_save(sender, instance, **kwargs):
+    """Refresh the daily summary for the new day and the one the row moved from"""
+    key = _rollup_key(instance)
+    refresh_daily_summary(*key)
+
+    previous_key = getattr(instance, '_previous_rollup_key', None)
+    if previous_key and previous_key != key:
+        refresh_daily_summary(*previous_key)
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=ExtraIncome)
+@receiver(post_delete, sender=DailyExpense)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    refresh_daily_summary(*_rollup_key(instance))
+
+
+@receiver(post_save, sender=ExtraIncome)
+def update_booking_extra_income_on_save(sender, instance, **kwargs):
+    """Apply only the change of this income to Booking.extra_income"""
+    amount = _income_amount(instance)
+    previous = getattr(instance, '_previous_booking_income', None)
+    if previous and previous[0] == instance.booking_id:
+        apply_booking_extra_income_delta(instance.booking_id, amount - previous[1])
+        return
+
+    if previous:
+        # Moved to another booking (or detached), take it off the old one
+        apply_booking_extra_income_delta(previous[0], -previous[1])
+    apply_booking_extra_income_delta(instance.booking_id, amount)
+
+
+@receiver(post_delete, sender=ExtraIncome)
+def update_booking_extra_income_on_delete(sender, instance, **kwargs):
+    apply_booking_extra_income_delta(instance.booking_id, -_income_amount(instance))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=ExtraIncome)
+@receiver(post_save, sender=DailyExpense)
+@receiver(post_save, sender=SimpleBooking)
+def bump_stats_version_on_save(sender, instance, **kwargs):
+    """Invalidate cached statistics of the hotel(s) the row belongs to"""
+    bump_stats_version(instance.hotel_id)
+
+    previous_key = getattr(instance, '_previous_rollup_key', None)
+    if previous_key and previous_key[0] != instance.hotel_id:
+        bump_stats_version(previous_key[0])
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=ExtraIncome)
+@receiver(post_delete, sender=DailyExpense)
+@receiver(post_delete, sender=SimpleBooking)
+def bump_stats_version_on_delete(sender, instance, **kwargs):
+    bump_stats_version(instance.hotel_id)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def forget_hotel_state_on_change(sender, instance, **kwargs):
+    """Sessions reload their copy of the hotel on their next request"""
+    forget_hotel_state(instance.pk)
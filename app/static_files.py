@@ -0,0 +1,78 @@
+# static_files.py
+"""
+Serving the collected static files (STATIC_ROOT) from the app.
+
+Hashed names from the collectstatic manifest never change content, so they
+are cached by browsers for STATIC_MAX_AGE seconds without revalidation.
+Other names must be revalidated, which costs a 304 at most. Browsers that
+accept brotli or gzip get the copy compressed at collectstatic time (see
+app/storage.py).
+"""
+import mimetypes
+from pathlib import Path
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+# Preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def hashed_names():
+    """Names collectstatic gave a content hash, empty without a manifest storage"""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            refused = quality and float(quality) == 0
+        except ValueError:
+            refused = False
+        if not refused:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def static_file_response(request, name, path, immutable):
+    """Response for the file ``path``, served as static file ``name``"""
+    stat = path.stat()
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(name)
+        accepted = accepted_encodings(request)
+        variants = [(coding, path.with_name(path.name + suffix)) for coding, suffix in ENCODINGS]
+        variants = [(coding, variant) for coding, variant in variants if variant.is_file()]
+        served = next(((coding, variant) for coding, variant in variants if coding in accepted), None)
+
+        response = FileResponse(
+            open(served[1] if served else path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+            filename=path.name,
+        )
+        if served:
+            response['Content-Encoding'] = served[0]
+        if variants:
+            patch_vary_headers(response, ['Accept-Encoding'])
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if immutable:
+        response['Cache-Control'] = f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def static_root_path(name):
+    """Path of static file ``name`` under STATIC_ROOT, None when it isn't a file there"""
+    root = Path(settings.STATIC_ROOT).resolve()
+    path = (root / name).resolve()
+    if root not in path.parents or not path.is_file():
+        return None
+    return path
@@ -0,0 +1,200 @@
+# stats.py
+from django.db.models import Sum, Q
+from datetime import timedelta
+from decimal import Decimal
+from .models import Booking, DailyHotelSummary
+from .rollups import OYO_ECOSYSTEM_MODES
+from .stats_cache import cached_hotel_stats, period_timeout
+
+ZERO = Decimal('0.00')
+
+
+def _summary_aggregates(hotel, start_date, end_date, today, previous_start, previous_end):
+    """Compute every figure of the dashboard from DailyHotelSummary in a single query"""
+    today_q = Q(date=today)
+    range_q = Q(date__gte=start_date, date__lte=end_date)
+    previous_q = Q(date__gte=previous_start, date__lte=previous_end)
+
+    aggregates = {
+        # Today's stats (always current day, not filtered)
+        'today_count': Sum('bookings_count', filter=today_q),
+        'today_revenue': Sum('bookings_amount', filter=today_q),
+        'today_cash': Sum('cash_amount', filter=today_q),
+        'today_extra_income': Sum('extra_income', filter=today_q),
+        'today_expenses': Sum('expenses', filter=today_q),
+
+        # Filtered period
+        'range_count': Sum('bookings_count', filter=range_q),
+        'range_revenue': Sum('bookings_amount', filter=range_q),
+        'range_rooms': Sum('rooms_used', filter=range_q),
+        'range_extra_income': Sum('extra_income', filter=range_q),
+        'range_expenses': Sum('expenses', filter=range_q),
+        'previous_revenue': Sum('bookings_amount', filter=previous_q),
+    }
+
+    # Per day columns summed over the filtered period
+    for field in (
+        'qr_count', 'qr_amount', 'qr_returned', 'qr_due', 'pending_qr_count',
+        'prepaid_qr_count', 'prepaid_qr_amount', 'prepaid_qr_returned', 'prepaid_qr_due',
+        'not_in_qr_count', 'not_in_qr_amount',
+    ):
+        aggregates[field] = Sum(field, filter=range_q)
+    for mode, _label in Booking.BOOKING_MODE_CHOICES:
+        prefix = mode.lower()
+        for suffix in ('count', 'amount', 'qr_count', 'qr_amount', 'not_in_qr_count', 'not_in_qr_amount'):
+            aggregates[f'{prefix}_{suffix}'] = Sum(f'{prefix}_{suffix}', filter=range_q)
+
+    # A year of history is 365 rows, however many bookings it holds
+    totals = DailyHotelSummary.objects.filter(
+        Q(date__gte=min(start_date, previous_start), date__lte=end_date) | today_q,
+        hotel=hotel,
+    ).aggregate(**aggregates)
+    return totals
+
+
+def _percentage(part, total):
+    return (part / total * 100) if total > 0 else 0
+
+
+def compute_dashboard_stats(hotel, start_date, end_date, today):
+    """
+    Compute every figure shown on the dashboard for a hotel and date range.
+
+    Reads the DailyHotelSummary rollup in a single conditional aggregate
+    query, so the cost depends on the number of days, not bookings.
+    """
+    previous_period_days = (end_date - start_date).days + 1
+    previous_period_start = start_date - timedelta(days=previous_period_days)
+    previous_period_end = start_date - timedelta(days=1)
+
+    totals = _summary_aggregates(hotel, start_date, end_date, today,
+                                 previous_period_start, previous_period_end)
+
+    def amount(key):
+        return totals[key] or ZERO
+
+    def count(key):
+        return totals[key] or 0
+
+    # Today's revenue (bookings + extra income - expenses)
+    today_booking_revenue = amount('today_revenue')
+    today_extra_income = amount('today_extra_income')
+    today_expenses = amount('today_expenses')
+    today_revenue = today_booking_revenue + today_extra_income - today_expenses
+
+    non_prepaid_due = amount('qr_due')
+    prepaid_due = amount('prepaid_qr_due')
+    total_oyo_due = non_prepaid_due + prepaid_due
+
+    # For each not_in_qr booking: difference = booking_amount - hotel_qr_amount
+    hotel_qr_amount = Decimal(str(hotel.qr_amount or 0))
+    not_in_qr_count = count('not_in_qr_count')
+    not_in_qr_total_booking = amount('not_in_qr_amount')
+    not_in_qr_expected_qr = hotel_qr_amount * not_in_qr_count
+    not_in_qr_adjustment = not_in_qr_total_booking - not_in_qr_expected_qr
+
+    adjusted_qr_returned = amount('qr_returned') + not_in_qr_adjustment
+    due_to_oyo = total_oyo_due - not_in_qr_adjustment
+    excess_amount = abs(due_to_oyo) if due_to_oyo < 0 else ZERO
+
+    extra_income = amount('range_extra_income')
+    expenses = amount('range_expenses')
+    current_revenue = amount('range_revenue')
+    total_revenue = current_revenue + extra_income
+    net_profit = total_revenue - expenses
+
+    previous_revenue = amount('previous_revenue')
+    if previous_revenue > 0:
+        revenue_change = ((current_revenue - previous_revenue) / previous_revenue) * 100
+    else:
+        revenue_change = 100 if current_revenue > 0 else 0
+
+    total_bookings_count = count('range_count')
+    qr_bookings_count = count('qr_count') + count('prepaid_qr_count')
+    ecosystem_count = sum(count(f'{mode.lower()}_count') for mode in OYO_ECOSYSTEM_MODES)
+    if ecosystem_count > 0:
+        qr_efficiency_percentage = round((qr_bookings_count / ecosystem_count) * 100, 1)
+    else:
+        qr_efficiency_percentage = 0
+
+    qr_stats_by_mode = {
+        mode: {
+            'qr_count': count(f'{mode.lower()}_qr_count'),
+            'qr_amount': amount(f'{mode.lower()}_qr_amount'),
+            'not_in_qr_count': count(f'{mode.lower()}_not_in_qr_count'),
+            'not_in_qr_amount': amount(f'{mode.lower()}_not_in_qr_amount'),
+        }
+        for mode in OYO_ECOSYSTEM_MODES
+    }
+
+    booking_modes = [
+        {
+            'booking_mode': mode,
+            'count': count(f'{mode.lower()}_count'),
+            'total_revenue': amount(f'{mode.lower()}_amount'),
+        }
+        for mode, _label in Booking.BOOKING_MODE_CHOICES
+        if count(f'{mode.lower()}_count')
+    ]
+
+    return {
+        'stats': {
+            'today': {
+                'bookings': count('today_count'),
+                'revenue': today_revenue,
+                'booking_revenue': today_booking_revenue,
+                'extra_income': today_extra_income,
+                'expenses': today_expenses,
+                'cash': amount('today_cash'),
+                'qr_due': due_to_oyo
+            },
+            'month': {
+                'total_bookings': total_bookings_count,
+                'total_revenue': total_revenue,
+                'total_expenses': expenses,
+                'net_profit': net_profit,
+                'total_rooms_used': count('range_rooms')
+            },
+            'revenue_change': round(revenue_change, 1),
+            'oyo_percentage': round(_percentage(count('oyo_count'), total_bookings_count), 1),
+            'ta_percentage': round(_percentage(count('ta_count'), total_bookings_count), 1),
+            'ota_percentage': round(_percentage(count('ota_count'), total_bookings_count), 1),
+            'walk_in_percentage': round(_percentage(count('walk_in_count'), total_bookings_count), 1),
+        },
+        'qr_stats': {
+            'total_qr_amount': amount('qr_amount'),  # NON-PREPAID OYO ecosystem QR bookings only
+            'total_qr_returned': adjusted_qr_returned,
+            'total_booking_amount': amount('qr_amount'),
+            'due_to_oyo': due_to_oyo,  # Can be negative when OYO owes you money
+            'amount_oyo_owes': excess_amount,
+            'qr_bookings_count': count('qr_count'),
+            'not_in_qr_amount': not_in_qr_total_booking,
+            'not_in_qr_count': not_in_qr_count,
+            'not_in_qr_adjustment': not_in_qr_adjustment,
+            'not_in_qr_expected_qr': not_in_qr_expected_qr,
+            'prepaid_booking_amount': amount('prepaid_qr_amount'),
+            'prepaid_count': count('prepaid_qr_count'),
+            'prepaid_return_qr': amount('prepaid_qr_returned'),
+            'prepaid_due': prepaid_due,
+            'non_prepaid_due': non_prepaid_due,
+            'total_oyo_due': total_oyo_due,
+            'initial_due': total_oyo_due,
+            'excess_amount': excess_amount,
+            'qr_efficiency_percentage': qr_efficiency_percentage,
+            'by_mode': qr_stats_by_mode,
+        },
+        'pending_qr': count('pending_qr_count'),
+        'booking_modes': booking_modes,
+        'expenses': expenses,
+        'extra_income': extra_income,
+    }
+
+
+def get_dashboard_stats(hotel, start_date, end_date, today):
+    """compute_dashboard_stats() served from the per-hotel versioned cache"""
+    return cached_hotel_stats(
+        hotel, 'dashboard',
+        lambda: compute_dashboard_stats(hotel, start_date, end_date, today),
+        start_date, end_date, today,
+        timeout=period_timeout(end_date, today),
+    )
@@ -0,0 +1,187 @@
+# stats_cache.py
+import os
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Hotel
+
+# Cache alias used for statistics, any backend works. The single-flight lock
+# of a miss is a lock file created atomically next to the entries of a
+# FileBasedCache, whose add() is not atomic, and the backend's add() anywhere
+# else. Local-memory caches are per process, so there each worker process
+# computes a missing result once.
+STATS_CACHE_ALIAS = getattr(settings, 'STATS_CACHE_ALIAS', 'default')
+
+# Results for periods that include today change with every new booking
+OPEN_PERIOD_TIMEOUT = 5 * 60
+CLOSED_PERIOD_TIMEOUT = 24 * 60 * 60
+
+# How long a miss waits for another worker computing the same key
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+# Hotel columns every request checks its session copy of the hotel against
+# (see app/current_hotel.py). They are cached until a write drops them; the
+# timeout bounds how long a worker with a cache of its own (local-memory)
+# can miss another worker's writes.
+HOTEL_STATE_FIELDS = ['updated_at', 'data_version', 'data_updated_at']
+HOTEL_STATE_TIMEOUT = 30
+
+
+def _hotel_state_key(hotel_id):
+    return f'hotel-state:{hotel_id}'
+
+
+def hotel_state(hotel_id):
+    """HOTEL_STATE_FIELDS of a hotel by name, None when it doesn't exist.
+
+    Read from the cache, the database is only queried after a write.
+    """
+    cache = caches[STATS_CACHE_ALIAS]
+    key = _hotel_state_key(hotel_id)
+    state = cache.get(key)
+    if state is None:
+        state = Hotel.objects.filter(pk=hotel_id).values(*HOTEL_STATE_FIELDS).first()
+        if state is None:
+            return None
+        cache.set(key, state, timeout=HOTEL_STATE_TIMEOUT)
+    return state
+
+
+def forget_hotel_state(hotel_id):
+    """Make the next request read a hotel's state from the database"""
+    cache = caches[STATS_CACHE_ALIAS]
+    key = _hotel_state_key(hotel_id)
+    cache.delete(key)
+    # Again once committed, a request may have cached the old state meanwhile
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def bump_stats_version(hotel_id):
+    """Invalidate every cached statistic of a hotel after one of its rows changed"""
+    if hotel_id is None:
+        return
+    Hotel.objects.filter(pk=hotel_id).update(
+        data_version=F('data_version') + 1,
+        data_updated_at=timezone.now(),
+    )
+    forget_hotel_state(hotel_id)
+
+
+def stats_cache_key(hotel, name, *parts):
+    """Cache key for a statistic, tied to the hotel's current data version"""
+    parts = ':'.join(str(part) for part in parts)
+    # qr_amount feeds the QR figures, so hotel edits must not serve old numbers
+    return f'stats:{hotel.pk}:{hotel.data_version}:{hotel.qr_amount}:{name}:{parts}'
+
+
+def cached_hotel_stats(hotel, name, compute, *parts, timeout=OPEN_PERIOD_TIMEOUT):
+    """
+    Return ``compute()`` for a hotel, cached until the hotel's data changes.
+
+    Concurrent misses on the same key are single-flight: the first caller
+    computes while the others wait for its result.
+    """
+    cache = caches[STATS_CACHE_ALIAS]
+    key = stats_cache_key(hotel, name, *parts)
+
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = _stats_lock(cache, f'{key}:lock')
+    locked = lock.acquire()
+    if not locked:
+        # Someone else is computing it, wait for their result
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        # The other worker is too slow or died, compute it ourselves
+
+    try:
+        value = compute()
+        cache.set(key, value, timeout=timeout)
+    finally:
+        if locked:
+            lock.release()
+    return value
+
+
+def _stats_lock(cache, lock_key):
+    if isinstance(cache, FileBasedCache):
+        return FileLock(cache._key_to_file(lock_key) + '.lock')
+    return CacheLock(cache, lock_key)
+
+
+class CacheLock:
+    """Lock taken with the cache's add(), released only by the worker that took it"""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.owner = uuid.uuid4().hex
+
+    def acquire(self):
+        return self.cache.add(self.key, self.owner, timeout=LOCK_TIMEOUT)
+
+    def release(self):
+        # After LOCK_TIMEOUT the lock may have expired and been taken by another
+        # worker. Checking first narrows, but cannot close, that window without
+        # a compare-and-delete the cache API doesn't have.
+        if self.cache.get(self.key) == self.owner:
+            self.cache.delete(self.key)
+
+
+class FileLock:
+    """Lock file created with O_EXCL, atomic between processes sharing the directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.owner = uuid.uuid4().hex
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not self._expired():
+                return False
+            # Left behind by a worker that died, take it over once
+            try:
+                os.unlink(self.path)
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except (FileNotFoundError, FileExistsError):
+                return False
+        with os.fdopen(fd, 'w') as lock_file:
+            lock_file.write(self.owner)
+        return True
+
+    def _expired(self):
+        try:
+            return time.time() - os.path.getmtime(self.path) > LOCK_TIMEOUT
+        except FileNotFoundError:
+            return True
+
+    def release(self):
+        try:
+            with open(self.path) as lock_file:
+                if lock_file.read() != self.owner:
+                    return
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def period_timeout(end_date, today):
+    """Closed periods can stay cached much longer than ones still being written"""
+    return CLOSED_PERIOD_TIMEOUT if end_date < today else OPEN_PERIOD_TIMEOUT
@@ -0,0 +1,56 @@
+# storage.py
+"""
+Static files storage of the production profile.
+
+ManifestStaticFilesStorage names every collected file after a hash of its
+content, so StaticFilesMiddleware lets browsers cache those names for a
+year. collectstatic also writes a gzip copy, and a brotli copy when the
+``brotli`` package is installed, next to every hashed text file, so they
+are compressed once at deploy time instead of on every request.
+"""
+import gzip
+import os
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Images and woff/woff2 fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ttf', '.eot', '.otf'}
+
+# A compressed copy must be at least this much smaller to be kept
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def compressed_copies(content):
+    """``{suffix: bytes}`` of the worthwhile compressed versions of ``content``"""
+    copies = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        copies['.br'] = brotli.compress(content, quality=11)
+    return {
+        suffix: compressed for suffix, compressed in copies.items()
+        if len(compressed) < len(content) * MIN_COMPRESSION_RATIO
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also stores precompressed copies of the hashed files"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if os.path.splitext(hashed_name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            with self.open(hashed_name) as original:
+                content = original.read()
+            for suffix, compressed in compressed_copies(content).items():
+                name = hashed_name + suffix
+                if self.exists(name):
+                    self.delete(name)
+                self._save(name, ContentFile(compressed))
+                yield name, name, True
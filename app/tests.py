@@ -1,3 +1,1404 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.test import TestCase, TransactionTestCase, LiveServerTestCase, RequestFactory, override_settings
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction
+from django.db.utils import load_backend
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.http import HttpResponse
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.urls import path, reverse
+from django.utils import timezone
+from django.db.models import F
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from io import BytesIO, StringIO
+import threading
+from contextlib import contextmanager
+import time
+import json
+import csv
+import importlib
+import tempfile
+import glob
+import re
+import gzip
+import os
 
-# Create your tests here.
+from coyos import urls as project_urls
+from coyos.database import database_settings
+
+from .models import (
+    Hotel, Booking, ExtraIncome, DailyExpense, DailyHotelSummary, MonthlyReport, MonthlyReportRun,
+    SimpleBooking,
+)
+from .current_hotel import remember_hotel
+from .importers import import_bookings, read_booking_rows
+from .management.commands.load_test import percentile
+from .metrics import (
+    COUNTERS, DEFAULT_BUDGETS, HISTOGRAMS, REQUEST_QUERIES, REQUESTS_OVER_BUDGET, RESPONSE_BYTES,
+    RESPONSE_UNCOMPRESSED_BYTES, view_budgets,
+)
+from .middleware import CompressionMiddleware
+from .query_groups import run_query_groups
+from .search import fts_available, search_queryset
+from .rollups import rebuild_daily_summaries, refresh_daily_summary, booking_extra_income_drift
+from .stats import compute_dashboard_stats, get_dashboard_stats
+from .stats_cache import FileLock, cached_hotel_stats, stats_cache_key
+from . import utils, views
+from .utils import (
+    check_and_generate_reports, claim_monthly_report_run, generate_monthly_reports_bulk,
+    previous_month_start, run_monthly_reports, schedule_monthly_reports, REPORT_RUN_LEASE_TIMEOUT,
+)
+
+# Maximum number of queries the dashboard page may issue
+DASHBOARD_QUERY_BUDGET = 8
+
+
+def make_booking(hotel, **kwargs):
+    """Create a booking with sensible defaults for tests"""
+    defaults = {
+        'booking_id': 'B1',
+        'guest_name': 'Guest',
+        'booking_mode': 'OYO',
+        'payment_mode': 'CASH',
+        'number_of_rooms': 1,
+        'booking_amount': Decimal('1000.00'),
+        'return_qr': Decimal('0.00'),
+        'booking_date': timezone.now().date(),
+    }
+    defaults.update(kwargs)
+    return Booking.objects.create(hotel=hotel, **defaults)
+
+
+@contextmanager
+def report_checks(months=None):
+    """Record the months schedule_monthly_reports starts a check for, without running the checks"""
+    def check(month):
+        if months is not None:
+            months.append(month)
+        utils._check_lock.release()
+
+    with mock.patch('app.utils._run_monthly_reports_in_background', side_effect=check):
+        yield
+        # Wait for the background thread
+        with utils._check_lock:
+            pass
+
+
+@contextmanager
+def first_dashboard_of_the_month():
+    """Let the dashboard schedule last month's reports as on its first visit of a month"""
+    utils._scheduled_month = utils._next_check_at = None
+    months = []
+    with report_checks(months):
+        yield
+    assert months == [previous_month_start()], months
+
+
+class HotelTestCase(TestCase):
+    """Base test case with a logged-in hotel user"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='hotel', password='secret')
+        cls.hotel = Hotel.objects.create(
+            user=cls.user,
+            hotel_name='Test Hotel',
+            hotel_code='TH1',
+            qr_amount=300,
+            address='Somewhere',
+            contact_number='0000000000',
+        )
+        cls.today = timezone.now().date()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # As after login_view, which stores the hotel in the session
+        session = self.client.session
+        remember_hotel(session, self.user, self.hotel)
+        session.save()
+
+
+class DashboardStatsTests(HotelTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = cls.today
+        make_booking(cls.hotel, booking_mode='OYO', payment_mode='CASH',
+                     booking_amount=Decimal('1000'), return_qr=Decimal('700'))
+        make_booking(cls.hotel, booking_mode='OTA', payment_mode='PREPAID',
+                     booking_amount=Decimal('800'), return_qr=Decimal('500'), number_of_rooms=2)
+        make_booking(cls.hotel, booking_mode='WALK_IN', payment_mode='UPI',
+                     booking_amount=Decimal('500'), not_in_qr=True)
+        make_booking(cls.hotel, booking_mode='TA', payment_mode='CASH',
+                     booking_amount=Decimal('400'), booking_date=today - timedelta(days=1))
+        ExtraIncome.objects.create(hotel=cls.hotel, source='KITCHEN', amount=Decimal('150'), date=today)
+        DailyExpense.objects.create(hotel=cls.hotel, expense_type='OTHER', amount=Decimal('50'), date=today)
+
+    def test_stats_use_one_query(self):
+        with self.assertNumQueries(1):
+            compute_dashboard_stats(self.hotel, self.today, self.today, self.today)
+
+    def test_stats_values(self):
+        result = compute_dashboard_stats(self.hotel, self.today, self.today, self.today)
+        stats, qr_stats = result['stats'], result['qr_stats']
+
+        self.assertEqual(stats['today']['bookings'], 3)
+        self.assertEqual(stats['today']['booking_revenue'], Decimal('2300'))
+        self.assertEqual(stats['today']['revenue'], Decimal('2400'))
+        self.assertEqual(stats['today']['cash'], Decimal('1000'))
+        self.assertEqual(stats['month']['total_rooms_used'], 4)
+        self.assertEqual(stats['revenue_change'], round(Decimal('475.0'), 1))
+        self.assertEqual(qr_stats['qr_bookings_count'], 1)
+        self.assertEqual(qr_stats['prepaid_due'], Decimal('300'))
+        self.assertEqual(qr_stats['non_prepaid_due'], Decimal('300'))
+        self.assertEqual(qr_stats['not_in_qr_adjustment'], Decimal('200'))
+        self.assertEqual(qr_stats['due_to_oyo'], Decimal('400'))
+        self.assertEqual(qr_stats['by_mode']['WALK_IN']['not_in_qr_count'], 1)
+        self.assertEqual(result['pending_qr'], 1)
+        self.assertEqual(result['extra_income'], Decimal('150'))
+        self.assertEqual(result['expenses'], Decimal('50'))
+
+    def test_dashboard_query_budget(self):
+        # Includes scheduling the monthly reports, as on the first dashboard of a month
+        with first_dashboard_of_the_month(), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), DASHBOARD_QUERY_BUDGET)
+
+
+class DailyHotelSummaryTests(HotelTestCase):
+
+    def summary(self, day=None):
+        return DailyHotelSummary.objects.get(hotel=self.hotel, date=day or self.today)
+
+    def test_booking_save_and_delete_update_summary(self):
+        booking = make_booking(self.hotel, booking_amount=Decimal('900'), return_qr=Decimal('600'))
+        summary = self.summary()
+        self.assertEqual(summary.bookings_count, 1)
+        self.assertEqual(summary.qr_due, Decimal('300'))
+
+        # Moving the booking to another day moves it between summary rows
+        yesterday = self.today - timedelta(days=1)
+        booking.booking_date = yesterday
+        booking.save()
+        self.assertFalse(DailyHotelSummary.objects.filter(hotel=self.hotel, date=self.today).exists())
+        self.assertEqual(self.summary(yesterday).oyo_count, 1)
+
+        booking.delete()
+        self.assertFalse(DailyHotelSummary.objects.filter(hotel=self.hotel).exists())
+
+    def test_income_and_expense_update_summary(self):
+        income = ExtraIncome.objects.create(hotel=self.hotel, source='PARKING', amount=Decimal('40'), date=self.today)
+        DailyExpense.objects.create(hotel=self.hotel, expense_type='OTHER', amount=Decimal('25'), date=self.today)
+        self.assertEqual(self.summary().extra_income, Decimal('40'))
+        self.assertEqual(self.summary().expenses, Decimal('25'))
+
+        income.delete()
+        self.assertEqual(self.summary().extra_income, Decimal('0'))
+
+    def test_refresh_locks_the_row_before_reading_totals(self):
+        make_booking(self.hotel)
+        with mock.patch.object(
+            DailyHotelSummary.objects, 'select_for_update', wraps=DailyHotelSummary.objects.select_for_update
+        ) as select_for_update, CaptureQueriesContext(connection) as queries:
+            refresh_daily_summary(self.hotel.id, self.today)
+        select_for_update.assert_called_once()
+        # The row is read locked before the booking totals
+        sql = [query['sql'] for query in queries.captured_queries]
+        summary_read = next(i for i, q in enumerate(sql) if 'app_dailyhotelsummary' in q and q.startswith('SELECT'))
+        booking_read = next(i for i, q in enumerate(sql) if 'FROM "app_booking"' in q)
+        self.assertLess(summary_read, booking_read)
+        self.assertEqual(self.summary().bookings_count, 1)
+
+    def test_rebuild_matches_incremental_rows(self):
+        make_booking(self.hotel, payment_mode='PREPAID', return_qr=Decimal('200'))
+        make_booking(self.hotel, booking_mode='WALK_IN', not_in_qr=True, number_of_rooms=3)
+        ExtraIncome.objects.create(hotel=self.hotel, source='OTHER', amount=Decimal('10'), date=self.today)
+        incremental = DailyHotelSummary.objects.values().get(hotel=self.hotel, date=self.today)
+
+        self.assertEqual(rebuild_daily_summaries(), 1)
+        rebuilt = DailyHotelSummary.objects.values().get(hotel=self.hotel, date=self.today)
+        for row in (incremental, rebuilt):
+            row.pop('id')
+            row.pop('updated_at')
+        self.assertEqual(incremental, rebuilt)
+
+    def test_migration_backfill_matches_incremental_rows(self):
+        from django.apps import apps
+        make_booking(self.hotel, payment_mode='UPI', return_qr=Decimal('100'))
+        make_booking(self.hotel, booking_mode='OTA', not_in_qr=True)
+        DailyExpense.objects.create(hotel=self.hotel, expense_type='OTHER', amount=Decimal('15'), date=self.today)
+        incremental = DailyHotelSummary.objects.values().get(hotel=self.hotel, date=self.today)
+
+        DailyHotelSummary.objects.all().delete()
+        migration = importlib.import_module('app.migrations.0002_dailyhotelsummary')
+        migration.build_summaries(apps, None)
+        backfilled = DailyHotelSummary.objects.values().get(hotel=self.hotel, date=self.today)
+        for row in (incremental, backfilled):
+            row.pop('id')
+            row.pop('updated_at')
+        self.assertEqual(incremental, backfilled)
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_queries_do_not_scan_tables(self):
+        # Raises CommandError when any plan contains a full table scan
+        call_command('check_query_plans', stdout=StringIO())
+
+
+class BookingListTests(HotelTestCase):
+
+    def test_edit_data_limited_to_current_page(self):
+        for i in range(25):
+            make_booking(self.hotel, booking_id=f'B{i}')
+        response = self.client.get(reverse('booking'))
+        self.assertEqual(len(json.loads(response.context['booking_data_json'])), 20)
+
+    def test_keyset_pages_match_offset_ordering(self):
+        days = [self.today - timedelta(days=i % 7) for i in range(45)]
+        for i, day in enumerate(days):
+            make_booking(self.hotel, booking_id=f'K{i}', booking_date=day)
+        make_booking(self.hotel, booking_id='NODATE', booking_date=None)
+        expected = list(
+            Booking.objects.order_by(F('booking_date').desc(nulls_last=True), '-created_at', '-id')
+            .values_list('booking_id', flat=True)
+        )
+
+        seen, cursors, cursor = [], [], None
+        while True:
+            response = self.client.get(reverse('booking'), {'cursor': cursor} if cursor else {})
+            page = response.context['page_obj']
+            self.assertEqual(page.total, 46)
+            seen.extend(booking.booking_id for booking in page)
+            cursors.append(page.previous_cursor)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(seen[-1], 'NODATE')
+
+        # Walking back from the last page returns the previous pages unchanged
+        response = self.client.get(reverse('booking'), {'cursor': cursors[-1]})
+        self.assertEqual([b.booking_id for b in response.context['page_obj']], expected[20:40])
+        response = self.client.get(reverse('booking'), {'cursor': response.context['page_obj'].previous_cursor})
+        page = response.context['page_obj']
+        self.assertEqual([b.booking_id for b in page], expected[:20])
+        self.assertFalse(page.has_previous)
+
+    def test_page_numbers_still_work(self):
+        for i in range(25):
+            make_booking(self.hotel, booking_id=f'B{i}')
+        response = self.client.get(reverse('booking'), {'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_due_to_oyo_annotation_matches_property(self):
+        make_booking(self.hotel, number_of_rooms=2, booking_amount=Decimal('1000'))
+        make_booking(self.hotel, number_of_rooms=5, booking_amount=Decimal('1000'))
+        make_booking(self.hotel, not_in_qr=True)
+
+        expected = [Booking.objects.get(pk=b.pk).due_to_oyo for b in Booking.objects.order_by('pk')]
+        with self.assertNumQueries(1):
+            annotated = [b.due_to_oyo for b in Booking.objects.order_by('pk').with_due_to_oyo()]
+        self.assertEqual(annotated, expected)
+        self.assertEqual(Booking.objects.totals()['total_due'], Decimal('1600'))
+
+    def test_booking_data_endpoint(self):
+        booking = make_booking(self.hotel, booking_id='OYO123')
+        response = self.client.get(reverse('booking_data', args=[booking.id]))
+        self.assertEqual(response.json()['booking_id'], 'OYO123')
+
+        other_user = User.objects.create_user(username='other', password='secret')
+        Hotel.objects.create(user=other_user, hotel_name='Other', hotel_code='OT1', address='-', contact_number='1')
+        self.client.force_login(other_user)
+        response = self.client.get(reverse('booking_data', args=[booking.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class MonthlyReportRunTests(HotelTestCase):
+
+    def test_reports_generated_once_per_month(self):
+        self.assertEqual(check_and_generate_reports(), 1)
+        self.assertEqual(check_and_generate_reports(), 0)
+        self.assertEqual(MonthlyReport.objects.filter(hotel=self.hotel).count(), 1)
+        self.assertIsNotNone(MonthlyReportRun.objects.get(month=previous_month_start()).completed_at)
+
+    def test_claim_is_exclusive_until_lease_expires(self):
+        month = previous_month_start()
+        self.assertIsNotNone(claim_monthly_report_run(month))
+        self.assertIsNone(claim_monthly_report_run(month))
+
+        # A worker that died mid-run loses its lease after the timeout
+        MonthlyReportRun.objects.filter(month=month).update(
+            started_at=timezone.now() - REPORT_RUN_LEASE_TIMEOUT - timedelta(minutes=1)
+        )
+        self.assertIsNotNone(claim_monthly_report_run(month))
+
+
+class ScheduleMonthlyReportsTests(HotelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        utils._scheduled_month = None
+        utils._next_check_at = None
+        self.month = previous_month_start()
+
+    def schedule(self):
+        """Run schedule_monthly_reports, returns the months it started a check for"""
+        months = []
+        with report_checks(months), self.assertNumQueries(0):
+            schedule_monthly_reports()
+        return months
+
+    def test_checks_in_the_background_without_queries(self):
+        self.assertEqual(self.schedule(), [self.month])
+        # Not again before REPORT_RUN_RECHECK_INTERVAL
+        self.assertEqual(self.schedule(), [])
+        utils._next_check_at = None
+        self.assertEqual(self.schedule(), [self.month])
+
+    def test_one_check_at_a_time(self):
+        with utils._check_lock, mock.patch('app.utils._run_monthly_reports_in_background') as check:
+            schedule_monthly_reports()
+        check.assert_not_called()
+
+    def test_claims_and_then_stops_checking(self):
+        self.assertEqual(run_monthly_reports(self.month), 1)
+        self.assertTrue(MonthlyReport.objects.filter(hotel=self.hotel, month=self.month).exists())
+        utils._next_check_at = None
+        self.assertEqual(self.schedule(), [])
+
+    def test_waits_for_a_live_claim_and_takes_over_an_expired_one(self):
+        claim_monthly_report_run(self.month)
+        self.assertEqual(run_monthly_reports(self.month), 0)
+        # Not remembered, the other worker may still die
+        self.assertIsNone(utils._scheduled_month)
+
+        MonthlyReportRun.objects.filter(month=self.month).update(
+            started_at=timezone.now() - REPORT_RUN_LEASE_TIMEOUT - timedelta(minutes=1)
+        )
+        self.assertEqual(run_monthly_reports(self.month), 1)
+        self.assertIsNotNone(MonthlyReportRun.objects.get(month=self.month).completed_at)
+        self.assertEqual(utils._scheduled_month, self.month)
+
+    def test_completed_runs_are_not_checked_again(self):
+        check_and_generate_reports()
+        self.assertEqual(run_monthly_reports(self.month), 0)
+        self.assertEqual(utils._scheduled_month, self.month)
+        utils._next_check_at = None
+        self.assertEqual(self.schedule(), [])
+
+    def test_failures_are_logged(self):
+        utils._check_lock.acquire()
+        with mock.patch('app.utils.generate_monthly_reports_bulk', side_effect=RuntimeError('boom')), \
+                mock.patch('app.utils.connection'):
+            with self.assertLogs('app.utils', level='ERROR') as logs:
+                utils._run_monthly_reports_in_background(self.month)
+        self.assertIn('Error generating monthly reports', logs.output[0])
+        # The next check can start
+        self.assertFalse(utils._check_lock.locked())
+
+
+class BulkMonthlyReportTests(HotelTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_hotel = Hotel.objects.create(
+            user=User.objects.create_user(username='other', password='secret'),
+            hotel_name='Other Hotel',
+            hotel_code='OH1',
+            address='Elsewhere',
+            contact_number='1111111111',
+        )
+        cls.month = cls.today.replace(day=1)
+        make_booking(cls.hotel, booking_amount=Decimal('1000'), return_qr=Decimal('700'))
+        make_booking(cls.hotel, booking_mode='OTA', payment_mode='UPI', booking_amount=Decimal('500'))
+        ExtraIncome.objects.create(hotel=cls.hotel, source='OTHER', amount=Decimal('100'))
+        DailyExpense.objects.create(hotel=cls.hotel, expense_type='OTHER', amount=Decimal('300'))
+
+    def test_reports_for_all_hotels_use_constant_queries(self):
+        with self.assertNumQueries(6):
+            generated, skipped = generate_monthly_reports_bulk(self.month)
+        self.assertEqual((generated, skipped), (2, 0))
+
+        report = MonthlyReport.objects.get(hotel=self.hotel, month=self.month)
+        self.assertEqual(report.total_bookings, 2)
+        self.assertEqual(report.total_revenue, Decimal('1600'))
+        self.assertEqual(report.total_oyo_due, Decimal('300'))
+        self.assertEqual(report.net_profit, Decimal('1300'))
+        self.assertEqual(report.upi_payments, 1)
+        self.assertEqual(MonthlyReport.objects.get(hotel=self.other_hotel).total_bookings, 0)
+
+    def test_existing_reports_kept_unless_forced(self):
+        generate_monthly_reports_bulk(self.month)
+        make_booking(self.hotel)
+        self.assertEqual(generate_monthly_reports_bulk(self.month), (0, 2))
+        self.assertEqual(MonthlyReport.objects.get(hotel=self.hotel).total_bookings, 2)
+
+        self.assertEqual(generate_monthly_reports_bulk(self.month, force=True), (2, 0))
+        self.assertEqual(MonthlyReport.objects.get(hotel=self.hotel).total_bookings, 3)
+
+    def test_backfill_command_over_month_range(self):
+        previous = previous_month_start()
+        out = StringIO()
+        call_command(
+            'generate_monthly_reports',
+            '--from', previous.strftime('%Y-%m'), '--to', self.month.strftime('%Y-%m'),
+            stdout=out,
+        )
+        self.assertEqual(MonthlyReport.objects.count(), 4)
+        self.assertIn('Generated: 4 reports', out.getvalue())
+        self.assertIn('Failed: 0 reports', out.getvalue())
+
+    def test_month_and_range_are_exclusive(self):
+        month = self.month.strftime('%Y-%m')
+        with self.assertRaisesMessage(CommandError, 'not both'):
+            call_command('generate_monthly_reports', '--month', month, '--from', month, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, '--to needs --from'):
+            call_command('generate_monthly_reports', '--to', month, stdout=StringIO())
+        self.assertFalse(MonthlyReport.objects.exists())
+
+
+class BlackroomTests(HotelTestCase):
+
+    def get_blackroom(self, start_date):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blackroom'), {
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': self.today.strftime('%Y-%m-%d'),
+            })
+        return response, len(queries)
+
+    def test_chart_series_and_constant_queries(self):
+        SimpleBooking.objects.create(hotel=self.hotel, guest_name='A', booking_amount=Decimal('100'),
+                                     booking_date=self.today, extra_income=Decimal('20.50'))
+        SimpleBooking.objects.create(hotel=self.hotel, guest_name='B', booking_amount=Decimal('50'),
+                                     booking_date=self.today - timedelta(days=70))
+        # The first request after a write reads the hotel state again
+        self.client.get(reverse('blackroom'))
+
+        response, short_range_queries = self.get_blackroom(self.today - timedelta(days=10))
+        self.assertEqual(response.context['daily_data'][-1], 120.5)
+        self.assertEqual(response.context['total_extra_income'], Decimal('20.50'))
+        self.assertEqual(len(response.context['daily_data']), self.today.day)
+
+        response, long_range_queries = self.get_blackroom(self.today.replace(year=self.today.year - 2, day=1))
+        monthly_data = response.context['monthly_data']
+        self.assertEqual(len(monthly_data), 25)
+        self.assertEqual(monthly_data[-1]['total'], 120.5)
+        self.assertEqual(sum(month['bookings_count'] for month in monthly_data), 2)
+        self.assertEqual(short_range_queries, long_range_queries)
+
+    def test_extra_income_migration_parses_text_amounts(self):
+        migration = importlib.import_module('app.migrations.0007_convert_extra_income')
+        self.assertEqual(migration.parse_amount(' 1,200.5 '), Decimal('1200.50'))
+        self.assertIsNone(migration.parse_amount(''))
+        self.assertIsNone(migration.parse_amount('abc'))
+        self.assertIsNone(migration.parse_amount('9999999999'))
+
+    def test_extra_income_migration_reports_unparseable_amounts(self):
+        migration = importlib.import_module('app.migrations.0007_convert_extra_income')
+        valid = make_booking(self.hotel, booking_id='12.50')
+        invalid = make_booking(self.hotel, booking_id='B-17')
+        # booking_id stands in for the old text column
+        unparseable = migration.copy_in_chunks(Booking, 'booking_id', 'extra_income', migration.parse_amount)
+        self.assertEqual(unparseable, [(invalid.pk, 'B-17')])
+        valid.refresh_from_db()
+        self.assertEqual(valid.extra_income, Decimal('12.50'))
+
+        with self.assertLogs('app.migrations', 'WARNING') as logs:
+            migration.log_unparseable('Booking', unparseable)
+        self.assertIn(f'id {invalid.pk}', logs.output[0])
+        self.assertIn("'B-17'", logs.output[0])
+
+
+class StatsCacheTests(HotelTestCase):
+
+    def test_dashboard_stats_cached_until_hotel_data_changes(self):
+        make_booking(self.hotel)
+        self.hotel.refresh_from_db()
+        with self.assertNumQueries(1):
+            get_dashboard_stats(self.hotel, self.today, self.today, self.today)
+        with self.assertNumQueries(0):
+            stats = get_dashboard_stats(self.hotel, self.today, self.today, self.today)
+        self.assertEqual(stats['stats']['today']['bookings'], 1)
+
+        make_booking(self.hotel)
+        self.hotel.refresh_from_db()
+        stats = get_dashboard_stats(self.hotel, self.today, self.today, self.today)
+        self.assertEqual(stats['stats']['today']['bookings'], 2)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cached_hotel_stats(self.hotel, 'slow', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+
+    def test_lock_of_another_worker_is_not_released(self):
+        lock_key = f'{stats_cache_key(self.hotel, "slow")}:lock'
+
+        def compute():
+            # Our lock expired during a slow computation and another worker took it
+            cache.set(lock_key, 'other-worker')
+            return {'value': 42}
+
+        cached_hotel_stats(self.hotel, 'slow', compute)
+        self.assertEqual(cache.get(lock_key), 'other-worker')
+
+        cache.clear()
+        cache.add(lock_key, 'other-worker')
+        with mock.patch('app.stats_cache.WAIT_TIMEOUT', 0.1):
+            self.assertEqual(cached_hotel_stats(self.hotel, 'slow', lambda: {'value': 42}), {'value': 42})
+        self.assertEqual(cache.get(lock_key), 'other-worker')
+
+
+class FileCacheStatsTests(HotelTestCase):
+    """Single-flight on the file cache (COYOS_CACHE_DIR), whose add() is not atomic"""
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir.name,
+        }})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cached_hotel_stats(self.hotel, 'slow', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+
+    def test_lock_files(self):
+        path = cache._key_to_file(f'{stats_cache_key(self.hotel, "slow")}:lock') + '.lock'
+        first, second = FileLock(path), FileLock(path)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        # Only the owner removes the lock
+        second.release()
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+
+        # A lock left behind by a dead worker is taken over once it expired
+        with mock.patch('app.stats_cache.LOCK_TIMEOUT', -1):
+            self.assertTrue(first.acquire())
+        second.release()
+        self.assertTrue(os.path.exists(path))
+
+
+class DashboardStatsApiTests(HotelTestCase):
+
+    def test_conditional_get(self):
+        make_booking(self.hotel, booking_amount=Decimal('750'))
+        url = reverse('dashboard_stats_api')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stats']['today']['bookings'], 1)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with mock.patch('app.views.get_dashboard_stats') as compute:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        compute.assert_not_called()
+
+        make_booking(self.hotel)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stats']['today']['bookings'], 2)
+
+        # Changing the QR amount changes the figures without touching the bookings
+        etag = response['ETag']
+        self.hotel.refresh_from_db()
+        self.hotel.qr_amount = 500
+        self.hotel.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_dates(self):
+        response = self.client.get(reverse('dashboard_stats_api'), {'start_date': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CsvExportTests(HotelTestCase):
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        return list(csv.reader(line.decode() for line in response.streaming_content))
+
+    def test_bookings_export_applies_filters(self):
+        make_booking(self.hotel, booking_id='OLD', booking_date=self.today - timedelta(days=40))
+        make_booking(self.hotel, booking_id='NEW', guest_name='Asha', booking_amount=Decimal('500'))
+
+        response = self.client.get(reverse('export_bookings'), {'search': 'asha'})
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0][0], 'Booking ID')
+        self.assertEqual([row[0] for row in rows[1:]], ['NEW'])
+        # Due to OYO is min(rooms * qr_amount, booking amount)
+        self.assertEqual(Decimal(rows[1][7]), Decimal('300'))
+
+        rows = self.read_csv(self.client.get(reverse('export_bookings')))
+        self.assertEqual([row[0] for row in rows[1:]], ['NEW', 'OLD'])
+
+        response = self.client.get(reverse('export_bookings'), {'start_date': 'x', 'end_date': 'y'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_income_and_expense_exports(self):
+        ExtraIncome.objects.create(hotel=self.hotel, source='KITCHEN', amount=Decimal('120'), date=self.today)
+        DailyExpense.objects.create(hotel=self.hotel, expense_type='OTHER', amount=Decimal('80'), date=self.today)
+        DailyExpense.objects.create(
+            hotel=self.hotel, expense_type='MAINTENANCE', amount=Decimal('10'),
+            date=self.today - timedelta(days=10),
+        )
+
+        rows = self.read_csv(self.client.get(reverse('export_extra_income')))
+        self.assertEqual(rows[1][1:4], ['KITCHEN', '', '120.00'])
+
+        rows = self.read_csv(self.client.get(reverse('export_expenses')))
+        self.assertEqual(len(rows), 3)
+
+        today = self.today.isoformat()
+        rows = self.read_csv(self.client.get(reverse('export_expenses'), {'start_date': today, 'end_date': today}))
+        self.assertEqual([row[1] for row in rows[1:]], ['OTHER'])
+
+    def test_formulas_are_not_exported(self):
+        make_booking(self.hotel, guest_name='=HYPERLINK("http://evil.example","Click")')
+        DailyExpense.objects.create(hotel=self.hotel, expense_type='OTHER', amount=Decimal('80'),
+                                    date=self.today, description='@SUM(A1:A9)')
+        ExtraIncome.objects.create(hotel=self.hotel, source='OTHER', amount=Decimal('5'),
+                                   date=self.today, description='-2+3')
+
+        rows = self.read_csv(self.client.get(reverse('export_bookings')))
+        self.assertEqual(rows[1][1], '\'=HYPERLINK("http://evil.example","Click")')
+        # Numbers are left alone
+        self.assertEqual(rows[1][6], '1000.00')
+        rows = self.read_csv(self.client.get(reverse('export_expenses')))
+        self.assertEqual(rows[1][3], "'@SUM(A1:A9)")
+        rows = self.read_csv(self.client.get(reverse('export_extra_income')))
+        self.assertEqual(rows[1][4], "'-2+3")
+
+
+class BookingImportTests(HotelTestCase):
+
+    CSV = (
+        'Booking ID,Guest Name,Booking Date,Booking Mode,Payment Mode,Rooms,Booking Amount,Not in QR\n'
+        'IMP1,Asha,{today},OYO,Cash,1,1000,\n'
+        'IMP2,Ravi,{today},Walk-in,UPI,2,500,\n'
+        'IMP3,Mira,{today},TA,CASH,1,800,yes\n'
+        'IMP4,,{today},OYO,CASH,1,abc,\n'
+        'IMP1,Asha again,{today},OYO,CASH,1,1000,\n'
+    )
+
+    def csv_file(self):
+        return StringIO(self.CSV.format(today=self.today.isoformat()))
+
+    def test_import_bookings_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            created, errors = import_bookings(self.hotel, read_booking_rows(self.csv_file()), batch_size=2)
+
+        self.assertEqual(created, 3)
+        self.assertEqual([line for line, _booking_id, _message in errors], [5, 6])
+        self.assertIn('already exists', errors[1][2])
+        # Batches are inserted with bulk_create, not one INSERT per row
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "app_booking"')]
+        self.assertEqual(len(inserts), 2)
+
+        bookings = {b.booking_id: b for b in Booking.objects.filter(hotel=self.hotel)}
+        self.assertEqual(bookings['IMP1'].return_qr, Decimal('700.00'))
+        self.assertEqual(bookings['IMP2'].booking_mode, 'WALK_IN')
+        self.assertEqual(bookings['IMP2'].return_qr, Decimal('0.00'))
+        self.assertTrue(bookings['IMP3'].not_in_qr)
+
+        # The rollup and the stats version are maintained despite bulk_create
+        summary = DailyHotelSummary.objects.get(hotel=self.hotel, date=self.today)
+        self.assertEqual(summary.bookings_count, 3)
+        self.hotel.refresh_from_db()
+        self.assertGreater(self.hotel.data_version, 0)
+
+    def test_dry_run_and_reimport(self):
+        created, _errors = import_bookings(self.hotel, read_booking_rows(self.csv_file()), dry_run=True)
+        self.assertEqual(created, 3)
+        self.assertFalse(Booking.objects.exists())
+
+        import_bookings(self.hotel, read_booking_rows(self.csv_file()))
+        created, errors = import_bookings(self.hotel, read_booking_rows(self.csv_file()))
+        self.assertEqual(created, 0)
+        self.assertEqual(len(errors), 5)
+
+    def test_upload_view(self):
+        upload = SimpleUploadedFile(
+            'bookings.csv', self.CSV.format(today=self.today.isoformat()).encode(), content_type='text/csv'
+        )
+        response = self.client.post(reverse('import_bookings'), {'csv_file': upload}, follow=True)
+        self.assertRedirects(response, reverse('booking'))
+        self.assertEqual(Booking.objects.filter(hotel=self.hotel).count(), 3)
+        self.assertContains(response, 'Line 5')
+
+
+class BookingExtraIncomeTests(HotelTestCase):
+
+    def extra_income(self, booking):
+        booking.refresh_from_db()
+        return Decimal(booking.extra_income or '0')
+
+    def test_incremental_updates(self):
+        first = make_booking(self.hotel, booking_id='B1')
+        second = make_booking(self.hotel, booking_id='B2')
+
+        income = ExtraIncome.objects.create(hotel=self.hotel, booking=first, source='KITCHEN', amount=Decimal('100'))
+        ExtraIncome.objects.create(hotel=self.hotel, booking=first, source='PARKING', amount=Decimal('50'))
+        self.assertEqual(self.extra_income(first), Decimal('150'))
+
+        income.amount = Decimal('120')
+        income.save()
+        self.assertEqual(self.extra_income(first), Decimal('170'))
+
+        income.booking = second
+        income.save()
+        self.assertEqual(self.extra_income(first), Decimal('50'))
+        self.assertEqual(self.extra_income(second), Decimal('120'))
+
+        income.delete()
+        self.assertEqual(self.extra_income(second), Decimal('0'))
+
+    def test_update_view_applies_delta(self):
+        booking = make_booking(self.hotel)
+        income = ExtraIncome.objects.create(hotel=self.hotel, booking=booking, source='KITCHEN', amount=Decimal('100'))
+        self.client.post(reverse('update_extra_income'), {
+            'id': income.id, 'operation': 'add', 'amount_change': '25', 'source': 'KITCHEN',
+            'description': '', 'booking': booking.id,
+        })
+        self.assertEqual(self.extra_income(booking), Decimal('125'))
+
+    def test_reconcile_command(self):
+        bookings = [make_booking(self.hotel, booking_id=f'B{i}') for i in range(3)]
+        for booking in bookings:
+            ExtraIncome.objects.create(hotel=self.hotel, booking=booking, source='OTHER', amount=Decimal('40'))
+        Booking.objects.filter(pk=bookings[0].pk).update(extra_income='999')
+        Booking.objects.filter(pk=bookings[1].pk).update(extra_income=None)
+
+        out = StringIO()
+        call_command('reconcile_extra_income', '--dry-run', stdout=out)
+        self.assertIn('2 bookings have drifted', out.getvalue())
+        self.assertEqual(self.extra_income(bookings[0]), Decimal('999'))
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reconcile_extra_income', '--hotel-id', str(self.hotel.id), stdout=StringIO())
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+        for booking in bookings:
+            self.assertEqual(self.extra_income(booking), Decimal('40'))
+        self.assertFalse(booking_extra_income_drift().exists())
+
+
+class BookingSearchTests(HotelTestCase):
+
+    def search(self, query):
+        response = self.client.get(reverse('booking'), {'search': query})
+        return sorted(booking.booking_id for booking in response.context['page_obj'])
+
+    def test_prefix_and_token_search(self):
+        self.assertTrue(fts_available())
+        make_booking(self.hotel, booking_id='OYO-12345', guest_name='Ravi Kumar')
+        make_booking(self.hotel, booking_id='MMT-777', guest_name='José Fernandes')
+        make_booking(self.hotel, booking_id='OYO-99', guest_name='Anita Rao')
+
+        self.assertEqual(self.search('ravi kum'), ['OYO-12345'])
+        self.assertEqual(self.search('oyo'), ['OYO-12345', 'OYO-99'])
+        self.assertEqual(self.search('OYO-123'), ['OYO-12345'])
+        self.assertEqual(self.search('jose'), ['MMT-777'])
+        # FTS5 syntax typed by users is taken literally
+        self.assertEqual(self.search('rao "*'), ['OYO-99'])
+        self.assertEqual(self.search('kumar OR anita'), [])
+
+    def test_index_follows_writes(self):
+        booking = make_booking(self.hotel, booking_id='B1', guest_name='Meera')
+        Booking.objects.filter(pk=booking.pk).update(guest_name='Leela')
+        self.assertEqual(self.search('meera'), [])
+        self.assertEqual(self.search('lee'), ['B1'])
+
+        SimpleBooking.objects.create(hotel=self.hotel, guest_name='Walk In Guest', booking_amount=Decimal('100'))
+        self.assertEqual(search_queryset(SimpleBooking.objects.all(), 'walk gu').count(), 1)
+
+        booking.delete()
+        self.assertEqual(self.search('lee'), [])
+
+    def test_icontains_fallback(self):
+        make_booking(self.hotel, booking_id='OYO-12345', guest_name='Ravi Kumar')
+        with mock.patch('app.search.fts_available', return_value=False):
+            self.assertEqual(self.search('avi'), ['OYO-12345'])
+
+
+class DatabaseProfileTests(TestCase):
+
+    def test_sqlite_profile_on_a_file_database(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            settings_dict = database_settings({'COYOS_SQLITE_PATH': f'{tmpdir}/coyos.sqlite3'}, tmpdir)['default']
+            self.assertTrue(settings_dict['CONN_MAX_AGE'] > 0)
+            self.assertTrue(settings_dict['CONN_HEALTH_CHECKS'])
+            # busy_timeout is set by the pragma alone
+            self.assertNotIn('timeout', settings_dict['OPTIONS'])
+
+            wrapper_class = load_backend(settings_dict['ENGINE']).DatabaseWrapper
+            wrapper = wrapper_class({**connection.settings_dict, **settings_dict}, alias='profile_test')
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 5000)
+            finally:
+                wrapper.close()
+
+    def test_postgres_profile_with_pool(self):
+        settings_dict = database_settings({'COYOS_DB': 'postgres', 'COYOS_DB_HOST': 'db'}, '.')['default']
+        self.assertEqual(settings_dict['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(settings_dict['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', settings_dict['OPTIONS'])
+
+        settings_dict = database_settings({'COYOS_DB': 'postgres', 'COYOS_DB_POOL': '1'}, '.')['default']
+        self.assertEqual(settings_dict['CONN_MAX_AGE'], 0)
+        self.assertEqual(settings_dict['OPTIONS']['pool']['max_size'], 10)
+
+        with self.assertRaises(ImproperlyConfigured):
+            database_settings({'COYOS_DB': 'mysql'}, '.')
+
+
+class RequestMetricsTests(HotelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for histogram in HISTOGRAMS:
+            histogram.reset()
+
+    def test_views_are_measured(self):
+        make_booking(self.hotel)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('booking'))
+
+        self.assertEqual(REQUEST_QUERIES._series['booking']['count'], 1)
+        self.assertEqual(REQUEST_QUERIES._series['booking']['sum'], len(queries))
+        self.assertEqual(RESPONSE_BYTES._series['booking']['sum'], len(response.content))
+
+        # Streaming responses are measured once the body has been sent
+        response = self.client.get(reverse('export_bookings'))
+        self.assertNotIn('export_bookings', RESPONSE_BYTES._series)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(RESPONSE_BYTES._series['export_bookings']['sum'], len(body))
+        self.assertGreater(REQUEST_QUERIES._series['export_bookings']['sum'], 0)
+
+    @override_settings(METRICS_VIEW_BUDGETS={'booking': {'queries': 1}})
+    def test_requests_over_budget_are_logged(self):
+        with self.assertLogs('app.metrics', level='WARNING') as logs:
+            self.client.get(reverse('booking'))
+        self.assertIn('Request over budget: booking', logs.output[0])
+        self.assertIn('queries=', logs.output[0])
+
+    def test_budgets_override_the_defaults(self):
+        self.assertEqual(view_budgets('booking'), DEFAULT_BUDGETS)
+        self.assertEqual(view_budgets('dashboard')['queries'], 8)
+        with override_settings(METRICS_BUDGETS={'seconds': 2.0}):
+            budgets = view_budgets('dashboard')
+        self.assertEqual(budgets, {**DEFAULT_BUDGETS, 'seconds': 2.0, 'queries': 8})
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('booking'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        body = response.content.decode()
+        self.assertIn('# TYPE coyos_request_queries histogram', body)
+        self.assertIn('coyos_request_seconds_count{view="booking"} 1', body)
+        self.assertIn('coyos_response_bytes_bucket{view="booking",le="+Inf"} 1', body)
+
+
+class CompressionTests(HotelTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for metric in HISTOGRAMS + COUNTERS:
+            metric.reset()
+        for number in range(30):
+            make_booking(self.hotel, booking_id=f'B{number}', guest_name=f'Guest {number}')
+
+    def test_pages_are_gzipped_and_measured_both_ways(self):
+        plain = self.client.get(reverse('booking')).content
+        response = self.client.get(reverse('booking'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        html = gzip.decompress(response.content)
+        # Same page, only the masked CSRF token differs
+        self.assertEqual(len(html), len(plain))
+        self.assertIn(b'Guest 29', html)
+        self.assertLess(len(response.content), len(plain) / 3)
+
+        self.assertEqual(RESPONSE_BYTES._series['booking']['sum'], len(plain) + len(response.content))
+        self.assertEqual(RESPONSE_UNCOMPRESSED_BYTES._series['booking']['sum'], len(plain) * 2)
+
+    def test_streaming_exports_stay_streaming(self):
+        response = self.client.get(reverse('export_bookings'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertIn('Guest 29', body)
+        self.assertEqual(RESPONSE_UNCOMPRESSED_BYTES._series['export_bookings']['sum'], len(body.encode()))
+        self.assertLess(RESPONSE_BYTES._series['export_bookings']['sum'], len(body.encode()))
+
+    def test_small_and_compressed_responses_are_left_alone(self):
+        with override_settings(COMPRESSION_MIN_BYTES=10 ** 7):
+            response = self.client.get(reverse('booking'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda request: None)
+        for response in [
+            HttpResponse(b'\x89PNG' * 1000, content_type='image/png'),
+            HttpResponse(b'{}' * 1000, content_type='application/json', headers={'Content-Encoding': 'br'}),
+            HttpResponse(b'a' * 5000, headers={'Cache-Control': 'no-transform'}),
+        ]:
+            original = response.content
+            response = middleware.process_response(request, response)
+            self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+            self.assertEqual(response.content, original)
+
+    @override_settings(METRICS_VIEW_BUDGETS={'booking': {'uncompressed_bytes': 1024, 'bytes': 10 ** 6}})
+    def test_pages_over_size_budget_are_flagged(self):
+        with self.assertLogs('app.metrics', level='WARNING') as logs:
+            self.client.get(reverse('booking'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('uncompressed_bytes=', logs.output[0])
+        self.assertNotIn(' bytes=', logs.output[0])
+        self.assertEqual(REQUESTS_OVER_BUDGET._series, {('booking', 'uncompressed_bytes'): 1})
+
+        self.user.is_staff = True
+        self.user.save()
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('coyos_requests_over_budget_total{view="booking",budget="uncompressed_bytes"} 1', body)
+        self.assertIn('coyos_response_uncompressed_bytes_count{view="booking"} 1', body)
+
+
+class CurrentHotelTests(HotelTestCase):
+
+    def hotel_queries(self, url):
+        """Queries loading the whole hotel row, not the per-request version check"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries if '"app_hotel"."hotel_name"' in query['sql']]
+
+    def test_hotel_comes_from_the_session(self):
+        response, hotel_queries = self.hotel_queries(reverse('expenses'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['hotel'].hotel_code, 'TH1')
+        self.assertEqual(hotel_queries, [])
+
+        # Once the hotel state is cached, only the session and the user are read
+        for url in (reverse('expenses'), reverse('booking'), reverse('extra_income')):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertEqual([query['sql'] for query in queries if 'FROM "app_hotel"' in query['sql']], [])
+
+    def test_hotel_edits_reach_every_session(self):
+        self.hotel.hotel_name = 'Renamed Hotel'
+        self.hotel.save()
+
+        response, hotel_queries = self.hotel_queries(reverse('expenses'))
+        self.assertEqual(response.context['hotel'].hotel_name, 'Renamed Hotel')
+        self.assertEqual(len(hotel_queries), 1)
+        # Cached again from there on
+        _response, hotel_queries = self.hotel_queries(reverse('expenses'))
+        self.assertEqual(hotel_queries, [])
+
+    def test_session_copy_is_valid_in_every_process(self):
+        # A worker without the hotel state cached reads it, not the whole hotel
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('expenses'))
+        self.assertEqual(response.context['hotel'].hotel_code, 'TH1')
+        sql = [query['sql'] for query in queries]
+        self.assertEqual(len([query for query in sql if 'FROM "app_hotel"' in query]), 1)
+        self.assertEqual([query for query in sql if '"app_hotel"' in query and 'hotel_name' in query], [])
+        self.assertEqual([query for query in sql if 'django_session' in query and 'UPDATE' in query], [])
+
+    def test_data_version_is_never_stale(self):
+        response = self.client.get(reverse('dashboard_stats_api'))
+        self.assertEqual(response.json()['stats']['today']['bookings'], 0)
+
+        # Bumps data_version with an UPDATE, the session copy of the hotel doesn't change
+        make_booking(self.hotel)
+        response = self.client.get(reverse('dashboard_stats_api'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stats']['today']['bookings'], 1)
+
+    def test_inactive_hotels_are_logged_out(self):
+        self.hotel.is_active = False
+        self.hotel.save()
+
+        response = self.client.get(reverse('booking'))
+        self.assertRedirects(response, reverse('login'))
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_users_without_a_hotel_are_refused(self):
+        self.client.force_login(User.objects.create_user(username='staff', password='secret'))
+        self.assertEqual(self.client.get(reverse('booking')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('dashboard_stats_api')).status_code, 403)
+
+    def test_anonymous_users_are_sent_to_login(self):
+        self.client.logout()
+        for view in ('booking', 'dashboard_stats_api'):
+            response = self.client.get(reverse(view))
+            self.assertEqual(response.status_code, 302)
+            self.assertIn(settings.LOGIN_URL, response['Location'])
+
+    def test_login_stores_the_hotel(self):
+        self.client.logout()
+        self.client.post(reverse('login'), {'username': 'hotel', 'password': 'secret'})
+        _response, hotel_queries = self.hotel_queries(reverse('expenses'))
+        self.assertEqual(hotel_queries, [])
+
+
+class FragmentCacheTests(HotelTestCase):
+
+    def expense_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('expenses'))
+        return response, [query['sql'] for query in queries if 'ORDER BY "app_dailyexpense"."date" DESC' in query['sql']]
+
+    def test_fragments_reused_until_hotel_data_changes(self):
+        DailyExpense.objects.create(hotel=self.hotel, expense_type='OTHER', amount=Decimal('90'), description='Soap')
+        response, list_queries = self.expense_list_queries()
+        self.assertContains(response, 'Soap')
+        self.assertEqual(len(list_queries), 1)
+
+        # Rendered from the fragment cache, the expenses are never read
+        response, list_queries = self.expense_list_queries()
+        self.assertContains(response, 'Soap')
+        self.assertEqual(list_queries, [])
+
+        DailyExpense.objects.create(hotel=self.hotel, expense_type='OTHER', amount=Decimal('40'), description='Bulbs')
+        response, list_queries = self.expense_list_queries()
+        self.assertContains(response, 'Bulbs')
+        self.assertEqual(len(list_queries), 1)
+
+    def test_blackroom_edits_refresh_the_table(self):
+        booking = SimpleBooking.objects.create(hotel=self.hotel, guest_name='Old Name', booking_amount=Decimal('100'),
+                                               booking_date=self.today)
+        self.assertContains(self.client.get(reverse('blackroom')), 'Old Name')
+
+        self.client.post(reverse('edit_simple_booking', args=[booking.id]), {
+            'guest_name': 'New Name',
+            'booking_date': self.today.strftime('%Y-%m-%d'),
+            'booking_amount': '100',
+        })
+        response = self.client.get(reverse('blackroom'))
+        self.assertContains(response, 'New Name')
+        self.assertNotContains(response, 'Old Name')
+
+    def test_booking_dues_follow_the_qr_amount(self):
+        make_booking(self.hotel, number_of_rooms=2, booking_amount=Decimal('5000'))
+        self.assertContains(self.client.get(reverse('booking')), '₹600')
+
+        # A hotel edit doesn't touch data_version, the fragment key must still change
+        self.hotel.refresh_from_db()
+        self.hotel.qr_amount = 400
+        self.hotel.save()
+        response = self.client.get(reverse('booking'))
+        self.assertContains(response, '₹800')
+        self.assertNotContains(response, '₹600')
+
+    def test_booking_choice_is_not_cached(self):
+        booking = make_booking(self.hotel, booking_id='B77', guest_name='Picked')
+        option = f'<option value="{booking.pk}">'
+        self.assertContains(self.client.get(reverse('extra_income')), option)
+
+        # An invalid form keeps the booking it was sent with
+        response = self.client.post(reverse('extra_income'), {'booking': booking.pk, 'source': 'PARKING'})
+        self.assertContains(response, f'<option value="{booking.pk}" selected>')
+
+        # Later forms start without a booking again
+        response = self.client.get(reverse('extra_income'))
+        self.assertContains(response, option)
+        self.assertNotContains(response, f'<option value="{booking.pk}" selected>')
+
+    @mock.patch('app.views.schedule_monthly_reports')
+    def test_benchmark_command(self, _check_reports):
+        make_booking(self.hotel)
+        with tempfile.NamedTemporaryFile(suffix='.json') as output_file:
+            call_command('benchmark_templates', '--iterations', '2', '--warmup', '1',
+                         '--output', output_file.name, stdout=StringIO())
+            results = json.load(open(output_file.name))
+        self.assertEqual(set(results), {'dashboard.html', 'bookings.html', 'expense.html',
+                                        'extra_income.html', 'simplebook.html'})
+        self.assertGreater(results['dashboard.html']['uncached']['p50_ms'], 0)
+
+
+class StaticAssetsTests(HotelTestCase):
+
+    def collect(self, static_dir):
+        """Run collectstatic of the production profile over a single directory"""
+        css_dir = os.path.join(static_dir, 'css')
+        os.makedirs(css_dir)
+        with open(os.path.join(css_dir, 'site.css'), 'w') as css_file:
+            css_file.write('body { background: url("bg.svg"); }\n' + '.row { margin: 0; }\n' * 200)
+        with open(os.path.join(css_dir, 'bg.svg'), 'w') as svg_file:
+            svg_file.write('<svg xmlns="http://www.w3.org/2000/svg"></svg>')
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @mock.patch('app.views.schedule_monthly_reports')
+    def test_pages_use_self_hosted_assets(self, _check_reports):
+        for view in ['dashboard', 'booking', 'expenses', 'extra_income', 'blackroom']:
+            response = self.client.get(reverse(view))
+            self.assertContains(response, '/static/vendor/bootstrap/css/bootstrap.min.css')
+            self.assertContains(response, '/static/css/coyos.css')
+            self.assertNotContains(response, 'cdn.')
+            self.assertNotContains(response, '<style>')
+        self.client.logout()
+        self.assertContains(self.client.get(reverse('login')), '/static/css/login.css')
+
+    def test_referenced_assets_are_in_the_tree(self):
+        for template in glob.glob(os.path.join(settings.BASE_DIR, 'templates', '*.html')):
+            with open(template) as template_file:
+                for name in re.findall(r"{% static '([^']+)' %}", template_file.read()):
+                    self.assertTrue(finders.find(name), f'{name} used by {template} is missing')
+
+    def test_collectstatic_hashes_and_compresses(self):
+        with tempfile.TemporaryDirectory() as static_dir, tempfile.TemporaryDirectory() as static_root:
+            with override_settings(
+                STATICFILES_DIRS=[static_dir],
+                STATIC_ROOT=static_root,
+                STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+                STORAGES={**settings.STORAGES, 'staticfiles': {
+                    'BACKEND': 'app.storage.CompressedManifestStaticFilesStorage',
+                }},
+                SERVE_STATIC=True,
+            ):
+                self.collect(static_dir)
+                manifest = json.load(open(os.path.join(static_root, 'staticfiles.json')))['paths']
+                hashed_css = manifest['css/site.css']
+                with open(os.path.join(static_root, hashed_css), 'rb') as css_file:
+                    css = css_file.read()
+                self.assertIn(manifest['css/bg.svg'].split('/')[-1].encode(), css)
+                with gzip.open(os.path.join(static_root, hashed_css + '.gz')) as compressed:
+                    self.assertEqual(compressed.read(), css)
+
+                response = self.client.get('/static/' + hashed_css, HTTP_ACCEPT_ENCODING='gzip, deflate')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertIn('immutable', response['Cache-Control'])
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), css)
+
+                response = self.client.get('/static/' + hashed_css)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(b''.join(response.streaming_content), css)
+
+                # Unhashed names must be revalidated
+                response = self.client.get('/static/css/site.css', HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response['Cache-Control'], 'public, no-cache')
+                response = self.client.get('/static/css/site.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+
+                self.assertEqual(self.client.get('/static/css/missing.css').status_code, 404)
+                self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    def test_vendor_assets_command(self):
+        with tempfile.TemporaryDirectory() as static_dir, override_settings(STATICFILES_DIRS=[static_dir]):
+            # Every download returns its own url
+            with mock.patch('urllib.request.urlopen', side_effect=lambda url, timeout: BytesIO(url.encode())):
+                call_command('vendor_assets', stdout=StringIO())
+            with open(os.path.join(static_dir, 'vendor', 'bootstrap', 'css', 'bootstrap.min.css')) as css_file:
+                self.assertIn('bootstrap@5.3.0', css_file.read())
+            self.assertTrue(os.path.exists(os.path.join(static_dir, 'vendor', 'fontawesome', 'webfonts', 'fa-solid-900.woff2')))
+
+            with mock.patch('urllib.request.urlopen') as urlopen:
+                call_command('vendor_assets', stdout=StringIO())
+            urlopen.assert_not_called()
+
+
+class SeedDataTests(TestCase):
+
+    def test_seeds_consistent_hotels(self):
+        call_command('seed_data', '--hotels', '2', '--days', '10', '--bookings-per-day', '4', stdout=StringIO())
+
+        hotels = Hotel.objects.filter(user__username__startswith='loadtest')
+        self.assertEqual(hotels.count(), 2)
+        self.assertTrue(User.objects.get(username='loadtest1').check_password('loadtest'))
+        for hotel in hotels:
+            bookings = Booking.objects.filter(hotel=hotel)
+            self.assertTrue(bookings.exists())
+            self.assertTrue(DailyExpense.objects.filter(hotel=hotel).exists())
+            # created_at follows the booking date instead of the seeding time
+            self.assertEqual(bookings.filter(created_at__date=F('booking_date')).count(), bookings.count())
+            self.assertEqual(
+                DailyHotelSummary.objects.filter(hotel=hotel).count(),
+                bookings.values('booking_date').distinct().count(),
+            )
+        self.assertFalse(booking_extra_income_drift().exists())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', '--hotels', '1', '--days', '1', stdout=StringIO())
+        call_command('seed_data', '--hotels', '1', '--days', '1', '--clear', stdout=StringIO())
+        self.assertEqual(Hotel.objects.filter(user__username__startswith='loadtest').count(), 1)
+
+
+class LoadTestTests(LiveServerTestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_replays_logged_in_traffic(self):
+        call_command('seed_data', '--hotels', '1', '--days', '3', '--bookings-per-day', '2', stdout=StringIO())
+        # Report generation would run next to the live server and outlive the test
+        with report_checks(), tempfile.NamedTemporaryFile(suffix='.json') as report_file:
+            out = StringIO()
+            call_command(
+                'load_test', '--base-url', self.live_server_url, '--hotels', '1', '--concurrency', '2',
+                '--requests', '10', '--output', report_file.name, stdout=out,
+            )
+            report = json.load(open(report_file.name))
+
+        self.assertEqual(report['total']['requests'], 10)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertEqual(report['views']['dashboard']['requests'], 2)
+        self.assertIn('p99_ms', report['views']['blackroom'])
+        self.assertIn('✓ 10 requests', out.getvalue())
+
+    def test_bad_login_is_reported(self):
+        with self.assertRaises(CommandError):
+            call_command('load_test', '--base-url', self.live_server_url, '--requests', '1', stdout=StringIO())
+
+
+class AsyncDashboardUrls:
+    """The project's URLs with the dashboard served as under ASGI (DASHBOARD_ASYNC)"""
+    urlpatterns = [path('dashboard/', views.dashboard_async, name='dashboard'), *project_urls.urlpatterns]
+
+
+@override_settings(ROOT_URLCONF=AsyncDashboardUrls)
+class AsyncDashboardTests(TransactionTestCase):
+    """Query groups need committed data, other connections cannot see a test transaction"""
+
+    def setUp(self):
+        cache.clear()
+        for histogram in HISTOGRAMS:
+            histogram.reset()
+        self.user = User.objects.create_user(username='hotel', password='secret')
+        self.hotel = Hotel.objects.create(
+            user=self.user, hotel_name='Test Hotel', hotel_code='TH1', qr_amount=300,
+            address='Somewhere', contact_number='0000000000',
+        )
+        self.client.force_login(self.user)
+        session = self.client.session
+        remember_hotel(session, self.user, self.hotel)
+        session.save()
+
+    def test_groups_run_concurrently(self):
+        def slow(name):
+            def group():
+                time.sleep(0.2)
+                return name, threading.current_thread().name
+            return group
+
+        start = time.perf_counter()
+        results = async_to_sync(run_query_groups)({name: slow(name) for name in ('a', 'b', 'c')})
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual([result[0] for result in results.values()], ['a', 'b', 'c'])
+        self.assertEqual(len({result[1] for result in results.values()}), 3)
+
+    @mock.patch('app.views.schedule_monthly_reports')
+    def test_dashboard_runs_groups_in_the_pool(self, _check_reports):
+        make_booking(self.hotel, booking_id='B1')
+        make_booking(self.hotel, booking_id='B2', booking_amount=Decimal('500'))
+        threads = []
+        original = get_dashboard_stats
+
+        def recording(*args):
+            threads.append(threading.current_thread().name)
+            return original(*args)
+
+        with mock.patch('app.views.get_dashboard_stats', recording):
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(threads[0].startswith('query-group'))
+        self.assertEqual(response.context['stats']['today']['bookings'], 2)
+        self.assertEqual([booking.booking_id for booking in response.context['recent_bookings']], ['B2', 'B1'])
+        # Queries of the pool threads are part of the request's metrics
+        self.assertGreaterEqual(REQUEST_QUERIES._series['dashboard']['sum'], 3)
+
+    def test_dashboard_query_budget(self):
+        make_booking(self.hotel)
+        with first_dashboard_of_the_month():
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        # Counted over the request's connection and those of the pool threads
+        series = REQUEST_QUERIES._series['dashboard']
+        self.assertEqual(series['count'], 1)
+        self.assertLessEqual(series['sum'], DASHBOARD_QUERY_BUDGET)
+
+    def test_falls_back_inside_a_transaction(self):
+        with transaction.atomic():
+            results = async_to_sync(run_query_groups)({
+                'a': lambda: threading.current_thread().name,
+                'b': lambda: threading.current_thread().name,
+            })
+        self.assertFalse(results['a'].startswith('query-group'))
+        self.assertEqual(results['a'], results['b'])
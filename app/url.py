@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path
+from django.conf import settings
 from . import views
 from django.contrib.auth import views as auth_views
 urlpatterns = [
@@ -8,14 +9,21 @@ path('', views.login_view, name='login'),
 path('logout/', views.logout_view, name='logout'),
 path('bookings/delete/<int:booking_id>/', views.delete_booking, name='delete_booking'),
     # Dashboard URL
-path('dashboard/', views.dashboard, name='dashboard'),
+path('dashboard/', views.dashboard_async if settings.DASHBOARD_ASYNC else views.dashboard, name='dashboard'),
+path('api/dashboard-stats/', views.dashboard_stats_api, name='dashboard_stats_api'),
+path('metrics', views.metrics, name='metrics'),
 path('update-booking/', views.update_booking, name='update_booking'),
 
 path('booking/',views.booking,name='booking'),
+path('booking/<int:booking_id>/data/', views.booking_data, name='booking_data'),
+path('booking/export/', views.export_bookings, name='export_bookings'),
+path('booking/import/', views.import_bookings_csv, name='import_bookings'),
 path('extra-income/', views.extra_income, name='extra_income'),
+path('extra-income/export/', views.export_extra_income, name='export_extra_income'),
 path('update-extra-income/', views.update_extra_income, name='update_extra_income'),
 path('delete-extra-income/<int:income_id>/', views.delete_extra_income, name='delete_extra_income'),
 path('expenses/', views.expenses, name='expenses'),
+path('expenses/export/', views.export_expenses, name='export_expenses'),
 path('blackroom/',views.blackroom,name='blackroom'),
 path('edit-simple-booking/<int:booking_id>/', views.edit_simple_booking, name='edit_simple_booking'),
 path('delete-simple-booking/<int:booking_id>/', views.delete_simple_booking, name='delete_simple_booking'),
@@ -1,105 +1,239 @@
 # utils.py
+import logging
+import threading
 from django.utils import timezone
-from django.db.models import Sum
-from datetime import datetime, timedelta
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum, Count, Q
+from datetime import datetime, time, timedelta
 from decimal import Decimal
-from .models import MonthlyReport, Booking, ExtraIncome, DailyExpense
+from .models import MonthlyReport, MonthlyReportRun, Booking, ExtraIncome, DailyExpense
 from app import models
+from .stats_cache import cached_hotel_stats
 
-def generate_monthly_report(hotel):
-    """Generate monthly report for the previous month"""
-    today = timezone.now().date()
-    first_day_current_month = today.replace(day=1)
-    last_day_previous_month = first_day_current_month - timedelta(days=1)
-    first_day_previous_month = last_day_previous_month.replace(day=1)
-    
-    # Check if report already exists
-    if MonthlyReport.objects.filter(hotel=hotel, month=first_day_previous_month).exists():
-        return None  # Report already generated
-    
-    # Get all bookings from previous month
-    bookings = Booking.objects.filter(
-        hotel=hotel,
-        created_at__date__gte=first_day_previous_month,
-        created_at__date__lte=last_day_previous_month
+logger = logging.getLogger('app.utils')
+
+# A claimed report run that has not completed after this long is taken over
+REPORT_RUN_LEASE_TIMEOUT = timedelta(hours=1)
+
+REPORT_BATCH_SIZE = 500
+
+# MonthlyReport columns recomputed by the report generators
+REPORT_VALUE_FIELDS = [
+    'total_bookings', 'total_revenue', 'total_oyo_due', 'total_cash_collected',
+    'total_qr_returned', 'total_extra_income', 'total_expenses', 'net_profit',
+    'oyo_bookings', 'ota_bookings', 'walk_in_bookings',
+    'cash_payments', 'upi_payments', 'prepaid_payments',
+]
+
+def previous_month_start(today=None):
+    """First day of the month before ``today``"""
+    today = today or timezone.now().date()
+    return (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+def month_bounds(month):
+    """Aware datetimes for the start of ``month`` and the start of the next month"""
+    first_day = month.replace(day=1)
+    next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.combine(first_day, time.min)),
+        timezone.make_aware(datetime.combine(next_month, time.min)),
     )
+
+def monthly_report_querysets(month, hotel_ids):
+    """The grouped per-hotel queries behind the MonthlyReport figures, by table"""
+    start, end = month_bounds(month)
+    created_in_month = {'created_at__gte': start, 'created_at__lt': end, 'hotel_id__in': hotel_ids}
+    qr_q = Q(booking_mode='OYO', not_in_qr=False)
     
-    # Get extra income from previous month
-    extra_income = ExtraIncome.objects.filter(
-        hotel=hotel,
-        created_at__date__gte=first_day_previous_month,
-        created_at__date__lte=last_day_previous_month
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    # Get expenses from previous month
-    expenses = DailyExpense.objects.filter(
-        hotel=hotel,
-        created_at__date__gte=first_day_previous_month,
-        created_at__date__lte=last_day_previous_month
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    return {
+        'bookings': Booking.objects.filter(**created_in_month).order_by().values('hotel_id').annotate(
+            total_bookings=Count('id'),
+            bookings_revenue=Sum('booking_amount'),
+            total_cash_collected=Sum('booking_amount', filter=Q(payment_mode='CASH')),
+            total_qr_returned=Sum('return_qr', filter=qr_q),
+            qr_booking_amount=Sum('booking_amount', filter=qr_q),
+            oyo_bookings=Count('id', filter=Q(booking_mode='OYO')),
+            ota_bookings=Count('id', filter=Q(booking_mode='OTA')),
+            walk_in_bookings=Count('id', filter=Q(booking_mode='WALK_IN')),
+            cash_payments=Count('id', filter=Q(payment_mode='CASH')),
+            upi_payments=Count('id', filter=Q(payment_mode='UPI')),
+            prepaid_payments=Count('id', filter=Q(payment_mode='PREPAID')),
+        ),
+        'extra_income': ExtraIncome.objects.filter(**created_in_month).order_by()
+        .values('hotel_id').annotate(total=Sum('amount')).values_list('hotel_id', 'total'),
+        'expenses': DailyExpense.objects.filter(**created_in_month).order_by()
+        .values('hotel_id').annotate(total=Sum('amount')).values_list('hotel_id', 'total'),
+    }
+
+def compute_monthly_report_rows(month, hotel_ids):
+    """
+    Compute MonthlyReport figures for many hotels with one grouped query per
+    table. Returns a dict of hotel_id -> MonthlyReport field values.
+    """
+    querysets = monthly_report_querysets(month, hotel_ids)
+    booking_totals = querysets['bookings']
+    income_totals = dict(querysets['extra_income'])
+    expense_totals = dict(querysets['expenses'])
+    bookings_by_hotel = {row.pop('hotel_id'): row for row in booking_totals}
     
-    # Calculate QR amounts
-    qr_bookings = bookings.filter(booking_mode='OYO', not_in_qr=False)
-    total_qr_amount = qr_bookings.aggregate(total=Sum('return_qr'))['total'] or Decimal('0.00')
-    total_booking_amount = qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    due_to_oyo = total_booking_amount - total_qr_amount
+    rows = {}
+    for hotel_id in hotel_ids:
+        b = bookings_by_hotel.get(hotel_id, {})
+        extra_income = income_totals.get(hotel_id) or Decimal('0.00')
+        expenses = expense_totals.get(hotel_id) or Decimal('0.00')
+        total_qr_returned = b.get('total_qr_returned') or Decimal('0.00')
+        total_revenue = (b.get('bookings_revenue') or Decimal('0.00')) + extra_income
+        
+        rows[hotel_id] = {
+            'total_bookings': b.get('total_bookings', 0),
+            'total_revenue': total_revenue,
+            'total_oyo_due': (b.get('qr_booking_amount') or Decimal('0.00')) - total_qr_returned,
+            'total_cash_collected': b.get('total_cash_collected') or Decimal('0.00'),
+            'total_qr_returned': total_qr_returned,
+            'total_extra_income': extra_income,
+            'total_expenses': expenses,
+            'net_profit': total_revenue - expenses,
+            'oyo_bookings': b.get('oyo_bookings', 0),
+            'ota_bookings': b.get('ota_bookings', 0),
+            'walk_in_bookings': b.get('walk_in_bookings', 0),
+            'cash_payments': b.get('cash_payments', 0),
+            'upi_payments': b.get('upi_payments', 0),
+            'prepaid_payments': b.get('prepaid_payments', 0),
+        }
+    return rows
+
+def generate_monthly_reports_bulk(month, hotel_ids=None, force=False):
+    """
+    Generate a month's reports for many hotels at once and write them with a
+    bulk upsert on (hotel, month). Existing reports are kept unless ``force``.
+    Returns a (generated, skipped) tuple.
+    """
+    from .models import Hotel
+    month = month.replace(day=1)
+    if hotel_ids is None:
+        hotel_ids = list(Hotel.objects.values_list('id', flat=True))
     
-    # Booking mode breakdown
-    oyo_bookings = bookings.filter(booking_mode='OYO').count()
-    ota_bookings = bookings.filter(booking_mode='OTA').count()
-    walk_in_bookings = bookings.filter(booking_mode='WALK_IN').count()
+    skipped = set()
+    if not force:
+        skipped = set(MonthlyReport.objects.filter(
+            month=month, hotel_id__in=hotel_ids
+        ).values_list('hotel_id', flat=True))
+    hotel_ids = [hotel_id for hotel_id in hotel_ids if hotel_id not in skipped]
     
-    # Payment mode breakdown
-    cash_payments = bookings.filter(payment_mode='CASH').count()
-    upi_payments = bookings.filter(payment_mode='UPI').count()
-    prepaid_payments = bookings.filter(payment_mode='PREPAID').count()
+    reports = [
+        MonthlyReport(hotel_id=hotel_id, month=month, **values)
+        for hotel_id, values in compute_monthly_report_rows(month, hotel_ids).items()
+    ]
+    if force:
+        MonthlyReport.objects.bulk_create(
+            reports,
+            batch_size=REPORT_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['hotel', 'month'],
+            update_fields=REPORT_VALUE_FIELDS + ['updated_at'],
+        )
+    else:
+        # A concurrent run may have written some of them in the meantime
+        MonthlyReport.objects.bulk_create(reports, batch_size=REPORT_BATCH_SIZE, ignore_conflicts=True)
     
-    # Calculate totals
-    total_revenue = bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    total_revenue += extra_income
-    net_profit = total_revenue - expenses
+    return len(reports), len(skipped)
+
+def generate_monthly_report(hotel, month=None):
+    """Generate monthly report for the previous month, or ``month`` if given"""
+    month = (month or previous_month_start()).replace(day=1)
+    generated, _skipped = generate_monthly_reports_bulk(month, hotel_ids=[hotel.id])
+    if not generated:
+        return None  # Report already generated
+    return MonthlyReport.objects.get(hotel=hotel, month=month)
+
+def claim_monthly_report_run(month):
+    """Claim report generation for a month, returns the run or None if another worker has it"""
+    try:
+        with transaction.atomic():
+            return MonthlyReportRun.objects.create(month=month)
+    except IntegrityError:
+        pass
     
-    # Create monthly report
-    report = MonthlyReport.objects.create(
-        hotel=hotel,
-        month=first_day_previous_month,
-        total_bookings=bookings.count(),
-        total_revenue=total_revenue,
-        total_oyo_due=due_to_oyo,
-        total_cash_collected=bookings.filter(payment_mode='CASH').aggregate(
-            total=Sum('booking_amount'))['total'] or Decimal('0.00'),
-        total_qr_returned=total_qr_amount,
-        total_extra_income=extra_income,
-        total_expenses=expenses,
-        net_profit=net_profit,
-        oyo_bookings=oyo_bookings,
-        ota_bookings=ota_bookings,
-        walk_in_bookings=walk_in_bookings,
-        cash_payments=cash_payments,
-        upi_payments=upi_payments,
-        prepaid_payments=prepaid_payments
-    )
+    # Take over a run whose worker died before completing it
+    now = timezone.now()
+    taken_over = MonthlyReportRun.objects.filter(
+        month=month,
+        completed_at__isnull=True,
+        started_at__lt=now - REPORT_RUN_LEASE_TIMEOUT
+    ).update(started_at=now)
+    if taken_over:
+        return MonthlyReportRun.objects.get(month=month)
+    return None
+
+def complete_monthly_report_run(run):
+    """Generate the reports of a claimed run and mark it completed"""
+    reports_generated, _skipped = generate_monthly_reports_bulk(run.month)
     
-    return report
+    run.completed_at = timezone.now()
+    run.reports_generated = reports_generated
+    run.save()
+    return reports_generated
 
 def check_and_generate_reports():
-    """Check if it's time to generate monthly reports and generate them"""
-    today = timezone.now().date()
+    """Generate last month's reports for all hotels, at most once per month"""
+    run = claim_monthly_report_run(previous_month_start())
+    if run is None:
+        return 0
+    return complete_monthly_report_run(run)
+
+# How long a process waits before checking again on a run another worker holds
+REPORT_RUN_RECHECK_INTERVAL = timedelta(minutes=1)
+
+_scheduled_month = None
+_next_check_at = None
+_check_lock = threading.Lock()
+
+def run_monthly_reports(month):
+    """
+    Generate ``month``'s reports unless the run has completed or another
+    worker holds an unexpired claim on it. A run whose worker died is taken
+    over once its lease expires. Returns the number of reports generated.
+    """
+    global _scheduled_month
+    run = MonthlyReportRun.objects.filter(month=month).only('started_at', 'completed_at').first()
+    if run is not None:
+        if run.completed_at is not None:
+            _scheduled_month = month
+            return 0
+        if run.started_at >= timezone.now() - REPORT_RUN_LEASE_TIMEOUT:
+            return 0  # Still being generated elsewhere
     
-    # Run on the 1st of each month
-    if today.day == 1:
-        # Get all hotels
-        from .models import Hotel
-        hotels = Hotel.objects.all()
-        
-        reports_generated = 0
-        for hotel in hotels:
-            report = generate_monthly_report(hotel)
-            if report:
-                reports_generated += 1
-        
-        return reports_generated
-    return 0
+    run = claim_monthly_report_run(month)
+    if run is None:
+        return 0
+    _scheduled_month = month
+    return complete_monthly_report_run(run)
+
+def _run_monthly_reports_in_background(month):
+    try:
+        run_monthly_reports(month)
+    except Exception:
+        logger.exception('Error generating monthly reports')
+    finally:
+        _check_lock.release()
+        connection.close()
+
+def schedule_monthly_reports():
+    """
+    Check on last month's reports in a background thread, see
+    run_monthly_reports. Runs no query in the request: a process stops
+    checking once it has generated or seen a completed run, and checks at
+    most once per REPORT_RUN_RECHECK_INTERVAL while another worker holds it.
+    """
+    global _next_check_at
+    month = previous_month_start()
+    now = timezone.now()
+    if _scheduled_month == month or (_next_check_at is not None and now < _next_check_at):
+        return
+    if not _check_lock.acquire(blocking=False):
+        return  # Already being checked
+    _next_check_at = now + REPORT_RUN_RECHECK_INTERVAL
+    threading.Thread(target=_run_monthly_reports_in_background, args=(month,), daemon=True).start()
 
 def calculate_revenue_change(hotel, current_month_start):
     """Calculate revenue change compared to previous month"""
@@ -125,8 +259,12 @@ def calculate_revenue_change(hotel, current_month_start):
     return 0
 
 def get_dashboard_stats(hotel):
-    """Get all dashboard statistics for a hotel"""
+    """Get all dashboard statistics for a hotel, cached until its data changes"""
     today = timezone.now().date()
+    return cached_hotel_stats(hotel, 'month-stats', lambda: _compute_dashboard_stats(hotel, today), today)
+
+def _compute_dashboard_stats(hotel, today):
+    """Compute the current month's dashboard statistics for a hotel"""
     current_month = today.month
     current_year = today.year
     
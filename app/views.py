@@ -1,14 +1,29 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.conf import settings
 from django.db.models import Sum, Count, Q,F
-from .utils import generate_monthly_report, check_and_generate_reports
+from .utils import generate_monthly_report, schedule_monthly_reports
+from .stats import get_dashboard_stats
+from .stats_cache import stats_cache_key
+from .importers import import_bookings, read_booking_rows
+from .pagination import keyset_paginate
+from .search import search_queryset
+from .current_hotel import hotel_required, remember_hotel
+from .metrics import render_metrics
+from .query_groups import run_query_groups, run_query_groups_sync
+from .exports import stream_csv, BOOKING_EXPORT_COLUMNS, INCOME_EXPORT_COLUMNS, EXPENSE_EXPORT_COLUMNS
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
 from django.utils import timezone
 from django.core.paginator import Paginator
 from datetime import datetime, timedelta
+import csv
+import io
 import json
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -37,6 +52,7 @@ def login_view(request):
                 hotel = Hotel.objects.get(user=user)
                 if hotel.is_active:
                     login(request, user)
+                    remember_hotel(request.session, user, hotel)
                     messages.success(request, f'Welcome back, {hotel.hotel_name}!')
                     return redirect('dashboard')
                 else:
@@ -53,20 +69,8 @@ def logout_view(request):
     logout(request)
     messages.info(request, 'You have been logged out successfully.')
     return redirect('login')
-@login_required
-def dashboard(request):
-    try:
-        hotel = Hotel.objects.get(user=request.user)
-    except Hotel.DoesNotExist:
-        return redirect('login')
-    
-    # Check if we need to generate monthly reports
-    check_and_generate_reports()
-    
-    # Get current date and time
-    today = timezone.now().date()
-    
-    # Handle date filters
+def dashboard_date_range(request, today):
+    """Parse the dashboard start_date/end_date filters, defaulting to today"""
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     
@@ -87,251 +91,91 @@ def dashboard(request):
     if start_date > end_date:
         start_date = end_date
     
-    # Calculate today's stats (always current day, not filtered)
-    today_bookings = Booking.objects.filter(
-        hotel=hotel, 
-        booking_date=today
-    )
-    
-    # Today's extra income - CHANGED to use date field
-    today_extra_income = ExtraIncome.objects.filter(
-        hotel=hotel,
-        date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    # Today's expenses - CHANGED to use date field
-    today_expenses = DailyExpense.objects.filter(
-        hotel=hotel,
-        date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    # Calculate today's revenue (bookings + extra income - expenses)
-    today_booking_revenue = today_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    today_revenue = today_booking_revenue + today_extra_income - today_expenses
-    
-    # Calculate filtered stats based on date range
-    filtered_bookings = Booking.objects.filter(
-        hotel=hotel, 
-        booking_date__gte=start_date,
-        booking_date__lte=end_date
-    )
-    
-    # QR Analysis for ALL booking modes (OYO, TA, OTA, WALK_IN) - all part of OYO ecosystem
-    oyo_ecosystem_modes = ['OYO', 'TA', 'OTA', 'WALK_IN']
-    
-    # Get all QR bookings for OYO ecosystem (exclude PREPAID from QR amount calculation)
-    qr_bookings = Booking.objects.filter(
-        hotel=hotel,
-        booking_mode__in=oyo_ecosystem_modes,
-        not_in_qr=False  # Only include bookings that are in QR
-    ).filter(
-        booking_date__gte=start_date,
-        booking_date__lte=end_date
-    )
-    
-    # Separate prepaid and non-prepaid bookings for QR calculation
-    non_prepaid_qr_bookings = qr_bookings.exclude(payment_mode='PREPAID')
-    prepaid_qr_bookings = qr_bookings.filter(payment_mode='PREPAID')
-    
-    # Calculate QR amounts - Only actual QR return amounts, not excess
-    total_qr_returned = non_prepaid_qr_bookings.aggregate(total=Sum('return_qr'))['total'] or Decimal('0.00')
-    
-    # Calculate total QR booking amount - ONLY NON-PREPAID bookings count towards QR Amount
-    total_qr_booking_amount = non_prepaid_qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    
-    # Calculate due amounts separately for prepaid and non-prepaid
-    non_prepaid_due = non_prepaid_qr_bookings.aggregate(
-        total=Sum(F('booking_amount') - F('return_qr'))
-    )['total'] or Decimal('0.00')
-    
-    prepaid_due = prepaid_qr_bookings.aggregate(
-        total=Sum(F('booking_amount') - F('return_qr'))
-    )['total'] or Decimal('0.00')
-    
-    # Total due from OYO ecosystem bookings (before adjusting for not_in_qr)
-    total_oyo_due = non_prepaid_due + prepaid_due
-    
-    # Get bookings NOT in QR for OYO ecosystem
-    not_in_qr_bookings = Booking.objects.filter(
-        hotel=hotel,
-        booking_mode__in=oyo_ecosystem_modes,
-        not_in_qr=True
-    ).filter(
-        booking_date__gte=start_date,
-        booking_date__lte=end_date
-    )
-    
-    # Get hotel's QR amount (from Hotel model)
-    hotel_qr_amount = Decimal(str(hotel.qr_amount or 0))
-    
-    # Calculate not_in_qr adjustments
-    # For each not_in_qr booking: difference = booking_amount - hotel_qr_amount
-    not_in_qr_total_booking = not_in_qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    not_in_qr_count = not_in_qr_bookings.count()
-    
-    # Total QR that would have been received for these bookings
-    not_in_qr_expected_qr = hotel_qr_amount * not_in_qr_count
-    
-    # The difference (amount over the expected QR)
-    not_in_qr_adjustment = not_in_qr_total_booking - not_in_qr_expected_qr
-    
-    # Add this adjustment to total QR returned amount (as if you received this extra)
-    adjusted_qr_returned = total_qr_returned + not_in_qr_adjustment
-    
-    # Subtract this adjustment from due to OYO
-    due_to_oyo = total_oyo_due - not_in_qr_adjustment
-    
-    # Track if there's excess (negative due means OYO owes you money)
-    excess_amount = abs(due_to_oyo) if due_to_oyo < 0 else Decimal('0.00')
-    
-    # Extra income for filtered period - CHANGED to use date field
-    extra_income = ExtraIncome.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    # Expenses for filtered period - CHANGED to use date field
-    expenses = DailyExpense.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    # Calculate net profit for filtered period
-    total_revenue = (filtered_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')) + extra_income
-    net_profit = total_revenue - expenses
-    
-    # Calculate total rooms used in filtered period
-    total_rooms_used = filtered_bookings.aggregate(total=Sum('number_of_rooms'))['total'] or 0
-    
-    # Recent bookings (all time, not filtered)
-    recent_bookings = Booking.objects.filter(hotel=hotel).order_by('-created_at')[:10]
-    
-    # Booking mode breakdown for filtered period
-    booking_modes = filtered_bookings.values('booking_mode').annotate(
-        count=Count('id'),
-        total_revenue=Sum('booking_amount')
-    )
-    
-    # Calculate booking mode percentages for filtered period
-    total_bookings_count = filtered_bookings.count()
-    
-    # Calculate each booking mode percentage
-    oyo_count = filtered_bookings.filter(booking_mode='OYO').count()
-    oyo_percentage = (oyo_count / total_bookings_count * 100) if total_bookings_count > 0 else 0
-    
-    ta_count = filtered_bookings.filter(booking_mode='TA').count()
-    ta_percentage = (ta_count / total_bookings_count * 100) if total_bookings_count > 0 else 0
-    
-    ota_count = filtered_bookings.filter(booking_mode='OTA').count()
-    ota_percentage = (ota_count / total_bookings_count * 100) if total_bookings_count > 0 else 0
-    
-    walk_in_count = filtered_bookings.filter(booking_mode='WALK_IN').count()
-    walk_in_percentage = (walk_in_count / total_bookings_count * 100) if total_bookings_count > 0 else 0
-    
-    # Calculate revenue change compared to previous period of same duration
-    previous_period_days = (end_date - start_date).days + 1
-    previous_period_start = start_date - timedelta(days=previous_period_days)
-    previous_period_end = start_date - timedelta(days=1)
-    
-    previous_period_bookings = Booking.objects.filter(
-        hotel=hotel,
-        booking_date__gte=previous_period_start,
-        booking_date__lte=previous_period_end
-    )
-    
-    previous_revenue = previous_period_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    current_revenue = filtered_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    
-    if previous_revenue > 0:
-        revenue_change = ((current_revenue - previous_revenue) / previous_revenue) * 100
-    else:
-        revenue_change = 100 if current_revenue > 0 else 0
-    
-    # Additional stats for prepaid bookings
-    prepaid_booking_amount = prepaid_qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00')
-    prepaid_count = prepaid_qr_bookings.count()
-    prepaid_return_qr = prepaid_qr_bookings.aggregate(total=Sum('return_qr'))['total'] or Decimal('0.00')
-    
-    # Calculate QR efficiency percentage (for OYO ecosystem bookings)
-    total_oyo_ecosystem_bookings = filtered_bookings.filter(booking_mode__in=oyo_ecosystem_modes).count()
-    if total_oyo_ecosystem_bookings > 0:
-        qr_efficiency_percentage = round((qr_bookings.count() / total_oyo_ecosystem_bookings) * 100, 1)
-    else:
-        qr_efficiency_percentage = 0
+    return start_date, end_date
 
-    # Calculate QR stats by booking mode (exclude prepaid from QR amount)
-    qr_stats_by_mode = {}
-    for mode in oyo_ecosystem_modes:
-        mode_qr_bookings = non_prepaid_qr_bookings.filter(booking_mode=mode)
-        mode_not_in_qr = not_in_qr_bookings.filter(booking_mode=mode)
-        
-        qr_stats_by_mode[mode] = {
-            'qr_count': mode_qr_bookings.count(),
-            'qr_amount': mode_qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00'),
-            'not_in_qr_count': mode_not_in_qr.count(),
-            'not_in_qr_amount': mode_not_in_qr.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00'),
-        }
+def dashboard_query_groups(hotel, start_date, end_date, today):
+    """Independent query groups of the dashboard, by context name"""
+    return {
+        # Monthly reports are generated outside the request, once per month
+        'monthly_reports': schedule_monthly_reports,
+        # Every figure on the page comes from the cached stats engine
+        'dashboard_stats': lambda: get_dashboard_stats(hotel, start_date, end_date, today),
+        # Recent bookings (all time, not filtered)
+        'recent_bookings': lambda: list(Booking.objects.filter(hotel=hotel).order_by('-created_at')[:10]),
+    }
 
-    context = {
+def dashboard_context(hotel, start_date, end_date, today, results):
+    return {
         'hotel': hotel,
         'today': today,
         'start_date': start_date,
         'end_date': end_date,
-        'stats': {
-            'today': {
-                'bookings': today_bookings.count(),
-                'revenue': today_revenue,
-                'booking_revenue': today_booking_revenue,
-                'extra_income': today_extra_income,
-                'expenses': today_expenses,
-                'cash': today_bookings.filter(payment_mode='CASH').aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00'),
-                'qr_due': due_to_oyo
-            },
-            'month': {
-                'total_bookings': filtered_bookings.count(),
-                'total_revenue': total_revenue,
-                'total_expenses': expenses,
-                'net_profit': net_profit,
-                'total_rooms_used': total_rooms_used
-            },
-            'revenue_change': round(revenue_change, 1),
-            'oyo_percentage': round(oyo_percentage, 1),
-            'ta_percentage': round(ta_percentage, 1),
-            'ota_percentage': round(ota_percentage, 1),
-            'walk_in_percentage': round(walk_in_percentage, 1),
-        },
-        'qr_stats': {
-            'total_qr_amount': total_qr_booking_amount,  # Total booking amount for NON-PREPAID OYO ecosystem QR bookings only
-            'total_qr_returned': adjusted_qr_returned,   # Actual QR returned amount
-            'total_booking_amount': non_prepaid_qr_bookings.aggregate(total=Sum('booking_amount'))['total'] or Decimal('0.00'),
-            'due_to_oyo': due_to_oyo,  # Adjusted due to OYO (includes prepaid due, can be negative when OYO owes you money)
-            'amount_oyo_owes': excess_amount,  # Positive amount when due_to_oyo is negative
-            'qr_bookings_count': non_prepaid_qr_bookings.count(),  # Only non-prepaid bookings in QR count
-            'not_in_qr_amount': not_in_qr_total_booking,
-            'not_in_qr_count': not_in_qr_count,
-            'not_in_qr_adjustment': not_in_qr_adjustment,
-            'not_in_qr_expected_qr': not_in_qr_expected_qr,
-            'prepaid_booking_amount': prepaid_booking_amount,
-            'prepaid_count': prepaid_count,
-            'prepaid_return_qr': prepaid_return_qr,
-            'prepaid_due': prepaid_due,
-            'non_prepaid_due': non_prepaid_due,
-            'total_oyo_due': total_oyo_due,
-            'initial_due': total_oyo_due,
-            'excess_amount': excess_amount,
-            'qr_efficiency_percentage': qr_efficiency_percentage,
-            'by_mode': qr_stats_by_mode,  # QR stats broken down by booking mode (non-prepaid only)
-        },
-        'pending_qr': non_prepaid_qr_bookings.filter(return_qr__lt=F('booking_amount')).count(),
-        'recent_bookings': recent_bookings,
-        'booking_modes': booking_modes,
-        'expenses': expenses,
-        'extra_income': extra_income,
+        'recent_bookings': results['recent_bookings'],
+        **results['dashboard_stats'],
     }
-    
-    return render(request, 'dashboard.html', context)
+
+@hotel_required
+def dashboard(request):
+    """Dashboard running its query groups one after another (DASHBOARD_ASYNC = False)"""
+    hotel = request.hotel
+    today = timezone.now().date()
+    start_date, end_date = dashboard_date_range(request, today)
+    results = run_query_groups_sync(dashboard_query_groups(hotel, start_date, end_date, today))
+    return render(request, 'dashboard.html', dashboard_context(hotel, start_date, end_date, today, results))
+
+@hotel_required
+async def dashboard_async(request):
+    """Dashboard running its query groups concurrently, the slowest group sets the latency"""
+    hotel = request.hotel
+    today = timezone.now().date()
+    start_date, end_date = dashboard_date_range(request, today)
+    results = await run_query_groups(dashboard_query_groups(hotel, start_date, end_date, today))
+    # Templates and context processors may still touch the ORM, so render in sync code
+    return await sync_to_async(render)(
+        request, 'dashboard.html', dashboard_context(hotel, start_date, end_date, today, results)
+    )
+
+@hotel_required
+@require_GET
+def dashboard_stats_api(request):
+    """Dashboard figures as JSON, answering 304 while the hotel's data is unchanged"""
+    hotel = request.hotel
+    today = timezone.now().date()
+    try:
+        start_date, end_date = dashboard_date_range(request, today)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD.'}, status=400)
+    
+    # The figures only change when the hotel's data, its QR amount or the day changes.
+    # No Last-Modified: data_updated_at misses QR amount edits and the change of day.
+    etag = quote_etag(stats_cache_key(hotel, 'dashboard-api', start_date, end_date, today))
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        dashboard_stats = get_dashboard_stats(hotel, start_date, end_date, today)
+        response = JsonResponse({
+            'start_date': start_date,
+            'end_date': end_date,
+            'stats': dashboard_stats['stats'],
+            'qr_stats': dashboard_stats['qr_stats'],
+            'pending_qr': dashboard_stats['pending_qr'],
+        })
+    
+    response['ETag'] = etag
+    # Clients must revalidate on every poll, which is cheap thanks to the ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@require_GET
+def metrics(request):
+    """Request metrics of this process for staff users, or scrapers sending METRICS_TOKEN"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    is_staff = request.user.is_authenticated and request.user.is_staff
+    has_token = bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    if not (is_staff or has_token):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 def calculate_revenue_change(hotel, current_month_start):
     """Calculate revenue change compared to previous month"""
@@ -355,13 +199,77 @@ def calculate_revenue_change(hotel, current_month_start):
         change = ((current_revenue - previous_revenue) / previous_revenue) * 100
         return round(float(change), 1)
     return 0
-@login_required
-def booking(request):
+def booking_filters(request):
+    """Search and date filter parameters of the bookings list"""
+    return {
+        'search_query': request.GET.get('search', ''),
+        'date_filter': request.GET.get('date_filter', ''),
+        'start_date': request.GET.get('start_date', ''),
+        'end_date': request.GET.get('end_date', ''),
+    }
+
+def parse_date_range(start_date, end_date):
+    """Parse a custom YYYY-MM-DD range, returns None when it is missing or invalid"""
+    if not (start_date and end_date):
+        return None
     try:
-        hotel = Hotel.objects.get(user=request.user)
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have a hotel associated with your account.")
-        return redirect('dashboard')
+        return (
+            datetime.strptime(start_date, '%Y-%m-%d').date(),
+            datetime.strptime(end_date, '%Y-%m-%d').date(),
+        )
+    except ValueError:
+        return None
+
+def filter_bookings(bookings, filters):
+    """
+    Apply the bookings list filters to a queryset.
+
+    Returns the filtered queryset and False when the custom date range is invalid.
+    """
+    search_query = filters['search_query']
+    date_filter = filters['date_filter']
+    
+    # Apply search filter - prefix match on booking ID and guest name tokens (see app/search.py)
+    if search_query:
+        bookings = search_queryset(bookings, search_query)
+    
+    # Apply date filters - UPDATED: Use booking_date for date filtering
+    if date_filter:
+        today = timezone.now().date()
+        if date_filter == 'today':
+            bookings = bookings.filter(booking_date=today)
+        elif date_filter == 'yesterday':
+            yesterday = today - timedelta(days=1)
+            bookings = bookings.filter(booking_date=yesterday)
+        elif date_filter == 'this_week':
+            start_of_week = today - timedelta(days=today.weekday())
+            bookings = bookings.filter(booking_date__gte=start_of_week)
+        elif date_filter == 'this_month':
+            bookings = bookings.filter(booking_date__year=today.year, booking_date__month=today.month)
+        elif date_filter == 'last_month':
+            first_day_of_current_month = today.replace(day=1)
+            last_day_of_previous_month = first_day_of_current_month - timedelta(days=1)
+            first_day_of_previous_month = last_day_of_previous_month.replace(day=1)
+            bookings = bookings.filter(
+                booking_date__gte=first_day_of_previous_month,
+                booking_date__lte=last_day_of_previous_month
+            )
+    
+    # Apply custom date range filter
+    if filters['start_date'] and filters['end_date']:
+        date_range = parse_date_range(filters['start_date'], filters['end_date'])
+        if date_range is None:
+            return bookings, False
+        bookings = bookings.filter(booking_date__range=date_range)
+    
+    return bookings, True
+
+# Bookings shown per page of the bookings list
+BOOKINGS_PER_PAGE = 20
+
+@hotel_required
+def booking(request):
+    hotel = request.hotel
     
     if request.method == 'POST':
         form = BookingForm(request.POST)
@@ -386,107 +294,128 @@ def booking(request):
     else:
         form = BookingForm()
     
-    # Get filter parameters
-    search_query = request.GET.get('search', '')
-    date_filter = request.GET.get('date_filter', '')
-    start_date = request.GET.get('start_date', '')
-    end_date = request.GET.get('end_date', '')
+    # Get filter parameters and apply them to this hotel's bookings
+    filters = booking_filters(request)
+    bookings, valid_range = filter_bookings(Booking.objects.filter(hotel=hotel), filters)
+    if not valid_range:
+        messages.error(request, "Invalid date format. Please use YYYY-MM-DD.")
     
-    # Get all bookings for this hotel
-    bookings = Booking.objects.filter(hotel=hotel)
+    # Calculate summary statistics in a single aggregate query
+    totals = bookings.totals()
     
-    # Apply search filter
-    if search_query:
-        bookings = bookings.filter(
-            models.Q(booking_id__icontains=search_query) |
-            models.Q(guest_name__icontains=search_query)
+    bookings = bookings.with_due_to_oyo()
+    
+    # Page numbers are kept for old links, browsing uses cursors so deep pages stay fast
+    page_number = request.GET.get('page')
+    if page_number:
+        # Order by booking_date (descending) and created_at (descending)
+        paginator = Paginator(bookings.order_by('-booking_date', '-created_at'), BOOKINGS_PER_PAGE)
+        page_obj = paginator.get_page(page_number)
+    else:
+        # The summary aggregate above already counted the bookings
+        page_obj = keyset_paginate(
+            bookings, request.GET.get('cursor'), per_page=BOOKINGS_PER_PAGE,
+            total=totals['total_bookings'],
         )
     
-    # Apply date filters - UPDATED: Use booking_date for date filtering
-    if date_filter:
-        today = timezone.now().date()
-        if date_filter == 'today':
-            bookings = bookings.filter(booking_date=today)
-        elif date_filter == 'yesterday':
-            yesterday = today - timedelta(days=1)
-            bookings = bookings.filter(booking_date=yesterday)
-        elif date_filter == 'this_week':
-            start_of_week = today - timedelta(days=today.weekday())
-            bookings = bookings.filter(booking_date__gte=start_of_week)
-        elif date_filter == 'this_month':
-            bookings = bookings.filter(booking_date__year=today.year, booking_date__month=today.month)
-        elif date_filter == 'last_month':
-            first_day_of_current_month = today.replace(day=1)
-            last_day_of_previous_month = first_day_of_current_month - timedelta(days=1)
-            first_day_of_previous_month = last_day_of_previous_month.replace(day=1)
-            bookings = bookings.filter(
-                booking_date__gte=first_day_of_previous_month,
-                booking_date__lte=last_day_of_previous_month
-            )
+    # Edit modal data for the rows on this page only
+    booking_data = {booking.id: booking_edit_data(booking) for booking in page_obj}
     
-    # Apply custom date range filter
-    if start_date and end_date:
-        try:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-            bookings = bookings.filter(booking_date__range=[start_date_obj, end_date_obj])
-        except ValueError:
-            messages.error(request, "Invalid date format. Please use YYYY-MM-DD.")
-    
-    # Calculate summary statistics
-    total_bookings = bookings.count()
-    total_amount = sum(booking.booking_amount for booking in bookings)
-    total_due = sum(booking.due_to_oyo for booking in bookings)
-    total_qr_return = sum(booking.return_qr for booking in bookings)
-    
-    # Order by booking_date (descending) and created_at (descending)
-    bookings = bookings.order_by('-booking_date', '-created_at')
-    
-    # Pagination - 20 bookings per page
-    paginator = Paginator(bookings, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Prepare booking data for JavaScript
-    booking_data = {}
-    for booking in bookings:  # Use all bookings for edit functionality
-        booking_data[booking.id] = {
-            'booking_id': booking.booking_id,
-            'guest_name': booking.guest_name,
-            'booking_date': booking.booking_date.strftime('%Y-%m-%d'),  # NEW
-            'booking_mode': booking.booking_mode,
-            'payment_mode': booking.payment_mode,
-            'number_of_rooms': booking.number_of_rooms,
-            'booking_amount': float(booking.booking_amount),
-            'return_qr': float(booking.return_qr),
-            'not_in_qr': booking.not_in_qr,
-            'extra_income': float(booking.extra_income) if booking.extra_income else 0,
-            'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        }
+    # Pagination and the CSV export keep the current filters but not the position
+    filter_query = request.GET.copy()
+    filter_query.pop('page', None)
+    filter_query.pop('cursor', None)
     
     context = {
         'form': form,
         'page_obj': page_obj,
         'hotel': hotel,
         'booking_data_json': json.dumps(booking_data),
-        'search_query': search_query,
-        'date_filter': date_filter,
-        'start_date': start_date,
-        'end_date': end_date,
-        'total_bookings': total_bookings,
-        'total_amount': total_amount,
-        'total_due': total_due,
-        'total_qr_return': total_qr_return,
+        'search_query': filters['search_query'],
+        'date_filter': filters['date_filter'],
+        'start_date': filters['start_date'],
+        'end_date': filters['end_date'],
+        'filter_query': filter_query.urlencode(),
+        **totals,
     }
     
     return render(request, "bookings.html", context)
 
-@login_required
+def booking_edit_data(booking):
+    """Fields the edit booking modal needs for one booking"""
+    return {
+        'booking_id': booking.booking_id,
+        'guest_name': booking.guest_name,
+        'booking_date': booking.booking_date.strftime('%Y-%m-%d') if booking.booking_date else '',
+        'booking_mode': booking.booking_mode,
+        'payment_mode': booking.payment_mode,
+        'number_of_rooms': booking.number_of_rooms,
+        'booking_amount': float(booking.booking_amount),
+        'return_qr': float(booking.return_qr),
+        'not_in_qr': booking.not_in_qr,
+        'extra_income': float(booking.extra_income) if booking.extra_income else 0,
+        'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+@hotel_required
+def booking_data(request, booking_id):
+    """Edit modal data for a single booking, loaded on demand"""
+    booking = get_object_or_404(Booking, id=booking_id, hotel=request.hotel)
+    return JsonResponse(booking_edit_data(booking))
+
+# Rejected rows listed on the page after an upload, the rest are only counted
+IMPORT_ERRORS_SHOWN = 20
+
+@hotel_required
+@require_POST
+def import_bookings_csv(request):
+    """Bulk import bookings from an uploaded CSV file"""
+    hotel = request.hotel
+    upload = request.FILES.get('csv_file')
+    if not upload:
+        messages.error(request, 'Please choose a CSV file to import.')
+        return redirect('booking')
+    
+    try:
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        created, errors = import_bookings(hotel, read_booking_rows(lines))
+    except (UnicodeDecodeError, csv.Error) as e:
+        messages.error(request, f'Could not read the CSV file: {e}')
+        return redirect('booking')
+    
+    if created:
+        messages.success(request, f'{created} bookings imported successfully!')
+    if errors:
+        for line, booking_id, message in errors[:IMPORT_ERRORS_SHOWN]:
+            messages.error(request, f'Line {line} ({booking_id or "no booking ID"}): {message}')
+        if len(errors) > IMPORT_ERRORS_SHOWN:
+            messages.error(request, f'{len(errors) - IMPORT_ERRORS_SHOWN} more rows were rejected.')
+    elif not created:
+        messages.error(request, 'The CSV file has no bookings to import.')
+    
+    return redirect('booking')
+
+@hotel_required
+@require_GET
+def export_bookings(request):
+    """Stream the filtered bookings list as CSV"""
+    hotel = request.hotel
+    bookings, valid_range = filter_bookings(Booking.objects.filter(hotel=hotel), booking_filters(request))
+    if not valid_range:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD.'}, status=400)
+    
+    bookings = bookings.order_by('-booking_date', '-created_at').annotate(
+        due_amount=Booking.objects.due_to_oyo_expression()
+    )
+    return stream_csv(f'bookings_{hotel.hotel_code}.csv', BOOKING_EXPORT_COLUMNS, bookings)
+
+@hotel_required
 def update_booking(request):
+    hotel = request.hotel
     if request.method == 'POST':
         try:
             booking_id = request.POST.get('id')
-            booking = Booking.objects.get(id=booking_id, hotel__user=request.user)
+            booking = Booking.objects.get(id=booking_id, hotel=hotel)
             
             # Update booking fields
             booking.booking_id = request.POST.get('booking_id')
@@ -507,7 +436,7 @@ def update_booking(request):
             # Auto-calculate return_qr if not_in_qr is not checked
             if not booking.not_in_qr:
                 # Calculate due: number_of_rooms * hotel_qr_amount
-                calculated_due = booking.number_of_rooms * booking.hotel.qr_amount
+                calculated_due = booking.number_of_rooms * hotel.qr_amount
                 actual_due = min(calculated_due, booking.booking_amount)
                 # Calculate QR return: booking amount - due amount
                 booking.return_qr = max(Decimal('0.00'), booking.booking_amount - actual_due)
@@ -523,39 +452,30 @@ def update_booking(request):
     
     return redirect('booking')
 
-@login_required
+@hotel_required
 def delete_booking(request, booking_id):
+    hotel = request.hotel
     try:
-        hotel = Hotel.objects.get(user=request.user)
         booking = get_object_or_404(Booking, id=booking_id, hotel=hotel)
         booking_id_str = booking.booking_id
         booking.delete()
         messages.success(request, f'Booking {booking_id_str} deleted successfully!')
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have permission to delete this booking.")
     except Exception as e:
         messages.error(request, f"An error occurred while deleting the booking: {str(e)}")
     
     return redirect('booking')
-@login_required
+@hotel_required
 def extra_income(request):
-    try:
-        hotel = Hotel.objects.get(user=request.user)
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have a hotel associated with your account.")
-        return redirect('dashboard')
+    hotel = request.hotel
     
     if request.method == 'POST':
         form = ExtraIncomeForm(request.POST, hotel=hotel)
         if form.is_valid():
             income = form.save(commit=False)
             income.hotel = hotel
+            # The booking's extra_income is updated by the ExtraIncome signals
             income.save()
             
-            # Update booking extra income if this income is associated with a booking
-            if income.booking:
-                update_booking_extra_income(hotel, income.booking.id)
-            
             messages.success(request, f'Extra income of ₹{income.amount} added successfully!')
             return redirect('extra_income')
         else:
@@ -576,17 +496,32 @@ def extra_income(request):
         'total_income': total_income,
     })
 
-@login_required
+@hotel_required
+@require_GET
+def export_extra_income(request):
+    """Stream the extra income list as CSV, optionally limited to start_date/end_date"""
+    hotel = request.hotel
+    incomes = ExtraIncome.objects.filter(hotel=hotel)
+    
+    start_date = request.GET.get('start_date', '')
+    end_date = request.GET.get('end_date', '')
+    if start_date and end_date:
+        date_range = parse_date_range(start_date, end_date)
+        if date_range is None:
+            return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD.'}, status=400)
+        incomes = incomes.filter(date__range=date_range)
+    
+    incomes = incomes.order_by('-date', '-created_at')
+    return stream_csv(f'extra_income_{hotel.hotel_code}.csv', INCOME_EXPORT_COLUMNS, incomes)
+
+@hotel_required
 @require_POST
 def update_extra_income(request):
+    hotel = request.hotel
     try:
-        hotel = Hotel.objects.get(user=request.user)
         income_id = request.POST.get('id')
         income_instance = get_object_or_404(ExtraIncome, id=income_id, hotel=hotel)
         
-        # Store the original booking for comparison
-        original_booking = income_instance.booking
-        
         # Get the operation type (add/subtract) and amount
         operation = request.POST.get('operation', 'add')
         amount_change = Decimal(request.POST.get('amount_change', 0))
@@ -614,21 +549,12 @@ def update_extra_income(request):
         else:
             income_instance.booking = None
         
+        # Moves the amount between bookings' extra_income if the booking changed (see app/signals.py)
         income_instance.save()
         
-        # Update booking extra income for both old and new bookings if they changed
-        if original_booking:
-            update_booking_extra_income(hotel, original_booking.id)
-        
-        if income_instance.booking and income_instance.booking != original_booking:
-            update_booking_extra_income(hotel, income_instance.booking.id)
-        
         messages.success(request, f'Extra income updated successfully!')
         return redirect('extra_income')
             
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have permission to edit this income.")
-        return redirect('extra_income')
     except ValueError as e:
         messages.error(request, "Invalid amount or date format.")
         return redirect('extra_income')
@@ -636,80 +562,23 @@ def update_extra_income(request):
         messages.error(request, f"An error occurred: {str(e)}")
         return redirect('extra_income')
 
-@login_required
+@hotel_required
 def delete_extra_income(request, income_id):
+    hotel = request.hotel
     try:
-        hotel = Hotel.objects.get(user=request.user)
         income = get_object_or_404(ExtraIncome, id=income_id, hotel=hotel)
         
-        # Store the booking reference before deletion
-        booking_id = income.booking.id if income.booking else None
-        
         income.delete()
         
-        # Update booking extra income if this income was associated with a booking
-        if booking_id:
-            update_booking_extra_income(hotel, booking_id)
-        
         messages.success(request, 'Extra income deleted successfully!')
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have permission to delete this income.")
     except Exception as e:
         messages.error(request, f"An error occurred while deleting: {str(e)}")
     
     return redirect('extra_income')
 
-def update_booking_extra_income(hotel, booking_id):
-    """Update the extra_income field for a specific booking based on all its extra incomes"""
-    try:
-        # Get the booking object
-        booking = get_object_or_404(Booking, id=booking_id, hotel=hotel)
-        
-        # Calculate total extra income for this specific booking
-        total_extra_income = ExtraIncome.objects.filter(
-            hotel=hotel, 
-            booking=booking
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Update the booking
-        booking.extra_income = total_extra_income
-        booking.save()
-        
-        print(f"Updated booking {booking_id} with extra income: {total_extra_income}")
-        
-    except Booking.DoesNotExist:
-        print(f"Booking with ID {booking_id} not found for hotel {hotel}")
-    except Exception as e:
-        print(f"Error updating booking extra income: {e}")
-
-def update_all_bookings_extra_income(hotel):
-    """Update extra_income field for all bookings based on their associated extra incomes"""
-    try:
-        # Get all bookings for this hotel
-        bookings = Booking.objects.filter(hotel=hotel)
-        
-        for booking in bookings:
-            # Calculate total extra income for this specific booking
-            total_extra_income = ExtraIncome.objects.filter(
-                hotel=hotel, 
-                booking=booking
-            ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-            
-            # Update the booking
-            booking.extra_income = total_extra_income
-            booking.save()
-            
-        print(f"Updated extra income for all bookings of hotel {hotel}")
-        
-    except Exception as e:
-        print(f"Error updating all bookings extra income: {e}")
-@login_required
+@hotel_required
 def expenses(request):
-    try:
-        hotel = Hotel.objects.get(user=request.user)
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have a hotel associated with your account.")
-        return redirect('dashboard')
+    hotel = request.hotel
     
     if request.method == 'POST':
         form = DailyExpenseForm(request.POST)
@@ -725,10 +594,11 @@ def expenses(request):
     else:
         form = DailyExpenseForm()
     
-    # Get all expenses for this hotel, ordered by date first, then created_at
+    # Get all expenses for this hotel, ordered by date first, then created_at.
+    # Only evaluated by the template when its cached fragment is missing.
     expenses = DailyExpense.objects.filter(hotel=hotel).order_by('-date', '-created_at')
     
-    # Calculate total expenses by category
+    # Calculate total expenses by category in one grouped query
     expense_categories = {
         'STAFF_SALARY': {'name': 'Staff Salary / Wages', 'total': Decimal('0.00')},
         'KITCHEN_GROCERY': {'name': 'Kitchen / Grocery', 'total': Decimal('0.00')},
@@ -737,12 +607,15 @@ def expenses(request):
         'OTHER': {'name': 'Other', 'total': Decimal('0.00')},
     }
     
-    for expense in expenses:
-        if expense.expense_type in expense_categories:
-            expense_categories[expense.expense_type]['total'] += expense.amount
+    category_totals = DailyExpense.objects.filter(hotel=hotel).values('expense_type').annotate(
+        total=models.Sum('amount')
+    ).order_by()
+    for row in category_totals:
+        if row['expense_type'] in expense_categories:
+            expense_categories[row['expense_type']]['total'] = row['total']
     
     # Calculate total expenses
-    total_expenses = expenses.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+    total_expenses = sum((row['total'] for row in category_totals), Decimal('0.00'))
     
     return render(request, "expense.html", {
         'form': form,
@@ -752,11 +625,29 @@ def expenses(request):
         'total_expenses': total_expenses,
     })
 
-@login_required
+@hotel_required
+@require_GET
+def export_expenses(request):
+    """Stream the expenses list as CSV, optionally limited to start_date/end_date"""
+    hotel = request.hotel
+    expenses = DailyExpense.objects.filter(hotel=hotel)
+    
+    start_date = request.GET.get('start_date', '')
+    end_date = request.GET.get('end_date', '')
+    if start_date and end_date:
+        date_range = parse_date_range(start_date, end_date)
+        if date_range is None:
+            return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD.'}, status=400)
+        expenses = expenses.filter(date__range=date_range)
+    
+    expenses = expenses.order_by('-date', '-created_at')
+    return stream_csv(f'expenses_{hotel.hotel_code}.csv', EXPENSE_EXPORT_COLUMNS, expenses)
+
+@hotel_required
 @require_POST
 def update_expense(request):
+    hotel = request.hotel
     try:
-        hotel = Hotel.objects.get(user=request.user)
         expense_id = request.POST.get('id')
         expense_instance = get_object_or_404(DailyExpense, id=expense_id, hotel=hotel)
         
@@ -779,36 +670,30 @@ def update_expense(request):
         messages.success(request, f'Expense updated successfully!')
         return redirect('expenses')
             
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have permission to edit this expense.")
-        return redirect('expenses')
     except ValueError as e:
         messages.error(request, "Invalid amount or date format.")
         return redirect('expenses')
 
-@login_required
+@hotel_required
 def delete_expense(request, expense_id):
-    try:
-        hotel = Hotel.objects.get(user=request.user)
-        expense = get_object_or_404(DailyExpense, id=expense_id, hotel=hotel)
-        expense.delete()
-        messages.success(request, 'Expense deleted successfully!')
-    except Hotel.DoesNotExist:
-        messages.error(request, "You don't have permission to delete this expense.")
+    expense = get_object_or_404(DailyExpense, id=expense_id, hotel=request.hotel)
+    expense.delete()
+    messages.success(request, 'Expense deleted successfully!')
     
     return redirect('expenses')
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.db.models import Sum
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from .models import Hotel, SimpleBooking
 def blackroom(request):
-    if request.user.is_authenticated:
-        # Get current hotel
-        hotel = get_object_or_404(Hotel, id=request.user.hotel.id)
+    if request.hotel is not None:
+        # Current hotel, resolved by CurrentHotelMiddleware
+        hotel = request.hotel
         
         # Handle date filters
         start_date = request.GET.get('start_date')
@@ -838,47 +723,54 @@ def blackroom(request):
             booking_date__lte=end_date
         ).order_by('-booking_date', '-created_at')
         
+        # Optional guest name search, uses the full-text index
+        search_query = request.GET.get('search', '').strip()
+        if search_query:
+            simple_bookings = search_queryset(simple_bookings, search_query)
+        
         # Calculate summary statistics for filtered period
-        total_bookings = simple_bookings.count()
-        total_amount = simple_bookings.aggregate(Sum('booking_amount'))['booking_amount__sum']
-        total_extra_income = simple_bookings.aggregate(Sum('extra_income'))['extra_income__sum']
+        summary = simple_bookings.aggregate(
+            total_bookings=Count('id'),
+            total_amount=Sum('booking_amount'),
+            total_extra_income=Sum('extra_income'),
+        )
+        total_bookings = summary['total_bookings']
+        total_amount = summary['total_amount']
+        total_extra_income = summary['total_extra_income']
         
-        # Ensure values are Decimal type
-        total_amount = Decimal(str(total_amount)) if total_amount is not None else Decimal('0.00')
-        total_extra_income = Decimal(str(total_extra_income)) if total_extra_income is not None else Decimal('0.00')
+        total_amount = total_amount or Decimal('0.00')
+        total_extra_income = total_extra_income or Decimal('0.00')
+        
+        # Monthly data for charts - one grouped query, months without bookings filled with zeros
+        monthly_totals = {
+            row['month']: row
+            for row in SimpleBooking.objects.filter(
+                hotel=hotel,
+                booking_date__gte=start_date.replace(day=1),
+                booking_date__lte=end_date
+            ).annotate(month=TruncMonth('booking_date')).values('month').annotate(
+                revenue=Sum('booking_amount'),
+                extra_income_total=Sum('extra_income'),
+                bookings_count=Count('id'),
+            ).order_by()
+        }
         
-        # Calculate monthly data for charts
         monthly_data = []
         current_date = start_date.replace(day=1)
         
         while current_date <= end_date:
-            month_start = current_date.replace(day=1)
-            next_month = month_start.replace(day=28) + timedelta(days=4)
-            month_end = next_month - timedelta(days=next_month.day)
-            
-            if month_end > end_date:
-                month_end = end_date
+            row = monthly_totals.get(current_date, {})
             
-            monthly_bookings = SimpleBooking.objects.filter(
-                hotel=hotel,
-                booking_date__gte=month_start,
-                booking_date__lte=month_end
-            )
-            
-            month_revenue = monthly_bookings.aggregate(Sum('booking_amount'))['booking_amount__sum']
-            month_extra_income = monthly_bookings.aggregate(Sum('extra_income'))['extra_income__sum']
-            
-            # Ensure values are Decimal type
-            month_revenue = Decimal(str(month_revenue)) if month_revenue is not None else Decimal('0.00')
-            month_extra_income = Decimal(str(month_extra_income)) if month_extra_income is not None else Decimal('0.00')
+            month_revenue = row.get('revenue') or Decimal('0.00')
+            month_extra_income = row.get('extra_income_total') or Decimal('0.00')
             month_total = month_revenue + month_extra_income
             
             monthly_data.append({
-                'month': month_start.strftime('%b %Y'),
+                'month': current_date.strftime('%b %Y'),
                 'revenue': float(month_revenue),
                 'extra_income': float(month_extra_income),
                 'total': float(month_total),  # Now converting Decimal to float
-                'bookings_count': monthly_bookings.count()
+                'bookings_count': row.get('bookings_count', 0)
             })
             
             # Move to next month
@@ -887,24 +779,26 @@ def blackroom(request):
             else:
                 current_date = current_date.replace(month=current_date.month + 1)
         
-        # Daily data for current month
-        daily_data = []
-        current_month_start = timezone.now().date().replace(day=1)
-        next_month = current_month_start.replace(day=28) + timedelta(days=4)
-        current_month_end = next_month - timedelta(days=next_month.day)
-        
-        for i in range(1, min(timezone.now().date().day + 1, 32)):
-            day_date = timezone.now().date().replace(day=i)
-            day_bookings = SimpleBooking.objects.filter(
+        # Daily data for current month - one grouped query, empty days filled with zeros
+        today = timezone.now().date()
+        daily_totals = {
+            row['booking_date']: row
+            for row in SimpleBooking.objects.filter(
                 hotel=hotel,
-                booking_date=day_date
-            )
-            day_revenue = day_bookings.aggregate(Sum('booking_amount'))['booking_amount__sum']
-            day_extra_income = day_bookings.aggregate(Sum('extra_income'))['extra_income__sum']
+                booking_date__gte=today.replace(day=1),
+                booking_date__lte=today
+            ).values('booking_date').annotate(
+                revenue=Sum('booking_amount'),
+                extra_income_total=Sum('extra_income'),
+            ).order_by()
+        }
+        
+        daily_data = []
+        for i in range(1, today.day + 1):
+            row = daily_totals.get(today.replace(day=i), {})
             
-            # Ensure values are Decimal type
-            day_revenue = Decimal(str(day_revenue)) if day_revenue is not None else Decimal('0.00')
-            day_extra_income = Decimal(str(day_extra_income)) if day_extra_income is not None else Decimal('0.00')
+            day_revenue = row.get('revenue') or Decimal('0.00')
+            day_extra_income = row.get('extra_income_total') or Decimal('0.00')
             daily_data.append(float(day_revenue + day_extra_income))
         
         if request.method == 'POST':
@@ -912,7 +806,7 @@ def blackroom(request):
             guest_name = request.POST.get('guest_name')
             booking_date = request.POST.get('booking_date')  # NEW: Get booking date
             booking_amount = request.POST.get('booking_amount')
-            extra_income = request.POST.get('extra_income', '0.00')
+            extra_income = request.POST.get('extra_income') or '0.00'
             
             # Validate and create booking
             try:
@@ -938,21 +832,23 @@ def blackroom(request):
             'total_extra_income': total_extra_income,
             'start_date': start_date,
             'end_date': end_date,
+            'search_query': search_query,
             'monthly_data': monthly_data,
             'daily_data': daily_data,
             'grand_total': total_amount + total_extra_income,
         }
         return render(request, 'simplebook.html', context)
     return render(request,'login.html')
+@hotel_required
 def edit_simple_booking(request, booking_id):
-    booking = get_object_or_404(SimpleBooking, id=booking_id)
+    booking = get_object_or_404(SimpleBooking, id=booking_id, hotel=request.hotel)
     
     if request.method == 'POST':
         # Handle form submission for editing
         booking.guest_name = request.POST.get('guest_name')
         booking.booking_date = datetime.strptime(request.POST.get('booking_date'), '%Y-%m-%d').date()  # NEW: Update booking date
         booking.booking_amount = request.POST.get('booking_amount')
-        booking.extra_income = request.POST.get('extra_income', '0.00')
+        booking.extra_income = request.POST.get('extra_income') or '0.00'
         
         try:
             booking.save()
@@ -964,8 +860,9 @@ def edit_simple_booking(request, booking_id):
     
     return redirect('blackroom')
 
+@hotel_required
 def delete_simple_booking(request, booking_id):
-    booking = get_object_or_404(SimpleBooking, id=booking_id)
+    booking = get_object_or_404(SimpleBooking, id=booking_id, hotel=request.hotel)
     
     try:
         booking.delete()
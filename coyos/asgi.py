@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'coyos.settings')
+# Serve the dashboard that runs its query groups concurrently (see coyos/settings.py)
+os.environ.setdefault('COYOS_DASHBOARD_ASYNC', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,91 @@
+"""
+Database profiles for coyos, selected with the COYOS_DB environment variable.
+
+sqlite (default)
+    One file (COYOS_SQLITE_PATH, default ``db.sqlite3``) tuned for a web server
+    with several workers:
+    - WAL journal, so readers never block the writer.
+    - synchronous=NORMAL, which is safe in WAL mode.
+    - A 5 s busy timeout, so a locked database waits instead of failing.
+    - IMMEDIATE transactions, so two writers queue up instead of deadlocking
+      when one upgrades a read transaction.
+
+postgres
+    PostgreSQL through psycopg, configured with COYOS_DB_NAME, COYOS_DB_USER,
+    COYOS_DB_PASSWORD, COYOS_DB_HOST and COYOS_DB_PORT. COYOS_DB_POOL=1 uses
+    psycopg's connection pool instead of persistent connections; it needs the
+    ``psycopg[pool]`` extra. COYOS_DB_POOL_MIN and COYOS_DB_POOL_MAX size the
+    pool.
+
+Without a pool, connections stay open for COYOS_DB_CONN_MAX_AGE seconds
+(default 60) rather than being opened for every request. Health checks
+replace a connection that died while it was idle.
+"""
+from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_CONN_MAX_AGE = 60
+
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    # The only busy timeout, a ``timeout`` option would be overridden by it
+    'PRAGMA busy_timeout=5000',
+    # 64 MB page cache and temp tables in memory for the grouped report queries
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+]
+
+
+def _flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_profile(environ, base_dir):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': environ.get('COYOS_SQLITE_PATH') or Path(base_dir) / 'db.sqlite3',
+        'CONN_MAX_AGE': int(environ.get('COYOS_DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def postgres_profile(environ):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('COYOS_DB_NAME', 'coyos'),
+        'USER': environ.get('COYOS_DB_USER', 'coyos'),
+        'PASSWORD': environ.get('COYOS_DB_PASSWORD', ''),
+        'HOST': environ.get('COYOS_DB_HOST', 'localhost'),
+        'PORT': environ.get('COYOS_DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(environ.get('COYOS_DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': 5,
+        },
+    }
+    if _flag(environ.get('COYOS_DB_POOL', '')):
+        # Django refuses persistent connections together with a pool
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(environ.get('COYOS_DB_POOL_MIN', 2)),
+            'max_size': int(environ.get('COYOS_DB_POOL_MAX', 10)),
+            'timeout': 10,
+        }
+    return database
+
+
+def database_settings(environ, base_dir):
+    """DATABASES setting for the profile named by COYOS_DB"""
+    profile = environ.get('COYOS_DB', 'sqlite').strip().lower()
+    if profile in ('postgres', 'postgresql'):
+        default = postgres_profile(environ)
+    elif profile == 'sqlite':
+        default = sqlite_profile(environ, base_dir)
+    else:
+        raise ImproperlyConfigured(f'Unknown COYOS_DB profile {profile!r}, use "sqlite" or "postgres"')
+    return {'default': default}
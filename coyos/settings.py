@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+from .database import database_settings
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,10 +23,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-x82a!(x6^3iijcz$2$yyhc4&bzpc5el6+9i@_adt+*ns#_9)qk'
 
+# COYOS_ENV=production turns debug off and parses each template once per process
+PRODUCTION = os.environ.get('COYOS_ENV', 'development').strip().lower() == 'production'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('COYOS_ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 
 # Application definition
@@ -43,11 +47,19 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Static files straight from STATIC_ROOT, before sessions and auth (see app/static_files.py)
+    'app.middleware.StaticFilesMiddleware',
+    # First, so the queries of the session and auth middleware are counted too
+    'app.middleware.RequestMetricsMiddleware',
+    # Inside the metrics middleware, so it measures bodies as sent
+    'app.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # request.hotel, cached in the session (see app/current_hotel.py)
+    'app.middleware.CurrentHotelMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -64,26 +76,108 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app.context_processors.fragment_cache',
             ],
         },
     },
 ]
 
+if PRODUCTION:
+    # Compiled templates are kept for the life of the process, restart to pick up edits
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# {% cache %} fragments of the main pages. Their keys include the hotel's
+# data_version, so any write replaces them before the timeout.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
 WSGI_APPLICATION = 'coyos.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# Tuned SQLite by default, COYOS_DB=postgres for PostgreSQL (see coyos/database.py)
 
-DATABASES = {
+DATABASES = database_settings(os.environ, BASE_DIR)
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory by default, set COYOS_CACHE_DIR to share the cache between processes
+# (needed with several workers, see app/current_hotel.py)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'coyos',
     }
 }
+if os.environ.get('COYOS_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['COYOS_CACHE_DIR'],
+    }
+
+# Cache used for per-hotel dashboard statistics (see app/stats_cache.py)
+STATS_CACHE_ALIAS = 'default'
+
+# Under ASGI the dashboard runs its independent query groups concurrently in a
+# pool of QUERY_GROUP_WORKERS threads, each with its own database connection
+# (see app/query_groups.py). coyos/asgi.py turns it on; under WSGI every async
+# view would need an event loop of its own, so the sync view is the default.
+DASHBOARD_ASYNC = os.environ.get('COYOS_DASHBOARD_ASYNC', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+QUERY_GROUP_WORKERS = int(os.environ.get('COYOS_QUERY_GROUP_WORKERS', 4))
+
+# Request metrics (see app/metrics.py), served at /metrics to staff users.
+# Scrapers authenticate with "Authorization: Bearer <COYOS_METRICS_TOKEN>".
+METRICS_TOKEN = os.environ.get('COYOS_METRICS_TOKEN', '')
+# Requests over a budget are logged to the app.metrics logger and counted in
+# coyos_requests_over_budget_total. The budgets of every view are
+# DEFAULT_BUDGETS in app/metrics.py; METRICS_BUDGETS overrides some of them
+# for all views, METRICS_VIEW_BUDGETS for single url names.
+EXPORT_BUDGETS = {'seconds': 30.0, 'bytes': 100 * 1024 * 1024, 'uncompressed_bytes': 500 * 1024 * 1024}
+METRICS_VIEW_BUDGETS = {
+    'dashboard': {'queries': 8},
+    # Streams whole histories by design
+    'export_bookings': EXPORT_BUDGETS,
+    'export_extra_income': EXPORT_BUDGETS,
+    'export_expenses': EXPORT_BUDGETS,
+}
+
+# Text responses of at least COMPRESSION_MIN_BYTES are gzipped for clients that
+# accept it (see app/middleware.py). Smaller ones fit in a few packets anyway.
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSIBLE_CONTENT_TYPES = [
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'app': {
+            'handlers': ['console'],
+            'level': os.environ.get('COYOS_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
 
 CRONJOBS = [
-    ('0 2 1 * *', 'app.management.commands.generate_monthly_reports.Command'),
+    # Claims the month's MonthlyReportRun, so it never overlaps dashboard-triggered runs
+    ('0 2 1 * *', 'app.utils.check_and_generate_reports'),
 ]
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -123,6 +217,25 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS=[
 os.path.join(BASE_DIR,'static')]
 STATIC_ROOT= os.path.join(BASE_DIR,'assets')
+
+# Bootstrap and Font Awesome live in static/vendor (manage.py vendor_assets).
+# In production collectstatic hashes and precompresses them (see app/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'app.storage.CompressedManifestStaticFilesStorage' if PRODUCTION
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# Serve STATIC_ROOT from the app in production, COYOS_SERVE_STATIC=0 when a web server does it
+SERVE_STATIC = PRODUCTION and os.environ.get('COYOS_SERVE_STATIC', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+# Browser cache lifetime of hashed static files
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 